@@ -0,0 +1,428 @@
+"""
+Benchmarks of parser, scoring and MARC transform hot paths.
+
+Synthetic Platform bibs and MARC files of a given size are generated with
+a fixed seed, each benchmark is timed and its peak Python memory measured
+with tracemalloc in a separate run, so tracing does not inflate timings.
+MARC and csv inputs are streamed from disk; in-memory benchmarks cycle
+through a sample of at most SAMPLE_SIZE bibs, so memory use does not grow
+with the benchmark size. Results are appended to a JSON lines history file
+and compared with the previous run of the same benchmark and size, so
+regressions show up as soon as they are introduced.
+
+usage:
+    python benchmarks.py [size] [history file]
+    e.g. python benchmarks.py 100000 ./files/benchmarks.jsonl
+"""
+from contextlib import redirect_stdout
+from datetime import datetime
+import gc
+from itertools import cycle, islice
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from pymarc import Field, Record
+
+try:
+    from scripts import laptops_crosswalk, maps_crosswalk, readalong, trailing_b
+    from scripts.marc_parser import marc2list
+    from scripts.nyp_branch_dups_discovery import (
+        determine_records_score,
+        identify_library,
+    )
+    from scripts.platform_bib_parser import (
+        get_branch_call_number,
+        get_isbns,
+        get_oclc_number,
+        get_timestamp,
+        parse_bib,
+    )
+except ImportError:
+    import laptops_crosswalk
+    import maps_crosswalk
+    import readalong
+    import trailing_b
+    from marc_parser import marc2list
+    from nyp_branch_dups_discovery import determine_records_score, identify_library
+    from platform_bib_parser import (
+        get_branch_call_number,
+        get_isbns,
+        get_oclc_number,
+        get_timestamp,
+        parse_bib,
+    )
+
+
+SIZES = (1000, 100000, 1000000)
+SEED = 2022
+# max number of Platform bibs kept in memory by in-memory benchmarks
+SAMPLE_SIZE = 10000
+BRANCH_LOCATIONS = ["nsj", "alj", "blj", "hlj", "mlj", "wbj"]
+RESEARCH_LOCATIONS = ["ma", "mal", "sc", "slr"]
+REGRESSION_TOLERANCE = 0.25
+
+
+def subfield_field(tag, *pairs, ind1=" ", ind2=" "):
+    return dict(
+        fieldTag="y",
+        marcTag=tag,
+        ind1=ind1,
+        ind2=ind2,
+        content=None,
+        subfields=[dict(tag=code, content=value) for code, value in pairs],
+    )
+
+
+def control_field(tag, content):
+    return dict(fieldTag="y", marcTag=tag, content=content, subfields=None)
+
+
+def make_platform_bib(n, rnd):
+    """
+    creates a synthetic Platform bib
+    args:
+        n: int, sequence number of the bib
+        rnd: random.Random
+    return:
+        dict
+    """
+    bid = str(10000000 + n)
+    isbns = [f"978{rnd.randrange(10 ** 10):010d}" for _ in range(rnd.randint(0, 3))]
+    research = rnd.random() < 0.1
+    locations = rnd.sample(BRANCH_LOCATIONS, rnd.randint(1, 4))
+    if research:
+        locations.append(rnd.choice(RESEARCH_LOCATIONS))
+    if rnd.random() < 0.05:
+        locations.append("ia")
+
+    var_fields = [
+        dict(
+            fieldTag="_",
+            marcTag=None,
+            content=f"00000nam  2200000{rnd.choice(' 47')}i 4500",
+        ),
+        control_field("001", str(rnd.randrange(10**8))),
+        control_field("003", rnd.choice(["OCoLC", "NN"])),
+        control_field("005", f"20{rnd.randint(0, 22):02d}0101000000.0"),
+        control_field("008", "000101s2000    nyu           000 1 eng d"),
+        subfield_field("245", ("a", f"Title {n}")),
+    ]
+    for isbn in isbns:
+        var_fields.append(subfield_field("020", ("a", isbn)))
+    if rnd.random() < 0.5:
+        var_fields.append(subfield_field("010", ("a", f"{n:08d}")))
+    if rnd.random() < 0.6:
+        var_fields.append(subfield_field("040", ("a", rnd.choice(["DLC", "NN"]))))
+    if rnd.random() < 0.3:
+        var_fields.append(subfield_field("042", ("a", "pcc")))
+    if rnd.random() < 0.5:
+        var_fields.append(subfield_field("050", ("a", "PZ7")))
+    if rnd.random() < 0.5:
+        var_fields.append(subfield_field("082", ("a", "[Fic]")))
+    if rnd.random() < 0.4:
+        var_fields.append(subfield_field("520", ("a", "Summary.")))
+    if rnd.random() < 0.7:
+        var_fields.append(subfield_field("650", ("a", "Subject"), ind2="0"))
+    if research:
+        var_fields.append(subfield_field("852", ("h", "JFE 00-1234")))
+    else:
+        var_fields.append(subfield_field("091", ("a", "FIC"), ("c", f"AUTHOR{n % 97}")))
+    if rnd.random() < 0.8:
+        var_fields.append(subfield_field("991", ("y", str(rnd.randrange(10**8)))))
+
+    return dict(
+        id=bid,
+        deleted=False,
+        locations=[dict(code=code) for code in locations],
+        normTitle=f"title {n % 1000}",
+        standardNumbers=isbns,
+        fixedFields={"31": dict(label="Bib Code 3", value=rnd.choice("a" * 19 + "d"))},
+        varFields=var_fields,
+    )
+
+
+def generate_platform_bibs(size, seed=SEED):
+    rnd = random.Random(seed)
+    for n in range(size):
+        yield make_platform_bib(n, rnd)
+
+
+def make_marc_bib(n, rnd):
+    """
+    creates a synthetic branch MARC bib
+    args:
+        n: int, sequence number of the bib
+        rnd: random.Random
+    return:
+        pymarc.Record
+    """
+    bib = Record()
+    bib.leader = "01000nam a2200313ua 4500"
+    ocn = str(rnd.randrange(10**8))
+    bib.add_field(Field(tag="001", data=f"bkops{n}"))
+    bib.add_field(Field(tag="003", data="BookOps"))
+    bib.add_field(Field(tag="008", data="000101s2000    nyu           000 1 eng d"))
+    for _ in range(rnd.randint(1, 3)):
+        bib.add_field(
+            Field(
+                tag="020",
+                indicators=[" ", " "],
+                subfields=["a", f"978{rnd.randrange(10 ** 10):010d} (pbk.)"],
+            )
+        )
+    bib.add_field(
+        Field(tag="035", indicators=[" ", " "], subfields=["a", f"(OCoLC){ocn}b"])
+    )
+    bib.add_field(
+        Field(
+            tag="099",
+            indicators=[" ", " "],
+            subfields=["a", "READALONG", "a", "J", "a", "FIC", "a", "ADAMS"],
+        )
+    )
+    bib.add_field(
+        Field(tag="245", indicators=["0", "0"], subfields=["a", f"Title {n} /"])
+    )
+    bib.add_field(
+        Field(tag="907", indicators=[" ", " "], subfields=["a", f".b{20000000 + n}x"])
+    )
+    bib.add_field(Field(tag="908", indicators=[" ", " "], subfields=["a", "x"]))
+    bib.add_field(Field(tag="991", indicators=[" ", " "], subfields=["y", ocn]))
+    bib.add_field(
+        Field(tag="998", indicators=[" ", " "], subfields=["e", rnd.choice("-a")])
+    )
+    return bib
+
+
+def write_marc_file(fh, size, seed=SEED):
+    rnd = random.Random(seed)
+    with open(fh, "wb") as marcfile:
+        for n in range(size):
+            marcfile.write(make_marc_bib(n, rnd).as_marc())
+
+
+def write_maps_csv(fh, size):
+    with open(fh, "w", encoding="utf-8") as file:
+        for n in range(size):
+            file.write(
+                f"3343300000{n:04d},Author {n},Map {n},,Scale 1:24000,2001,"
+                f"Series,Note,Content,New York (N.Y.) - Maps,Maps,MAP {n}\n"
+            )
+
+
+def write_laptops_csv(fh, size):
+    with open(fh, "w", encoding="utf-8") as file:
+        for n in range(size):
+            file.write(
+                f"HP EliteBook 840 G6,32_PUBLAP{n % 100:02d}_{n:04d},"
+                f"SN{n},A{n},00:00:00:00:00:00,3443400000{n:04d}\n"
+            )
+
+
+def run_quietly(func):
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        func()
+
+
+def measure(name, func, units, size, trace_memory=True):
+    """
+    times a single call of func; peak memory is measured in a second call
+    args:
+        name: str, benchmark name
+        func: callable with no arguments, repeatable
+        units: int, number of processed units (bibs, records, rows)
+        size: int, benchmark size
+        trace_memory: bool, measure peak memory with tracemalloc (second run)
+    return:
+        dict
+    """
+    gc.collect()
+    start = time.perf_counter()
+    run_quietly(func)
+    seconds = time.perf_counter() - start
+
+    peak = None
+    if trace_memory:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            run_quietly(func)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return dict(
+        name=name,
+        size=size,
+        units=units,
+        seconds=round(seconds, 6),
+        per_second=round(units / seconds, 1) if seconds else None,
+        peak_memory=peak,
+    )
+
+
+def consume(iterable):
+    for _ in iterable:
+        pass
+
+
+def repeat_sample(sample, size):
+    """
+    args:
+        sample: list
+        size: int, number of yielded elements
+    return:
+        iterator cycling through the sample
+    """
+    return islice(cycle(sample), size)
+
+
+def run_benchmarks(size=1000, work_dir=None, trace_memory=True):
+    """
+    runs all benchmarks on synthetic data of the given size
+    args:
+        size: int, number of generated bibs (csv rows for crosswalks)
+        work_dir: str, directory for generated files; temporary if None
+        trace_memory: bool, measure peak memory
+    return:
+        list of result dicts
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        work_dir = work_dir or tmp_dir
+        marc_fh = os.path.join(work_dir, "bench.mrc")
+        maps_fh = os.path.join(work_dir, "maps.csv")
+        laptops_fh = os.path.join(work_dir, "laptops.csv")
+        write_marc_file(marc_fh, size)
+        write_maps_csv(maps_fh, size)
+        write_laptops_csv(laptops_fh, size)
+        bibs = list(generate_platform_bibs(min(size, SAMPLE_SIZE)))
+        parsed = [parse_bib(bib) for bib in bibs]
+        # groups of five duplicates
+        groups = [
+            {bib["id"]: bib for bib in parsed[n : n + 5]}
+            for n in range(0, len(parsed), 5)
+        ]
+
+        def getters():
+            for bib in repeat_sample(bibs, size):
+                bib = parse_bib(bib)
+                get_isbns(bib)
+                get_oclc_number(bib)
+                get_branch_call_number(bib)
+                get_timestamp(bib)
+
+        def scoring():
+            for group in repeat_sample(groups, -(-size // 5)):
+                determine_records_score(group)
+
+        def out(name):
+            fh = os.path.join(work_dir, name)
+            if os.path.exists(fh):
+                os.remove(fh)
+            return fh
+
+        def readalong_file():
+            cwd = os.getcwd()
+            os.makedirs(os.path.join(work_dir, "files"), exist_ok=True)
+            os.chdir(work_dir)
+            try:
+                readalong.process_file(marc_fh)
+            finally:
+                os.chdir(cwd)
+
+        benchmarks = [
+            ("parse_bib", lambda: consume(map(parse_bib, repeat_sample(bibs, size)))),
+            ("platform_bib_parser getters", getters),
+            (
+                "identify_library",
+                lambda: consume(map(identify_library, repeat_sample(parsed, size))),
+            ),
+            ("determine_records_score", scoring),
+            ("marc2list", lambda: marc2list(marc_fh, out("bench.csv"))),
+            (
+                "trailing_b.fix_file",
+                lambda: trailing_b.fix_file(marc_fh, out("tb.mrc")),
+            ),
+            ("readalong.process_file", readalong_file),
+            (
+                "maps_crosswalk.create_bibs",
+                lambda: maps_crosswalk.create_bibs(maps_fh, out("maps.mrc"), 1),
+            ),
+            (
+                "laptops_crosswalk.create_bibs",
+                lambda: laptops_crosswalk.create_bibs(laptops_fh, out("lap.mrc")),
+            ),
+        ]
+        return [
+            measure(name, func, size, size, trace_memory) for name, func in benchmarks
+        ]
+
+
+def load_history(history_fh):
+    """
+    args:
+        history_fh: str, path to JSON lines history file
+    return:
+        list of result dicts
+    """
+    try:
+        with open(history_fh, "r", encoding="utf-8") as file:
+            return [json.loads(line) for line in file if line.strip()]
+    except FileNotFoundError:
+        return []
+
+
+def save_history(history_fh, results):
+    timestamp = datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ")
+    with open(history_fh, "a", encoding="utf-8") as file:
+        for result in results:
+            entry = dict(timestamp=timestamp, python=sys.version.split()[0])
+            entry.update(result)
+            file.write(json.dumps(entry) + "\n")
+
+
+def find_regressions(results, history, tolerance=REGRESSION_TOLERANCE):
+    """
+    compares results with the last recorded run of each benchmark and size
+    args:
+        results: list of result dicts
+        history: list of earlier result dicts, oldest first
+        tolerance: float, allowed relative increase of time or peak memory
+    return:
+        list of (name, metric, previous, current) tuples
+    """
+    previous = dict()
+    for entry in history:
+        previous[(entry["name"], entry["size"])] = entry
+
+    regressions = []
+    for result in results:
+        last = previous.get((result["name"], result["size"]))
+        if last is None:
+            continue
+        for metric in ("seconds", "peak_memory"):
+            before, now = last.get(metric), result.get(metric)
+            if before and now and now > before * (1 + tolerance):
+                regressions.append((result["name"], metric, before, now))
+    return regressions
+
+
+if __name__ == "__main__":
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else SIZES[0]
+    history_fh = sys.argv[2] if len(sys.argv) > 2 else "./files/benchmarks.jsonl"
+
+    results = run_benchmarks(size)
+    for result in results:
+        print(
+            f"{result['name']:32} {result['seconds']:>10.3f}s "
+            f"{result['per_second']:>12}/s {result['peak_memory'] or 0:>12} B"
+        )
+    for name, metric, before, now in find_regressions(
+        results, load_history(history_fh)
+    ):
+        print(f"REGRESSION {name}: {metric} {before} -> {now}")
+    save_history(history_fh, results)
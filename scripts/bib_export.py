@@ -0,0 +1,291 @@
+"""
+Columnar export of Platform bibs for analytics.
+
+Bibs are flattened into one row each (leader and 008 positions, standard
+numbers, locations, call numbers, OCLC number, 005 timestamp, deletion
+flags) and written in record batches to a Parquet file, which DuckDB or
+pandas query directly:
+
+    SELECT blvl, count(*) FROM 'bibs.parquet' GROUP BY blvl
+
+Rows are buffered only up to batch_size and bibs are read from the store
+in chunks, so stores of any size are exported in constant memory. JSON
+lines snapshots repeat boundary records (see harvester) and are read
+twice: the first pass finds the last line of each bib, the second yields
+only those lines, so only bib ids and line numbers are kept in memory.
+pyarrow (see requirements.txt) is imported only for Parquet output, so
+bibs can still be exported to JSON lines with the same columns where it
+is not installed.
+
+usage:
+    python bib_export.py snapshot.jsonl bibs.parquet
+    python bib_export.py store.db bibs.parquet
+"""
+from datetime import datetime
+import json
+import sys
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+try:
+    from scripts.bib_store import BibStore
+    from scripts.platform_bib_parser import (
+        get_branch_call_number,
+        get_lccn,
+        get_oclc_number,
+        get_timestamp,
+        has_research_call_number,
+        is_marked_for_deletion,
+        parse_bib,
+    )
+    from scripts.utils import JsonlWriter
+except ImportError:
+    from bib_store import BibStore
+    from platform_bib_parser import (
+        get_branch_call_number,
+        get_lccn,
+        get_oclc_number,
+        get_timestamp,
+        has_research_call_number,
+        is_marked_for_deletion,
+        parse_bib,
+    )
+    from utils import JsonlWriter
+
+
+DEFAULT_BATCH_SIZE = 10000
+
+# (column, type) of exported rows
+COLUMNS = (
+    ("id", "string"),
+    ("leader", "string"),
+    ("rec_type", "string"),
+    ("blvl", "string"),
+    ("encoding_level", "string"),
+    ("tag_008", "string"),
+    ("date_type", "string"),
+    ("date1", "string"),
+    ("date2", "string"),
+    ("country", "string"),
+    ("item_form", "string"),
+    ("language", "string"),
+    ("standard_numbers", "list<string>"),
+    ("locations", "list<string>"),
+    ("branch_call_number", "string"),
+    ("has_research_call_number", "bool"),
+    ("oclc_number", "string"),
+    ("lccn", "string"),
+    ("norm_title", "string"),
+    ("timestamp", "float64"),
+    ("updated", "timestamp"),
+    ("deleted", "bool"),
+    ("marked_for_deletion", "bool"),
+)
+
+
+def arrow_schema():
+    """
+    return:
+        pyarrow.Schema of COLUMNS
+    """
+    if pa is None:
+        raise ImportError("pyarrow is required for Parquet export")
+    types = {
+        "string": pa.string(),
+        "list<string>": pa.list_(pa.string()),
+        "bool": pa.bool_(),
+        "float64": pa.float64(),
+        "timestamp": pa.timestamp("ms"),
+    }
+    return pa.schema([(name, types[kind]) for name, kind in COLUMNS])
+
+
+def position(value, start, end=None):
+    # fixed field position(s); None when the field is missing or too short
+    if value is None:
+        return
+    return value[start : (end or start) + 1] or None
+
+
+def timestamp_to_datetime(timestamp):
+    """
+    args:
+        timestamp: float, 005 timestamp as returned by get_timestamp
+    return:
+        datetime or None
+    """
+    if not timestamp:
+        return
+    try:
+        return datetime.strptime(f"{timestamp:.1f}"[:14], "%Y%m%d%H%M%S")
+    except ValueError:
+        return
+
+
+def flatten_bib(bib):
+    """
+    args:
+        bib: dict or ParsedBib, Platform bib
+    return:
+        dict with COLUMNS keys
+    """
+    bib = parse_bib(bib)
+    leader = bib.leader
+    tag_008 = bib.tag_008
+    timestamp = get_timestamp(bib)
+    return dict(
+        id=bib.get("id"),
+        leader=leader,
+        rec_type=position(leader, 6),
+        blvl=position(leader, 7),
+        encoding_level=position(leader, 17),
+        tag_008=tag_008,
+        date_type=position(tag_008, 6),
+        date1=position(tag_008, 7, 10),
+        date2=position(tag_008, 11, 14),
+        country=position(tag_008, 15, 17),
+        item_form=position(tag_008, 23),
+        language=position(tag_008, 35, 37),
+        standard_numbers=list(bib.get("standardNumbers") or []),
+        locations=[loc.get("code") for loc in bib.get("locations") or []],
+        branch_call_number=get_branch_call_number(bib),
+        has_research_call_number=has_research_call_number(bib),
+        oclc_number=get_oclc_number(bib),
+        lccn=get_lccn(bib),
+        norm_title=bib.get("normTitle"),
+        timestamp=timestamp,
+        updated=timestamp_to_datetime(timestamp),
+        deleted=bool(bib.get("deleted")),
+        marked_for_deletion=bool(
+            bib.get("fixedFields") and is_marked_for_deletion(bib)
+        ),
+    )
+
+
+class BibParquetWriter:
+    """
+    Writes flattened bibs to a Parquet file in record batches
+    args:
+        dst_fh: str, output file (overwritten)
+        batch_size: int, number of rows in one record batch
+        compression: str, Parquet compression codec
+    """
+
+    def __init__(self, dst_fh, batch_size=DEFAULT_BATCH_SIZE, compression="zstd"):
+        self.dst_fh = dst_fh
+        self.batch_size = batch_size
+        self.schema = arrow_schema()
+        self._rows = []
+        self._writer = pq.ParquetWriter(dst_fh, self.schema, compression=compression)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def write(self, bib):
+        """
+        args:
+            bib: dict or ParsedBib, Platform bib
+        """
+        self._rows.append(flatten_bib(bib))
+        if len(self._rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self._rows:
+            batch = pa.RecordBatch.from_pylist(self._rows, schema=self.schema)
+            self._writer.write_batch(batch)
+            self._rows = []
+
+    def close(self):
+        self.flush()
+        self._writer.close()
+
+
+class BibJsonlWriter(JsonlWriter):
+    """
+    Writes flattened bibs to a JSON lines file (overwritten); the
+    export format when pyarrow is not installed
+    args:
+        dst_fh: str, output file
+    """
+
+    def __init__(self, dst_fh, **kwargs):
+        open(dst_fh, "w").close()
+        super().__init__(dst_fh)
+
+    def write(self, bib):
+        row = flatten_bib(bib)
+        if row["updated"] is not None:
+            row["updated"] = row["updated"].isoformat()
+        super().write(row)
+
+
+def read_snapshot(src_fh):
+    """
+    reads JSON lines snapshot (harvester.harvest) keeping the last
+    version of each bib
+    args:
+        src_fh: str, path to .jsonl snapshot
+    yields:
+        dict, in the order of the last version of each bib
+    """
+    last_lines = dict()
+    with open(src_fh, "r", encoding="utf-8") as file:
+        for n, line in enumerate(file):
+            if line.strip():
+                last_lines[json.loads(line)["id"]] = n
+    last_lines = set(last_lines.values())
+    with open(src_fh, "r", encoding="utf-8") as file:
+        for n, line in enumerate(file):
+            if n in last_lines:
+                yield json.loads(line)
+
+
+def read_bibs(src_fh):
+    """
+    reads bibs of a bib_store.BibStore database or of a JSON lines
+    snapshot (harvester.harvest)
+    args:
+        src_fh: str, path to .db store or .jsonl snapshot
+    yields:
+        dict or ParsedBib
+    """
+    if src_fh.endswith(".db"):
+        with BibStore(src_fh) as store:
+            yield from store.all_bibs()
+    else:
+        yield from read_snapshot(src_fh)
+
+
+def export_bibs(bibs, dst_fh, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    args:
+        bibs: iterable of Platform bibs
+        dst_fh: str, .parquet file, any other extension writes JSON lines
+        batch_size: int, number of rows in one Parquet record batch
+    return:
+        int, number of exported bibs
+    """
+    if dst_fh.endswith(".parquet"):
+        writer = BibParquetWriter(dst_fh, batch_size)
+    else:
+        writer = BibJsonlWriter(dst_fh)
+    count = 0
+    with writer:
+        for bib in bibs:
+            writer.write(bib)
+            count += 1
+    return count
+
+
+if __name__ == "__main__":
+    src_fh, dst_fh = sys.argv[1], sys.argv[2]
+    count = export_bibs(read_bibs(src_fh), dst_fh)
+    print(f"Exported {count} bibs to {dst_fh}.")
@@ -0,0 +1,278 @@
+"""
+Local snapshot of Platform bibs for whole-catalog analysis.
+
+Bibs in Platform json format are kept in a SQLite database together with
+an index of their identifiers: ISBNs (standardNumbers), OCLC numbers,
+LCCNs, normalized titles and branch call numbers. BibStore.iter_bibs
+mirrors PlatformSession.iter_bibs for standard number queries, so the
+dedup pipeline can run against the local store instead of the API.
+
+Bibs can be loaded from Platform responses, JSON lines snapshots created
+by harvester.harvest or MARC exports. MARC exports carry no Platform
+locations or normalized titles, so bibs loaded from them have neither.
+"""
+import json
+import sqlite3
+import threading
+
+try:
+    from scripts.marc_scanner import scan
+    from scripts.platform_bib_parser import (
+        get_bibNo,
+        get_branch_call_number,
+        get_isbns,
+        get_lccn,
+        get_normalized_title,
+        get_oclc_number,
+        parse_bib,
+    )
+except ImportError:
+    from marc_scanner import scan
+    from platform_bib_parser import (
+        get_bibNo,
+        get_branch_call_number,
+        get_isbns,
+        get_lccn,
+        get_normalized_title,
+        get_oclc_number,
+        parse_bib,
+    )
+
+
+def bib_identifiers(bib):
+    """
+    lists indexed identifiers of a bib
+    args:
+        bib: dict or ParsedBib
+    return:
+        list of (kind, value) tuples
+    """
+    identifiers = [("isbn", isbn) for isbn in get_isbns(bib) or []]
+    for kind, value in (
+        ("oclc", get_oclc_number(bib)),
+        ("lccn", get_lccn(bib)),
+        ("title", get_normalized_title(bib)),
+        ("callnum", get_branch_call_number(bib)),
+    ):
+        if value:
+            identifiers.append((kind, value))
+    return identifiers
+
+
+def marc2platform(record):
+    """
+    converts MARC record to a minimal Platform-like bib
+    args:
+        record: marc_scanner.RecordView
+    return:
+        dict
+    """
+    bid = None
+    sierra_numbers = record.values("907")
+    if sierra_numbers:
+        # .b12345678x -> 12345678
+        bid = sierra_numbers[0].strip()[2:10]
+
+    var_fields = [dict(fieldTag="_", marcTag=None, content=record.leader)]
+    for tag in record.tags():
+        if tag < "010" and tag.isdigit():
+            for value in record.values(tag):
+                var_fields.append(
+                    dict(fieldTag=None, marcTag=tag, content=value, subfields=None)
+                )
+        else:
+            for field in record.subfields(tag):
+                var_fields.append(
+                    dict(
+                        fieldTag=None,
+                        marcTag=tag,
+                        content=None,
+                        subfields=[dict(tag=c, content=v) for c, v in field],
+                    )
+                )
+
+    isbns = []
+    for field in record.subfields("020"):
+        for code, value in field:
+            if code == "a" and value.strip():
+                isbns.append(value.split(" ")[0].strip())
+
+    return dict(
+        id=bid,
+        locations=[],
+        standardNumbers=isbns,
+        normTitle=None,
+        fixedFields=dict(),
+        varFields=var_fields,
+    )
+
+
+class BibStore:
+    """
+    SQLite store of Platform bibs indexed by identifiers
+    args:
+        db_fh: str, path to SQLite database
+    """
+
+    def __init__(self, db_fh):
+        self.db_fh = db_fh
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_fh, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS bibs (id TEXT PRIMARY KEY, data TEXT)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS identifiers "
+                "(kind TEXT, value TEXT, bib_id TEXT)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_identifiers "
+                "ON identifiers (kind, value)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_identifiers_bib "
+                "ON identifiers (bib_id)"
+            )
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM bibs").fetchone()[0]
+
+    def load_bibs(self, bibs):
+        """
+        adds or replaces bibs; later versions of a bib replace earlier ones
+        args:
+            bibs: iterable of Platform bib dicts
+        return:
+            int, number of loaded bibs
+        """
+        n = 0
+        with self._lock, self._conn:
+            for bib in bibs:
+                bid = get_bibNo(bib)
+                parsed = parse_bib(bib)
+                self._conn.execute("DELETE FROM identifiers WHERE bib_id=?", (bid,))
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO bibs VALUES (?, ?)", (bid, json.dumps(bib))
+                )
+                self._conn.executemany(
+                    "INSERT INTO identifiers VALUES (?, ?, ?)",
+                    [(kind, value, bid) for kind, value in bib_identifiers(parsed)],
+                )
+                n += 1
+        return n
+
+    def load_json(self, fh):
+        """
+        loads Platform response saved to a file ({"data": [...]})
+        args:
+            fh: str, path to json file
+        """
+        with open(fh, "r", encoding="utf-8") as file:
+            data = json.load(file)
+        if isinstance(data, dict) and "data" in data:
+            data = data["data"]
+        elif isinstance(data, dict):
+            data = [data]
+        return self.load_bibs(data)
+
+    def load_jsonl(self, fh):
+        """
+        loads JSON lines snapshot created by harvester.harvest
+        args:
+            fh: str, path to JSON lines file
+        """
+        with open(fh, "r", encoding="utf-8") as file:
+            return self.load_bibs(json.loads(line) for line in file if line.strip())
+
+    def load_marc(self, fh):
+        """
+        loads MARC export with Sierra bib numbers in the 907
+        args:
+            fh: str, path to MARC file
+        """
+        return self.load_bibs(marc2platform(record) for record in scan(fh))
+
+    def get_bib(self, bid):
+        """
+        args:
+            bid: str, bib number
+        return:
+            ParsedBib or None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM bibs WHERE id=?", (bid,)
+            ).fetchone()
+        if row is not None:
+            return parse_bib(json.loads(row[0]))
+
+    def all_bibs(self, chunk_size=1000):
+        """
+        iterates over all bibs ordered by bib number; bibs are read in
+        chunks, so memory use does not grow with the size of the store
+        args:
+            chunk_size: int, number of bibs read at once
+        yields:
+            ParsedBib
+        """
+        last_bid = ""
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT id, data FROM bibs WHERE id>? ORDER BY id LIMIT ?",
+                    (last_bid, chunk_size),
+                ).fetchall()
+            if not rows:
+                return
+            for bid, data in rows:
+                yield parse_bib(json.loads(data))
+            last_bid = bid
+
+    def find(self, kind, values):
+        """
+        finds bibs by any of identifier values
+        args:
+            kind: str, one of "isbn", "oclc", "lccn", "title", "callnum"
+            values: str or list of str
+        return:
+            list of ParsedBib ordered by bib number
+        """
+        if isinstance(values, str):
+            values = [values]
+        values = list(values)
+        if not values:
+            return []
+        placeholders = ",".join("?" * len(values))
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT data FROM bibs WHERE id IN ("
+                "SELECT bib_id FROM identifiers "
+                f"WHERE kind=? AND value IN ({placeholders})) ORDER BY id",
+                [kind] + values,
+            ).fetchall()
+        return [parse_bib(json.loads(row[0])) for row in rows]
+
+    def iter_bibs(self, limit=None, standardNumber=None, deleted=False, **filters):
+        """
+        local counterpart of PlatformSession.iter_bibs for ISBN queries
+        args:
+            limit: int, ignored; kept for compatibility
+            standardNumber: list of ISBNs
+            deleted: bool, include bibs deleted in Platform
+        yields:
+            ParsedBib
+        """
+        for bib in self.find("isbn", standardNumber or []):
+            if deleted or not bib.get("deleted"):
+                yield bib
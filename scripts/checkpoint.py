@@ -0,0 +1,136 @@
+"""
+Checkpoint journal for long running, append-only report jobs.
+
+After every `commit_interval` fully processed source units (csv rows, bib
+numbers) the journal records the unit position and the size of every
+report file. On restart reports are truncated back to the sizes of the
+last recorded unit, which removes rows written by units processed after
+it, and units up to it are skipped. The rerun produces reports identical
+to an uninterrupted run.
+
+The journal keeps only the last entry: it is written to a temporary file
+and atomically replaces the previous journal. Jobs that resume by a sort
+key rather than a position clear the journal when they finish, so the
+next run starts from the beginning.
+"""
+import json
+import os
+
+
+# journal write interval for jobs committing a unit per source row
+ROW_COMMIT_INTERVAL = 100
+
+
+class Checkpoint:
+    """
+    args:
+        journal_fh: str, path to journal file (json lines)
+        reports: list, paths to report files the job appends to
+        commit_interval: int, number of committed units per journal write
+    """
+
+    def __init__(self, journal_fh, reports, commit_interval=1):
+        self.journal_fh = journal_fh
+        self.reports = list(reports)
+        self.commit_interval = commit_interval
+        self.position = 0
+        self.key = None
+        self._saved_position = 0
+
+        entry = self._last_entry()
+        if entry is None:
+            self._write_entry()
+        else:
+            self.position = entry["position"]
+            self.key = entry["key"]
+            self._saved_position = self.position
+            self._restore(entry["sizes"])
+
+    def _last_entry(self):
+        entry = None
+        try:
+            with open(self.journal_fh, "r", encoding="utf-8") as journal:
+                for line in journal:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # torn write of the last line
+                        break
+        except FileNotFoundError:
+            pass
+        return entry
+
+    def _report_sizes(self):
+        sizes = dict()
+        for fh in self.reports:
+            try:
+                sizes[fh] = os.path.getsize(fh)
+            except FileNotFoundError:
+                sizes[fh] = 0
+        return sizes
+
+    def _restore(self, sizes):
+        for fh in self.reports:
+            size = sizes.get(fh, 0)
+            if os.path.exists(fh) and os.path.getsize(fh) > size:
+                with open(fh, "r+b") as report:
+                    report.truncate(size)
+
+    def _write_entry(self):
+        entry = dict(position=self.position, key=self.key, sizes=self._report_sizes())
+        tmp_fh = f"{self.journal_fh}.tmp"
+        with open(tmp_fh, "w", encoding="utf-8") as journal:
+            journal.write(json.dumps(entry) + "\n")
+            journal.flush()
+            os.fsync(journal.fileno())
+        os.replace(tmp_fh, self.journal_fh)
+        self._saved_position = self.position
+
+    def skip(self, units):
+        """
+        skips units completed in previous runs
+        args:
+            units: iterable of job source units
+        yields:
+            units not processed yet
+        """
+        for n, unit in enumerate(units):
+            if n >= self.position:
+                yield unit
+
+    def commit(self, key=None, flush=None):
+        """
+        records a fully processed unit
+        args:
+            key: str, unit identifier, e.g. bib number
+            flush: callable, flushes buffered report writers; called only
+                   when the journal is written
+        """
+        self.position += 1
+        self.key = key
+        if self.position - self._saved_position >= self.commit_interval:
+            self.save(flush)
+
+    def save(self, flush=None):
+        """
+        records units committed since the last journal write; call at the
+        end of the job when commit_interval is over 1
+        args:
+            flush: callable, flushes buffered report writers
+        """
+        if self.position != self._saved_position:
+            if flush is not None:
+                flush()
+            self._write_entry()
+
+    def clear(self):
+        """
+        removes the journal of a completed job
+        """
+        try:
+            os.remove(self.journal_fh)
+        except FileNotFoundError:
+            pass
+        self.position = 0
+        self.key = None
+        self._saved_position = 0
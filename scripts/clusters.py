@@ -0,0 +1,63 @@
+"""
+Union-find clustering of records connected by shared identifiers.
+"""
+
+
+class UnionFind:
+    """
+    Disjoint sets with path compression and union by size
+    """
+
+    def __init__(self):
+        self.parents = dict()
+        self.sizes = dict()
+
+    def add(self, item):
+        if item not in self.parents:
+            self.parents[item] = item
+            self.sizes[item] = 1
+
+    def find(self, item):
+        root = item
+        while self.parents[root] != root:
+            root = self.parents[root]
+        while self.parents[item] != root:
+            self.parents[item], item = root, self.parents[item]
+        return root
+
+    def union(self, item1, item2):
+        root1 = self.find(item1)
+        root2 = self.find(item2)
+        if root1 == root2:
+            return
+        if self.sizes[root1] < self.sizes[root2]:
+            root1, root2 = root2, root1
+        self.parents[root2] = root1
+        self.sizes[root1] += self.sizes[root2]
+
+    def groups(self):
+        groups = dict()
+        for item in self.parents:
+            groups.setdefault(self.find(item), []).append(item)
+        return list(groups.values())
+
+
+def cluster_ids(records):
+    """
+    groups ids of records sharing at least one key, directly or through
+    other records
+    args:
+        records: iterable of (id, keys) tuples
+    return:
+        list of clusters (lists of ids) in order of first appearance;
+        ids within a cluster keep input order
+    """
+    sets = UnionFind()
+    owners = dict()
+    for rid, keys in records:
+        sets.add(rid)
+        for key in keys:
+            owner = owners.setdefault(key, rid)
+            if owner != rid:
+                sets.union(owner, rid)
+    return sets.groups()
@@ -19,3 +19,19 @@ class APITokenExpiredError(Exception):
     """
 
     pass
+
+
+class CacheMissError(Exception):
+    """Exception raised when a response is not cached and the cache is in
+    offline replay mode
+    """
+
+    pass
+
+
+class CircuitOpenError(Exception):
+    """Exception raised when requests to Platform are suspended after
+    repeated failures
+    """
+
+    pass
@@ -0,0 +1,162 @@
+"""
+Incremental harvest of Platform bibs or items by createdDate/updatedDate.
+
+A date range is probed with a single page request; when the page comes back
+full the window is split in half and both halves are probed again, so every
+window that is finally fetched fits in one page. Windows are requested in
+parallel and their records are appended to a JSON lines snapshot as they
+arrive. After a complete run the end of the harvested range is saved as the
+high-water mark and the next run only asks for changes made since then.
+
+Boundary records may be harvested twice (Platform date ranges are inclusive
+and a crashed run is repeated), so consumers of the snapshot should keep
+the last line for each id.
+"""
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+import json
+import os
+
+
+DATE_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+
+def format_date(date):
+    return date.strftime(DATE_FORMAT)
+
+
+def parse_date(value):
+    return datetime.strptime(value, DATE_FORMAT)
+
+
+def load_high_water_mark(state_fh):
+    """
+    args:
+        state_fh: str, path to harvest state file
+    return:
+        datetime or None
+    """
+    try:
+        with open(state_fh, "r") as file:
+            return parse_date(json.load(file)["high_water_mark"])
+    except FileNotFoundError:
+        return
+
+
+def save_high_water_mark(state_fh, date):
+    """
+    atomically replaces the harvest state file
+    args:
+        state_fh: str, path to harvest state file
+        date: datetime
+    """
+    tmp_fh = f"{state_fh}.tmp"
+    with open(tmp_fh, "w") as file:
+        json.dump(dict(high_water_mark=format_date(date)), file)
+    os.replace(tmp_fh, state_fh)
+
+
+def split_window(start, end):
+    """
+    bisects a date window into two non-overlapping halves
+    args:
+        start: datetime
+        end: datetime
+    return:
+        tuple of two (start, end) tuples
+    """
+    middle = start + (end - start) / 2
+    middle = middle.replace(microsecond=0)
+    return (start, middle), (middle + timedelta(seconds=1), end)
+
+
+def harvest_window(session, path, field, window, limit, min_window):
+    """
+    fetches records of a window or splits it when it does not fit one page
+    args:
+        session: platform.PlatformSession
+        path: str, "/bibs" or "/items"
+        field: str, "createdDate" or "updatedDate"
+        window: tuple, (start, end) datetimes
+        limit: int, page size
+        min_window: timedelta, windows this short are paged through instead
+    return:
+        (records, subwindows) tuple
+    """
+    start, end = window
+    dates = (format_date(start), format_date(end))
+    records = session.query_page(path, limit, 0, **{field: dates})
+    if len(records) < limit:
+        return records, []
+    if end - start <= min_window:
+        return list(session.iter_query(path, limit, **{field: dates})), []
+    return [], list(split_window(start, end))
+
+
+def harvest(
+    session,
+    dst_fh,
+    state_fh,
+    path="/bibs",
+    field="updatedDate",
+    start=None,
+    end=None,
+    limit=50,
+    workers=4,
+    min_window=timedelta(seconds=1),
+):
+    """
+    appends records changed between start (or the saved high-water mark)
+    and end to a JSON lines snapshot
+    args:
+        session: platform.PlatformSession
+        dst_fh: str, path to JSON lines snapshot
+        state_fh: str, path to harvest state file with high-water mark
+        path: str, "/bibs" or "/items"
+        field: str, "createdDate" or "updatedDate"
+        start: datetime, required for the first run
+        end: datetime, defaults to now (UTC)
+        limit: int, page size
+        workers: int, number of windows requested in parallel
+        min_window: timedelta, shortest window that is split further
+    return:
+        int, number of harvested records
+    """
+    if start is None:
+        start = load_high_water_mark(state_fh)
+        if start is None:
+            raise ValueError("Start date required for the first harvest")
+    if end is None:
+        end = datetime.utcnow().replace(microsecond=0)
+
+    total = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor, open(
+        dst_fh, "a", encoding="utf-8"
+    ) as snapshot:
+        pending = {
+            executor.submit(
+                harvest_window, session, path, field, (start, end), limit, min_window
+            )
+        }
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                records, windows = future.result()
+                for record in records:
+                    snapshot.write(json.dumps(record) + "\n")
+                total += len(records)
+                for window in windows:
+                    pending.add(
+                        executor.submit(
+                            harvest_window,
+                            session,
+                            path,
+                            field,
+                            window,
+                            limit,
+                            min_window,
+                        )
+                    )
+
+    save_high_water_mark(state_fh, end)
+    return total
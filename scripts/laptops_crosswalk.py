@@ -8,7 +8,7 @@ from datetime import date
 
 from pymarc import Record, Field
 
-from utils import save2marc
+from utils import MarcWriter
 
 
 MapData = namedtuple(
@@ -136,10 +136,11 @@ def make_bib(data: namedtuple):
 
 def create_bibs(src_fh: str, out_fh: str):
     reader = source_reader(src_fh)
-    for row in reader:
-        bib = make_bib(row)
-        print(bib)
-        save2marc(out_fh, bib)
+    with MarcWriter(out_fh) as writer:
+        for row in reader:
+            bib = make_bib(row)
+            print(bib)
+            writer.write(bib)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,90 @@
+"""
+Fast extraction of Sierra bib numbers of Platform 404 responses from logs.
+
+Log files are memory-mapped and searched with a compiled bytes regex, so
+lines are never decoded. Extracted numbers are validated with the Sierra
+check digit (a literal "a" check digit is accepted as a wildcard) and
+several files are scanned in parallel processes.
+"""
+from concurrent.futures import ProcessPoolExecutor
+import mmap
+import re
+
+
+BIB_404_PATTERN = r"NYPL Platform request \(404\)[^\n]*?b(\d{8})([0-9xa])[ \t\r]*$"
+BIB_404_RE = re.compile(BIB_404_PATTERN.encode("ascii"), re.MULTILINE)
+BIB_404_LINE_RE = re.compile(BIB_404_PATTERN, re.MULTILINE)
+
+
+def sierra_check_digit(digits):
+    """
+    computes check digit of a Sierra record number
+    args:
+        digits: str, record number without prefix and check digit
+    return:
+        str, "0"-"9" or "x"
+    """
+    total = 0
+    for weight, digit in enumerate(reversed(digits), start=2):
+        total += int(digit) * weight
+    remainder = total % 11
+    return "x" if remainder == 10 else str(remainder)
+
+
+def is_valid_check_digit(digits, check_digit):
+    return check_digit == "a" or check_digit == sierra_check_digit(digits)
+
+
+def parse_404_line(line):
+    """
+    args:
+        line: str, log line
+    return:
+        bib number in "b12345678a" format or None
+    """
+    match = BIB_404_LINE_RE.search(line)
+    if match is not None and is_valid_check_digit(*match.groups()):
+        return f"b{match.group(1)}a"
+
+
+def scan_log(fh):
+    """
+    args:
+        fh: str, path to log file
+    return:
+        set of bib numbers in "b12345678a" format
+    """
+    bibNos = set()
+    with open(fh, "rb") as logfile:
+        try:
+            buffer = mmap.mmap(logfile.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # empty file
+            return bibNos
+        with buffer:
+            for match in BIB_404_RE.finditer(buffer):
+                digits, check_digit = match.group(1).decode(), match.group(2).decode()
+                if is_valid_check_digit(digits, check_digit):
+                    bibNos.add(f"b{digits}a")
+    return bibNos
+
+
+def scan_logs(fhs, workers=None):
+    """
+    scans log files in parallel
+    args:
+        fhs: list of paths to log files
+        workers: int, number of processes; None for number of CPUs,
+                 1 to scan in the current process
+    return:
+        set of bib numbers in "b12345678a" format
+    """
+    bibNos = set()
+    if workers == 1 or len(fhs) < 2:
+        for fh in fhs:
+            bibNos.update(scan_log(fh))
+        return bibNos
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for result in pool.map(scan_log, fhs):
+            bibNos.update(result)
+    return bibNos
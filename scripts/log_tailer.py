@@ -0,0 +1,119 @@
+"""
+Incremental reader of a growing, rotated log file.
+
+The position reached in the log (inode and byte offset) is kept in a small
+json state file, so a restarted job continues where the previous one
+stopped. When the log is rotated by logging.handlers.RotatingFileHandler
+(log -> log.1, new empty log) the rest of the rotated file is read first
+and reading continues from the start of the new log. Only complete lines
+are returned; a line still being written is read on the next call.
+"""
+import json
+import os
+
+
+READ_CHUNK_SIZE = 64 * 1024
+
+
+def load_state(state_fh):
+    try:
+        with open(state_fh, "r") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return dict(inode=None, offset=0)
+
+
+def save_state(state_fh, state):
+    """
+    atomically replaces the tailer state file
+    """
+    tmp_fh = f"{state_fh}.tmp"
+    with open(tmp_fh, "w") as file:
+        json.dump(state, file)
+    os.replace(tmp_fh, state_fh)
+
+
+def read_complete_lines(fh, offset, chunk_size=READ_CHUNK_SIZE):
+    """
+    reads the file in chunks, carrying the partial last line of a chunk
+    over to the next one
+    args:
+        fh: str, path to file
+        offset: int, byte offset to start from
+        chunk_size: int, number of bytes read at a time
+    return:
+        (lines, new offset) tuple; lines are decoded with surrogateescape
+    """
+    lines = []
+    partial = b""
+    with open(fh, "rb") as file:
+        file.seek(offset)
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            data = partial + chunk
+            end = data.rfind(b"\n") + 1
+            lines.extend(
+                line.decode("utf-8", errors="surrogateescape")
+                for line in data[:end].splitlines(keepends=True)
+            )
+            offset += end
+            partial = data[end:]
+    return lines, offset
+
+
+class LogTailer:
+    """
+    args:
+        log_fh: str, path to the active log file
+        state_fh: str, path to json file with the reached position
+    """
+
+    def __init__(self, log_fh, state_fh):
+        self.log_fh = log_fh
+        self.state_fh = state_fh
+        state = load_state(state_fh)
+        self.inode = state["inode"]
+        self.offset = state["offset"]
+        self._saved = (self.inode, self.offset)
+
+    def _rotated_fh(self):
+        # file the log was rotated to, if it is the one we were reading
+        rotated_fh = f"{self.log_fh}.1"
+        try:
+            if os.stat(rotated_fh).st_ino == self.inode:
+                return rotated_fh
+        except FileNotFoundError:
+            pass
+
+    def read_lines(self):
+        """
+        reads complete lines appended since the last call
+        return:
+            list of str
+        """
+        try:
+            stat = os.stat(self.log_fh)
+        except FileNotFoundError:
+            return []
+
+        lines = []
+        if self.inode is not None and stat.st_ino != self.inode:
+            rotated_fh = self._rotated_fh()
+            if rotated_fh is not None:
+                lines, _ = read_complete_lines(rotated_fh, self.offset)
+            self.offset = 0
+        elif stat.st_size < self.offset:
+            # truncated in place
+            self.offset = 0
+        self.inode = stat.st_ino
+
+        new_lines, self.offset = read_complete_lines(self.log_fh, self.offset)
+        return lines + new_lines
+
+    def save(self):
+        """
+        persists the position reached; call after the lines are processed;
+        the state file is written only when the position has changed
+        """
+        if (self.inode, self.offset) != self._saved:
+            save_state(self.state_fh, dict(inode=self.inode, offset=self.offset))
+            self._saved = (self.inode, self.offset)
@@ -9,7 +9,7 @@ from datetime import datetime, date
 from pymarc import Record, Field
 
 
-from utils import save2marc
+from utils import MarcWriter
 
 
 MapData = namedtuple(
@@ -263,12 +263,13 @@ def source_reader(fh: str):
 def create_bibs(src_fh: str, out_fh: str, start_sequence: int):
     reader = source_reader(src_fh)
     sequence = start_sequence
-    for row in reader:
-        s = determine_sequence(sequence)
-        bib = make_bib(row, s)
-        print(bib)
-        save2marc(out_fh, bib)
-        sequence += 1
+    with MarcWriter(out_fh) as writer:
+        for row in reader:
+            s = determine_sequence(sequence)
+            bib = make_bib(row, s)
+            print(bib)
+            writer.write(bib)
+            sequence += 1
 
 
 if __name__ == "__main__":
@@ -1,12 +1,16 @@
-from pymarc import MARCReader
+from marc_scanner import RecordFilter, scan
+from utils import CsvWriter
 
 
-from nyp_branch_dups_discovery import is_valid_bib_type
-from utils import save2csv
+# language material monographs in print (see
+# nyp_branch_dups_discovery.is_valid_bib_type) without research call number
+BRANCH_BIB_FILTER = RecordFilter(
+    leader={6: "a", 7: "m"}, control_fields={"008": {23: " d"}}, absent=["852"]
+)
 
 
 def has_research_callnum(bib):
-    if "852" in bib:
+    if bib.has_tag("852"):
         return True
     else:
         return False
@@ -30,28 +34,27 @@ def parse_bibNo(field):
     return bibNo
 
 
-def marc2list(src, dst):
-    with open(src, "rb") as f:
-        reader = MARCReader(f)
-        n = 0
-        for bib in reader:
-            n += 1
-            rec_type = bib.leader[6]
-            blvl = bib.leader[7]
-            item_form = bib["008"].data[23]
-            valid = is_valid_bib_type(rec_type, blvl, item_form)
-
-            if valid and not has_research_callnum(bib):
-                try:
-                    bibNo = bib["907"].value()
-                    bibNo = parse_bibNo(bibNo)
-                except AttributeError:
-                    raise (f"record {n} has no sierra bib number")
-
-                isbns = ""
-                isbns_data = []
-                for field in bib.get_fields("020"):
-                    isbns_data.append(field.value())
-                    isbns = extract_isbns(isbns_data)
-
-                save2csv(dst, [bibNo, isbns])
+def marc2list(src, dst, record_filter=BRANCH_BIB_FILTER):
+    """
+    saves bib numbers and ISBNs of records selected by record_filter to csv;
+    rejected records are skipped before any of their fields are decoded
+    args:
+        src: str, path to MARC file
+        dst: str, path to output csv file
+        record_filter: marc_scanner.RecordFilter
+    """
+    with CsvWriter(dst) as writer:
+        for bib in scan(src, record_filter):
+            try:
+                bibNo = bib.values("907")[0]
+                bibNo = parse_bibNo(bibNo)
+            except IndexError:
+                raise (f"record {bib.index} has no sierra bib number")
+
+            isbns = ""
+            isbns_data = []
+            for value in bib.values("020"):
+                isbns_data.append(value)
+                isbns = extract_isbns(isbns_data)
+
+            writer.writerow([bibNo, isbns])
@@ -0,0 +1,92 @@
+"""
+Parallel transformation of MARC files.
+
+The source file is split on record boundaries using the record length
+stored in the first five bytes of each leader, chunks of raw records are
+parsed and transformed in a process pool and the results are written to
+the destination file in the original order.
+"""
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import os
+
+from pymarc import Record
+
+try:
+    from scripts.marc_scanner import scan
+except ImportError:
+    from marc_scanner import scan
+
+
+def read_raw_records(fh):
+    """
+    reads binary MARC records without parsing them
+    args:
+        fh: str, path to MARC file
+    yields:
+        bytes, raw record
+    """
+    for record in scan(fh):
+        yield record.raw
+
+
+def read_chunks(fh, chunk_size=1000):
+    """
+    groups raw records into lists
+    args:
+        fh: str, path to MARC file
+        chunk_size: int, number of records in a chunk
+    yields:
+        list of bytes
+    """
+    chunk = []
+    for data in read_raw_records(fh):
+        chunk.append(data)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def transform_chunk(transform, chunk):
+    """
+    parses and transforms records of a chunk; runs in a worker process
+    args:
+        transform: callable, takes and returns pymarc.Record
+        chunk: list of bytes, raw records
+    return:
+        bytes, transformed records serialized to MARC
+    """
+    out = []
+    for data in chunk:
+        bib = transform(Record(data))
+        out.append(bib.as_marc())
+    return b"".join(out)
+
+
+def transform_file(src, dst, transform, workers=None, chunk_size=1000):
+    """
+    transforms records of a MARC file in a process pool
+    args:
+        src: str, path to source MARC file
+        dst: str, path to output MARC file (appended to)
+        transform: callable, module-level function that takes and
+                   returns pymarc.Record (use functools.partial for args)
+        workers: int, number of processes; defaults to number of CPUs
+        chunk_size: int, number of records sent to a worker at once
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    with ProcessPoolExecutor(max_workers=workers) as executor, open(
+        dst, "ab"
+    ) as marcfile:
+        # keep the number of chunks in memory bounded
+        pending = deque()
+        for chunk in read_chunks(src, chunk_size):
+            pending.append(executor.submit(transform_chunk, transform, chunk))
+            if len(pending) >= workers * 2:
+                marcfile.write(pending.popleft().result())
+        while pending:
+            marcfile.write(pending.popleft().result())
@@ -0,0 +1,255 @@
+"""
+Memory-mapped scanner of binary MARC files.
+
+Records are located by the record length in their leaders and returned as
+lightweight views over the mapped file. A view decodes its leader eagerly,
+its directory on first use and a field only when it is requested, so
+filtering a file on a few tags does not require a full pymarc parse of
+every record. Use `RecordView.as_record` when the whole record is needed.
+
+`scan` optionally takes a RecordFilter; its leader conditions are checked
+before a view is created and its tag and control field conditions before
+any variable field is decoded, so rejected records cost almost nothing.
+"""
+import mmap
+
+from pymarc import Record, marc8_to_unicode
+
+
+LEADER_LEN = 24
+DIRECTORY_ENTRY_LEN = 12
+SUBFIELD_INDICATOR = b"\x1f"
+
+
+class RecordView:
+    """
+    Read-only view of a single MARC record in transmission format
+    args:
+        data: memoryview or bytes, raw record
+        index: int, sequence number of the record in its file (1-based)
+    """
+
+    def __init__(self, data, index=None):
+        self.data = data
+        self.index = index
+        self.leader = bytes(data[:LEADER_LEN]).decode("ascii")
+        self._directory = None
+
+    @property
+    def directory(self):
+        """
+        dictionary of tags and (start, end) positions of their fields
+        """
+        if self._directory is None:
+            base_address = int(self.leader[12:17])
+            raw = bytes(self.data[LEADER_LEN : base_address - 1])
+            directory = dict()
+            entries_len = len(raw) - len(raw) % DIRECTORY_ENTRY_LEN
+            for n in range(0, entries_len, DIRECTORY_ENTRY_LEN):
+                tag = raw[n : n + 3].decode("ascii")
+                length = int(raw[n + 3 : n + 7])
+                start = base_address + int(raw[n + 7 : n + 12])
+                # drop the field terminator
+                directory.setdefault(tag, []).append((start, start + length - 1))
+            self._directory = directory
+        return self._directory
+
+    @property
+    def raw(self):
+        return bytes(self.data)
+
+    @property
+    def is_utf8(self):
+        return self.leader[9] == "a"
+
+    def has_tag(self, tag):
+        return tag in self.directory
+
+    def tags(self):
+        return list(self.directory.keys())
+
+    def _decode(self, data):
+        if self.is_utf8:
+            return data.decode("utf-8")
+        return marc8_to_unicode(data)
+
+    def control_field(self, tag):
+        """
+        returns data of the first occurrence of a control field
+        args:
+            tag: str, MARC tag (001-009)
+        return:
+            str or None
+        """
+        positions = self.directory.get(tag)
+        if positions:
+            start, end = positions[0]
+            data = bytes(self.data[start:end])
+            if self.is_utf8:
+                return data.decode("utf-8")
+            return data.decode("iso8859-1")
+
+    def subfields(self, tag):
+        """
+        decodes subfields of each occurrence of a variable field
+        args:
+            tag: str, MARC tag
+        return:
+            list of lists of (code, value) tuples
+        """
+        fields = []
+        for start, end in self.directory.get(tag, []):
+            subs = bytes(self.data[start:end]).split(SUBFIELD_INDICATOR)
+            field = []
+            for sub in subs[1:]:
+                if sub:
+                    field.append((sub[:1].decode("ascii"), self._decode(sub[1:])))
+            fields.append(field)
+        return fields
+
+    def values(self, tag):
+        """
+        returns values of each occurrence of a field formatted the same way
+        as pymarc's Field.value()
+        args:
+            tag: str, MARC tag
+        return:
+            list of str
+        """
+        if tag < "010" and tag.isdigit():
+            positions = self.directory.get(tag, [])
+            if not positions:
+                return []
+            return [self.control_field(tag)]
+        return [
+            " ".join(value.strip() for _, value in field)
+            for field in self.subfields(tag)
+        ]
+
+    def as_record(self):
+        """
+        parses the whole record
+        return:
+            pymarc.Record
+        """
+        return Record(self.raw)
+
+
+class RecordFilter:
+    """
+    Declarative filter of MARC records evaluated on raw record data
+    args:
+        leader: dict, leader positions and strings of allowed characters,
+                e.g. {6: "a", 7: "m"}
+        control_fields: dict, control field tags and dicts of positions and
+                strings of allowed characters, e.g. {"008": {23: " d"}}
+        present: list, tags that must be present in the record
+        absent: list, tags that must not be present in the record
+    """
+
+    def __init__(self, leader=None, control_fields=None, present=None, absent=None):
+        self.leader = leader or dict()
+        self.control_fields = control_fields or dict()
+        self.present = tuple(present or ())
+        self.absent = tuple(absent or ())
+
+    @staticmethod
+    def _match_positions(value, positions):
+        if value is None:
+            return False
+        for position, allowed in positions.items():
+            try:
+                if value[position] not in allowed:
+                    return False
+            except IndexError:
+                return False
+        return True
+
+    def matches_leader(self, leader):
+        """
+        args:
+            leader: str, record leader
+        return:
+            bool
+        """
+        return self._match_positions(leader, self.leader)
+
+    def matches_fields(self, record):
+        """
+        checks tag presence and control field values; uses only the
+        directory and control fields of the record
+        args:
+            record: RecordView
+        return:
+            bool
+        """
+        directory = record.directory
+        for tag in self.present:
+            if tag not in directory:
+                return False
+        for tag in self.absent:
+            if tag in directory:
+                return False
+        for tag, positions in self.control_fields.items():
+            if not self._match_positions(record.control_field(tag), positions):
+                return False
+        return True
+
+    def matches(self, record):
+        """
+        args:
+            record: RecordView
+        return:
+            bool
+        """
+        return self.matches_leader(record.leader) and self.matches_fields(record)
+
+
+def scan(fh, record_filter=None):
+    """
+    iterates over records of a MARC file without parsing them;
+    a yielded view is backed by the mapped file and is valid only until
+    the next record is requested (use `raw` or `as_record` to keep it)
+    args:
+        fh: str, path to MARC file
+        record_filter: RecordFilter, yields only matching records
+    yields:
+        RecordView
+    """
+    with open(fh, "rb") as marcfile:
+        try:
+            buffer = mmap.mmap(marcfile.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # empty file
+            return
+        with buffer:
+            view = memoryview(buffer)
+            data = None
+            try:
+                n = 0
+                offset = 0
+                size = len(buffer)
+                while offset < size:
+                    n += 1
+                    try:
+                        length = int(bytes(view[offset : offset + 5]))
+                    except ValueError:
+                        raise ValueError(f"Invalid record length at byte {offset}")
+                    if offset + length > size:
+                        raise ValueError("Truncated record at the end of file")
+                    if record_filter is not None:
+                        leader = bytes(view[offset : offset + LEADER_LEN])
+                        if not record_filter.matches_leader(leader.decode("ascii")):
+                            offset += length
+                            continue
+                    data = view[offset : offset + length]
+                    record = RecordView(data, n)
+                    if record_filter is None or record_filter.matches_fields(record):
+                        yield record
+                    data.release()
+                    data = None
+                    offset += length
+            finally:
+                if data is not None:
+                    data.release()
+                view.release()
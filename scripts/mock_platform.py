@@ -0,0 +1,277 @@
+"""
+Local stand-in for NYPL Platform API for load testing of the API clients.
+
+Serves fixture bibs and items from memory: the OAuth token endpoint,
+/bibs and /items queries (with limit/offset paging) and the
+/bibs/{source}/{id}, /bibs/{source}/{id}/items and /items/{source}/{id}
+lookups. Latency, server errors, throttling (429 with Retry-After) and
+token expiry can be injected; faults are drawn from a seeded random
+generator so runs are reproducible.
+
+    with MockPlatform(bibs, latency=0.05, throttle_rate=0.1) as server:
+        auth = AuthorizeAccess("id", "secret", server.url)
+        session = PlatformSession(server.base_url, TokenManager(auth))
+"""
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import random
+import secrets
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+
+API_PATH = "/api/v0.1"
+
+# query parameters and fields of records they filter on
+BIB_FILTERS = dict(
+    id="id", standardNumber="standardNumbers", controlNumber="controlNumber"
+)
+ITEM_FILTERS = dict(id="id", barcode="barcode", bibId="bibIds")
+
+
+def matches_values(record, field, values):
+    value = record.get(field)
+    if isinstance(value, list):
+        return not set(values).isdisjoint(value)
+    return value in values
+
+
+def matches_range(record, field, value):
+    # "[start,end]" inclusive range of ISO dates
+    start, end = value.strip("[]").split(",")
+    record_value = record.get(field)
+    return record_value is not None and start <= record_value <= end
+
+
+def filter_records(records, params, filters):
+    """
+    selects records matching Platform query parameters
+    args:
+        records: list of bib or item dicts
+        params: dict, query parameters with str values
+        filters: dict, query parameters and record fields
+    return:
+        list of dicts
+    """
+    selected = []
+    deleted = params.get("deleted", "false").lower() == "true"
+    for record in records:
+        if bool(record.get("deleted")) != deleted:
+            continue
+        matched = True
+        for param, value in params.items():
+            if param in filters:
+                matched = matches_values(record, filters[param], value.split(","))
+            elif param in ("createdDate", "updatedDate"):
+                matched = matches_range(record, param, value)
+            if not matched:
+                break
+        if matched:
+            selected.append(record)
+    return selected
+
+
+class PlatformRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # headers and body are sent in separate writes
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, data, headers=None):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.platform.record(status)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        if urlparse(self.path).path.rstrip("/").endswith("/oauth/token"):
+            self.send_json(200, self.server.platform.issue_token())
+        else:
+            self.send_json(404, dict(statusCode=404, type="error"))
+
+    def do_GET(self):
+        platform = self.server.platform
+        fault = platform.draw_fault()
+        if fault is not None:
+            self.send_json(*fault)
+            return
+        if not platform.is_authorized(self.headers.get("Authorization")):
+            self.send_json(401, dict(statusCode=401, type="error"))
+            return
+        url = urlparse(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        self.send_json(*platform.route(url.path, params))
+
+
+class MockPlatform:
+    """
+    Threaded HTTP server imitating NYPL Platform
+    args:
+        bibs: list of Platform bib dicts
+        items: list of Platform item dicts (with "bibIds")
+        latency: float, seconds added to each API request
+        error_rate: float, fraction of API requests answered with 500
+        throttle_rate: float, fraction of API requests answered with 429
+        retry_after: int, Retry-After seconds sent with 429 responses
+        token_ttl: int, lifetime of issued access tokens in seconds
+        seed: int, seed of fault injection
+        host: str
+        port: int, 0 picks a free port
+    """
+
+    def __init__(
+        self,
+        bibs=None,
+        items=None,
+        latency=0.0,
+        error_rate=0.0,
+        throttle_rate=0.0,
+        retry_after=1,
+        token_ttl=3600,
+        seed=0,
+        host="127.0.0.1",
+        port=0,
+    ):
+        self.bibs = list(bibs or [])
+        self.items = list(items or [])
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.token_ttl = token_ttl
+        self.stats = Counter()
+        self._bibs_by_id = {bib["id"]: bib for bib in self.bibs}
+        self._items_by_id = {item["id"]: item for item in self.items}
+        self._tokens = dict()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), PlatformRequestHandler)
+        self._server.daemon_threads = True
+        self._server.platform = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def base_url(self):
+        return self.url + API_PATH
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, args=(0.05,), daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def record(self, status):
+        with self._lock:
+            self.stats[status] += 1
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats.clear()
+
+    def issue_token(self):
+        token = secrets.token_hex(16)
+        with self._lock:
+            self._tokens[token] = time.monotonic() + self.token_ttl
+        return dict(access_token=token, expires_in=self.token_ttl)
+
+    def expire_tokens(self):
+        """
+        invalidates all issued tokens before their expiration
+        """
+        with self._lock:
+            self._tokens.clear()
+
+    def is_authorized(self, header):
+        if not header or not header.startswith("Bearer "):
+            return False
+        with self._lock:
+            expires = self._tokens.get(header[7:])
+        return expires is not None and expires > time.monotonic()
+
+    def draw_fault(self):
+        """
+        applies latency and draws an injected fault
+        return:
+            (status, data, headers) tuple or None
+        """
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            draw = self._random.random()
+        if draw < self.throttle_rate:
+            return (
+                429,
+                dict(statusCode=429, type="error"),
+                {"Retry-After": str(self.retry_after)},
+            )
+        if draw < self.throttle_rate + self.error_rate:
+            return 500, dict(statusCode=500, type="error")
+
+    def route(self, path, params):
+        """
+        args:
+            path: str, request path
+            params: dict, query parameters
+        return:
+            (status, data) tuple
+        """
+        if not path.startswith(API_PATH):
+            return 404, dict(statusCode=404, type="error")
+        parts = [part for part in path[len(API_PATH) :].split("/") if part]
+
+        if parts == ["bibs"]:
+            return self.page(filter_records(self.bibs, params, BIB_FILTERS), params)
+        if parts == ["items"]:
+            return self.page(filter_records(self.items, params, ITEM_FILTERS), params)
+        if len(parts) == 3 and parts[0] == "bibs":
+            return self.one(self._bibs_by_id.get(parts[2]))
+        if len(parts) == 4 and parts[0] == "bibs" and parts[3] == "items":
+            items = [item for item in self.items if parts[2] in item.get("bibIds", [])]
+            return self.page(items, dict())
+        if len(parts) == 3 and parts[0] == "items":
+            return self.one(self._items_by_id.get(parts[2]))
+        return 404, dict(statusCode=404, type="error")
+
+    @staticmethod
+    def page(records, params):
+        if not records:
+            return 404, dict(statusCode=404, type="error", message="Record not found")
+        offset = int(params.get("offset", 0))
+        limit = int(params.get("limit", len(records)))
+        data = records[offset : offset + limit]
+        return 200, dict(data=data, count=len(data), totalCount=len(records))
+
+    @staticmethod
+    def one(record):
+        if record is None:
+            return 404, dict(statusCode=404, type="error", message="Record not found")
+        return 200, dict(data=record, count=1)
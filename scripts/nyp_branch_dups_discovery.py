@@ -19,11 +19,17 @@ Issues:
 
 """
 
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 import csv
 import json
 import logging
 from logging.handlers import RotatingFileHandler
 
+from requests.adapters import HTTPAdapter
+from requests.exceptions import HTTPError
+
 
 from platform_bib_parser import (
     get_locations,
@@ -32,7 +38,10 @@ from platform_bib_parser import (
     get_blvl,
     get_encoding_level,
     get_isbns,
+    normalize_isbn,
+    get_item_count,
     get_item_form,
+    get_item_locations,
     has_branch_call_number,
     has_research_call_number,
     get_branch_call_number,
@@ -50,32 +59,84 @@ from platform_bib_parser import (
     has_subject_tags,
     is_dlc_record,
     get_timestamp,
+    parse_bib,
+)
+from bib_store import BibStore
+from checkpoint import ROW_COMMIT_INTERVAL, Checkpoint
+from clusters import cluster_ids
+from research_locations import LocationCodes
+from utils import CsvWriters, JsonlWriter, save2csv
+
+try:
+    from scripts.platform import (
+        PLATFORM_URL,
+        AuthorizeAccess,
+        PlatformSession,
+        TokenManager,
+    )
+except ImportError:
+    from platform import (
+        PLATFORM_URL,
+        AuthorizeAccess,
+        PlatformSession,
+        TokenManager,
+    )
+
+
+OCLC_REPORT = ".\\files\\reports\\former-mixed-bibs.REPORT_OCLC-NUMERS.csv"
+CALLNUM_CONFLICT_REPORT = ".\\files\\reports\\brief-bibs.REPORT_CALLNUM-CONFLICT.csv"
+TITLE_CONFLICT_REPORT = ".\\files\\reports\\brief-bibs.REPORT_TITLE-CONFLICT.csv"
+CONFIRMED_DUPS_REPORT = ".\\files\\reports\\brief-bibs.REPORT_CONFIRMED-DUPS.csv"
+EBOOKS_REPORT = "./files/reports/brief-bibs.REPORT_EBOOKS.csv"
+REPORTS = (
+    OCLC_REPORT,
+    CALLNUM_CONFLICT_REPORT,
+    TITLE_CONFLICT_REPORT,
+    CONFIRMED_DUPS_REPORT,
+    EBOOKS_REPORT,
 )
-from platform import AuthorizeAccess, PlatformSession, platform_status_interpreter
-from research_locations import RES_CODES
-from utils import save2csv
 
 
-# set up logger
-log_console_format = "[%(levelname)s]: %(message)s"
+LOG_CONSOLE_FORMAT = "[%(levelname)s]: %(message)s"
+LOG_FILE_FORMAT = (
+    "[%(levelname)s] - %(asctime)s - %(name)s - : %(message)s "
+    "in %(filename)s:%(lineno)d"
+)
 
 logger = logging.getLogger("my_logger")
-logger.setLevel(logging.DEBUG)
 
-console_handler = logging.StreamHandler()
-console_handler.setFormatter(logging.Formatter(log_console_format))
+# replace with load_location_codes to use codes from a config file
+location_codes = LocationCodes()
 
-file_handler = RotatingFileHandler(
-    ".\\logs\\dedup.log", maxBytes=1024 * 1024, backupCount=10
-)
-formatter = logging.Formatter(
-    "[%(levelname)s] - %(asctime)s - %(name)s - : %(message)s in %(filename)s:%(lineno)d"
-)
-file_handler.setFormatter(formatter)
 
-logger.handlers.clear()
-logger.addHandler(console_handler)
-# logger.addHandler(file_handler)
+def load_location_codes(fh):
+    """
+    replaces research and e-book location codes with codes from a json file
+    args:
+        fh: str, path to json config, see research_locations.LocationCodes
+    """
+    global location_codes
+    location_codes = LocationCodes.from_file(fh)
+
+
+def setup_logging(level=logging.INFO, log_fh=None):
+    """
+    configures dedup logger; called by scripts, not on import
+    args:
+        level: int, logging level
+        log_fh: str, optional rotating log file, e.g. ".\\logs\\dedup.log"
+    """
+    logger.setLevel(level)
+    logger.handlers.clear()
+
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(logging.Formatter(LOG_CONSOLE_FORMAT))
+    logger.addHandler(console_handler)
+
+    if log_fh is not None:
+        file_handler = RotatingFileHandler(log_fh, maxBytes=1024 * 1024, backupCount=10)
+        file_handler.setFormatter(logging.Formatter(LOG_FILE_FORMAT))
+        logger.addHandler(file_handler)
 
 
 def is_valid_bib_type(rec_type, blvl, item_form):
@@ -119,86 +180,80 @@ def score_record_level(bib):
         return 0
 
 
+def has_no_research_items(bib):
+    # bibs without fetched items or without any items are not rewarded
+    if not get_item_count(bib):
+        return False
+    has_research_loc, _ = location_codes.classify_items(get_item_locations(bib))
+    return not has_research_loc
+
+
 def score_isbns(bib):
     isbns = get_isbns(bib)
     return len(isbns)
 
 
-def determine_records_score(bibs):
-    bib_scores = dict()
-    for bid, bib in bibs.items():
-        logger.debug(f"Analyzing score of bib b{bid}a")
-        score = 0
-        if not is_marked_for_deletion(bib):
-            logger.debug(f"b{bid}a +1 (not marked for del)")
-            score += 2
-
-        if has_call_number(bib):
-            logger.debug(f"b{bid}a +1 (has call num)")
-            score += 2
-
-        if has_oclc_number(bib):
-            logger.debug(f"b{bid}a +1 (has oclc num)")
-            score += 2
-
-        if has_lc_number(bib):
-            logger.debug(f"b{bid}a +1 (has lc num)")
-            score += 1
-
-        if has_082_tag(bib):
-            logger.debug(f"b{bid}a +1 (has 082)")
-            score += 1
-
-        if has_050_tag(bib):
-            logger.debug(f"b{bid}a +1 (has 050)")
-            score += 1
-
-        if has_505_tag(bib):
-            logger.debug(f"b{bid}a +1 (has 505)")
-            score += 1
-
-        if has_520_tag(bib):
-            logger.debug(f"b{bid}a +1 (has 520)")
-            score += 1
-
-        if has_national_library_authentication_code(bib):
-            logger.debug(f"b{bid}a +1 (is PCC)")
-            score += 2
-
-        if is_dlc_record(bib):
-            logger.debug(f"b{bid}a +1 (is DLC)")
-            score += 2
-
-        if has_subject_tags(bib):
-            logger.debug(f"b{bid}a +1 (has subjects)")
-            score += 1
-
-        rec_lvl_score = score_record_level(bib)
-        logger.debug(f"b{bid}a +{rec_lvl_score} (level score)")
-        score += rec_lvl_score
-
-        isbn_score = score_isbns(bib)
-        logger.debug(f"b{bid}a + {isbn_score} (isbn score)")
-
-        bib_scores[bid] = score
-
-    # take into consideration record updates
+# (rule name, points, feature); a feature maps a ParsedBib to a bool or int
+# which is multiplied by the points of the rule
+SCORING_RULES = (
+    ("not marked for del", 2, lambda bib: not is_marked_for_deletion(bib)),
+    ("has call num", 2, has_call_number),
+    ("has oclc num", 2, has_oclc_number),
+    ("has lc num", 1, has_lc_number),
+    ("has 082", 1, has_082_tag),
+    ("has 050", 1, has_050_tag),
+    ("has 505", 1, has_505_tag),
+    ("has 520", 1, has_520_tag),
+    ("is PCC", 2, has_national_library_authentication_code),
+    ("is DLC", 2, is_dlc_record),
+    ("has subjects", 1, has_subject_tags),
+    ("level score", 1, score_record_level),
+    # item rules score only when items were fetched (see ItemEnricher)
+    ("has items", 2, lambda bib: bool(get_item_count(bib))),
+    ("no research items", 1, has_no_research_items),
+    # reported in the breakdown only, does not count towards the score
+    ("isbn score", 0, score_isbns),
+)
+NEWEST_RULE = ("newest", 1)
+SCORING_RULE_NAMES = tuple(rule[0] for rule in SCORING_RULES) + (NEWEST_RULE[0],)
+
+
+def score_breakdown(bibs):
+    """
+    evaluates SCORING_RULES over a group of duplicate bibs; the last column
+    marks the most recently updated bibs of the group
+    args:
+        bibs: dict, bib numbers and bibs
+    return:
+        dict of bib numbers and lists of points in SCORING_RULE_NAMES order
+    """
+    breakdown = dict()
     timestamps = dict()
     for bid, bib in bibs.items():
-        timestamp = get_timestamp(bib)
-        timestamps[bid] = timestamp
-    logger.debug(f"Timestamps: {timestamps}")
+        bib = parse_bib(bib)
+        breakdown[bid] = [
+            points * int(feature(bib)) for _, points, feature in SCORING_RULES
+        ]
+        timestamps[bid] = get_timestamp(bib)
 
-    ord_timestamps = sorted(timestamps.values(), reverse=True)
-    logger.debug(f"Ordered timestamps: {ord_timestamps}")
-    newest_timestamp = ord_timestamps[0]
+    # take into consideration record updates
+    newest_timestamp = max(timestamps.values(), default=None)
     for bid, timestamp in timestamps.items():
-        if timestamp == newest_timestamp:
-            score = bib_scores[bid]
-            bib_scores[bid] = score + 1
-            logger.debug(f"b{bid}a + 1 (newest)")
-
-    return bib_scores
+        breakdown[bid].append(NEWEST_RULE[1] if timestamp == newest_timestamp else 0)
+    return breakdown
+
+
+def determine_records_score(bibs, breakdown=None):
+    if breakdown is None:
+        breakdown = score_breakdown(bibs)
+    if logger.isEnabledFor(logging.DEBUG):
+        for bid, points in breakdown.items():
+            logger.debug(
+                "b%sa score breakdown: %s",
+                bid,
+                dict(zip(SCORING_RULE_NAMES, points)),
+            )
+    return {bid: sum(points) for bid, points in breakdown.items()}
 
 
 def highest_score(bib_scores):
@@ -208,15 +263,16 @@ def highest_score(bib_scores):
             return k
 
 
-def create_dup_report(dup_bibs):
+def create_dup_report(dup_bibs, reports=None, trace=None):
+    save = reports.writerow if reports is not None else save2csv
 
-    oclc_fh = ".\\files\\reports\\former-mixed-bibs.REPORT_OCLC-NUMERS.csv"
-
-    logger.info(f"Branch duplicates: {dup_bibs.keys()}")
-    bibs_scores = determine_records_score(dup_bibs)
-    logger.info(f"Records scores : {bibs_scores}")
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("Branch duplicates: %s", list(dup_bibs))
+    breakdown = score_breakdown(dup_bibs)
+    bibs_scores = determine_records_score(dup_bibs, breakdown)
+    logger.info("Records scores : %s", bibs_scores)
     dst_bid = highest_score(bibs_scores)
-    logger.info(f"Best record: b{dst_bid}a")
+    logger.info("Best record: b%sa", dst_bid)
 
     dst_bib = dup_bibs[dst_bid]
     dst_callnum = get_branch_call_number(dst_bib)
@@ -225,11 +281,12 @@ def create_dup_report(dup_bibs):
     # save for later OCLC holdings cleanup
     oclc_no = get_oclc_number(dst_bib)
     if oclc_no is not None:
-        save2csv(oclc_fh, [oclc_no])
+        save(OCLC_REPORT, [oclc_no])
 
+    decisions = {dst_bid: "destination"}
     del dup_bibs[dst_bid]
 
-    logger.info(f"Destination bib call number: {dst_callnum}")
+    logger.info("Destination bib call number: %s", dst_callnum)
     for bid, bib in dup_bibs.items():
         callnum = get_branch_call_number(bib)
         title = get_normalized_title(bib)
@@ -237,70 +294,68 @@ def create_dup_report(dup_bibs):
         # save involved oclc number for later cleanup of OCLC holdings
         oclc_no = get_oclc_number(bib)
         if oclc_no is not None:
-            save2csv(oclc_fh, [oclc_no])
+            save(OCLC_REPORT, [oclc_no])
 
         if has_call_number_conflict(dst_callnum, callnum):
-            logger.info(f"Call number conflict: {dst_callnum} vs {callnum}")
+            logger.info("Call number conflict: %s vs %s", dst_callnum, callnum)
+            decisions[bid] = "call number conflict"
 
-            save2csv(
-                ".\\files\\reports\\brief-bibs.REPORT_CALLNUM-CONFLICT.csv",
+            save(
+                CALLNUM_CONFLICT_REPORT,
                 [f"b{dst_bid}a", f"b{bid}a", dst_callnum, callnum, "awaiting"],
             )
 
         elif has_title_discrepancies(dst_bib, bib):
-            logger.info(f"Title conflict: b{dst_bid}a-b{bid}a")
+            logger.info("Title conflict: b%sa-b%sa", dst_bid, bid)
+            decisions[bid] = "title conflict"
 
-            save2csv(
-                ".\\files\\reports\\brief-bibs.REPORT_TITLE-CONFLICT.csv",
+            save(
+                TITLE_CONFLICT_REPORT,
                 [f"b{dst_bid}a", f"b{bid}a", dst_title, title, "awaiting"],
             )
         else:
-            logger.info(f"Clean duplicates: b{dst_bid}a-b{bid}a")
+            logger.info("Clean duplicates: b%sa-b%sa", dst_bid, bid)
+            decisions[bid] = "duplicate"
 
-            save2csv(
-                ".\\files\\reports\\brief-bibs.REPORT_CONFIRMED-DUPS.csv",
+            save(
+                CONFIRMED_DUPS_REPORT,
                 [f"b{dst_bid}a", f"b{bid}a", dst_callnum, callnum, "awaiting"],
             )
 
+    if trace is not None:
+        for bid, decision in decisions.items():
+            trace.write(
+                dict(
+                    bid=f"b{bid}a",
+                    library="branches",
+                    decision=decision,
+                    destination=f"b{dst_bid}a",
+                    score=bibs_scores[bid],
+                    components=dict(zip(SCORING_RULE_NAMES, breakdown[bid])),
+                )
+            )
+
 
 def has_research_location(record):
-    for loc in get_locations(record):
-        if loc in RES_CODES:
-            return True
+    return location_codes.classify(get_locations(record))[0]
 
 
 def has_only_branch_locations(record):
-    only_branches = True
-    for loc in get_locations(record):
-        if loc in RES_CODES:
-            only_branches = False
-    return only_branches
+    return not has_research_location(record)
 
 
 def has_ebook_location(record):
-    if "ia" in get_locations(record):
-        return True
-    else:
-        return False
+    return location_codes.classify(get_locations(record))[1]
 
 
 def identify_library(record):
-    research = False
-    branches = False
+    logger.debug("Idenfifying record b%sa.", get_bibNo(record))
 
-    bid = get_bibNo(record)
-    logger.debug(f"Idenfifying record b{bid}a.")
-
-    if has_research_call_number(record):
-        research = True
-    if has_research_location(record):
-        research = True
-    if has_branch_call_number(record):
-        branches = True
-    if has_only_branch_locations(record):
-        branches = True
-
-    if has_ebook_location(record):
+    has_research_loc, has_ebook_loc = location_codes.classify(get_locations(record))
+    research = has_research_loc or has_research_call_number(record)
+    branches = not has_research_loc or has_branch_call_number(record)
+
+    if has_ebook_loc:
         library = "neutral"
     elif research is True and branches is not True:
         library = "research"
@@ -314,77 +369,495 @@ def identify_library(record):
     return library
 
 
-def parse_results(matched_records):
+def is_branch_candidate(record, save=save2csv, trace=None):
+    """
+    checks if bib is a print branch bib that can be merged;
+    identified ebooks are saved to a separate report
+    args:
+        record: ParsedBib
+        save: callable, writes a report row (save2csv signature)
+        trace: utils.JsonlWriter, optional decision trace of rejected bibs
+    return:
+        bool
+    """
+    bid = get_bibNo(record)
+    rec_type = get_rec_type(record)
+    blvl = get_blvl(record)
+    item_form = get_item_form(record)
+    library = identify_library(record)
+    logger.debug("Record b%sa identified as %s.", bid, library)
+
+    # check if ebook and save for separate report
+    if is_ebook(rec_type, blvl, item_form):
+        isbns = get_isbns(record)
+        logger.info("Identified ebook: bid: b%sa , isbns=%s", bid, isbns)
+        save(
+            EBOOKS_REPORT,
+            [f"b{bid}a", ",".join(isbns)],
+        )
+        decision = "ebook"
+    elif library != "branches":
+        logger.info("Rejecting wrong library bib: b%sa identified as %s.", bid, library)
+        decision = "wrong library"
+    elif not is_valid_bib_type(rec_type, blvl, item_form):
+        logger.info("Rejecting invalid item format bib b%sa", bid)
+        decision = "invalid item format"
+    elif is_marked_for_deletion(record):
+        logger.info("Rejecting marked for deletion bib b%sa", bid)
+        decision = "marked for deletion"
+    else:
+        return True
+
+    if trace is not None:
+        trace.write(dict(bid=f"b{bid}a", library=library, decision=decision))
+    return False
+
+
+def trace_unique(bid, trace=None):
+    """
+    records a branch bib with no duplicates in the decision trace
+    """
+    if trace is not None:
+        trace.write(dict(bid=f"b{bid}a", library="branches", decision="unique"))
+
+
+def parse_results(matched_records, reports=None, trace=None, enricher=None):
     # reject bibs with call number issues
     # reject mixed and research bibs
 
+    save = reports.writerow if reports is not None else save2csv
+
     branch_matches = dict()
     matched_bids = []
     for record in matched_records:
-        bid = get_bibNo(record)
-        rec_type = get_rec_type(record)
-        blvl = get_blvl(record)
-        item_form = get_item_form(record)
-        isbns = get_isbns(record)
-        library = identify_library(record)
-        logger.debug(f"Record b{bid}a identified as {library}.")
-
-        # check if ebook and save for separate report
-        if is_ebook(rec_type, blvl, item_form):
-            logger.info(f"Identified ebook: bid: b{bid}a , isbns={isbns}")
-            save2csv(
-                "./files/reports/brief-bibs.REPORT_EBOOKS.csv",
-                [f"b{bid}a", ",".join(isbns)],
-            )
-        elif library != "branches":
-            logger.info(
-                f"Rejecting wrong library bib: b{bid}a identified as {library}."
-            )
-        elif not is_valid_bib_type(rec_type, blvl, item_form):
-            logger.info(f"Rejecting invalid item format bib b{bid}a")
-        elif is_marked_for_deletion(record):
-            logger.info(f"Rejecting marked for deletion bib b{bid}a")
-        else:
+        record = parse_bib(record)
+        if is_branch_candidate(record, save, trace):
+            bid = get_bibNo(record)
             branch_matches[bid] = record
             matched_bids.append(bid)
 
-    logger.info(f"Found {len(matched_bids)} branch matches.")
+    logger.info("Found %s branch matches.", len(matched_bids))
     if len(matched_bids) > 1:
-        create_dup_report(branch_matches)
+        if enricher is not None:
+            enricher.enrich(branch_matches)
+        create_dup_report(branch_matches, reports, trace)
         # raise Exception("The END")
-
-
-def query_platform(src, token):
+    else:
+        for bid in matched_bids:
+            trace_unique(bid, trace)
+
+
+def duplicate_keys(record):
+    """
+    identifiers shared by duplicate bibs
+    args:
+        record: ParsedBib
+    return:
+        list of (kind, value) tuples
+    """
+    keys = [("isbn", isbn) for isbn in get_isbns(record) or []]
+    oclc_no = get_oclc_number(record)
+    if oclc_no is not None:
+        keys.append(("oclc", oclc_no))
+    return keys
+
+
+def candidate_keys(records, save, trace=None):
+    """
+    args:
+        records: iterable of bibs (dict or ParsedBib)
+        save: callable, report writer of rejected bibs
+        trace: utils.JsonlWriter, optional decision trace
+    yields:
+        (bid, duplicate keys) tuples of branch candidates
+    """
+    for record in records:
+        record = parse_bib(record)
+        if is_branch_candidate(record, save, trace):
+            yield get_bibNo(record), duplicate_keys(record)
+
+
+def report_clusters(store, reports=None, trace=None, enricher=None):
+    """
+    batch mode: groups all candidate bibs into clusters of duplicates
+    connected by shared ISBNs or OCLC numbers and reports each cluster once;
+    only bib numbers and keys are kept while clustering, bibs of each
+    cluster are read from the store when the cluster is reported
+    args:
+        store: bib_store.BibStore
+        reports: utils.CsvWriters
+        trace: utils.JsonlWriter, optional decision trace
+        enricher: ItemEnricher, optional; fetches items before scoring
+    return:
+        int, number of reported clusters
+    """
+    save = reports.writerow if reports is not None else save2csv
+
+    clusters = cluster_ids(candidate_keys(store.all_bibs(), save, trace))
+    n = 0
+    for cluster in clusters:
+        if len(cluster) > 1:
+            dup_bibs = {bid: store.get_bib(bid) for bid in cluster}
+            if enricher is not None:
+                enricher.enrich(dup_bibs)
+            create_dup_report(dup_bibs, reports, trace)
+            n += 1
+        else:
+            trace_unique(cluster[0], trace)
+    logger.info("Reported %s clusters of duplicates.", n)
+    return n
+
+
+def cluster_store(store_fh, trace_fh=None):
+    """
+    reports duplicates among all bibs of a local snapshot
+    args:
+        store_fh: str, path to bib_store.BibStore database
+        trace_fh: str, optional JSON lines decision trace
+    """
+    with BibStore(store_fh) as store, CsvWriters() as reports, open_trace(
+        trace_fh
+    ) as trace:
+        report_clusters(store, reports, trace)
+
+
+def source_rows(src):
+    """
+    reads source csv created by marc_parser.marc2list
+    args:
+        src: str, path to csv file with bib numbers and ISBNs
+    yields:
+        (sbid, isbns) tuple
+    """
+    with open(src, "r") as src_file:
+        reader = csv.reader(src_file)
+        for row in reader:
+            sbid = f"{row[0][:-1]}a"
+            isbns = row[1].split(",")
+            if isbns != [""]:
+                yield sbid, isbns
+            else:
+                logger.info("Skipping query - no ISBN in the source.")
+
+
+def plan_batches(rows, max_keywords=1, max_length=1500):
+    """
+    packs ISBNs of consecutive source rows into batches for a single
+    standardNumber query; a row is never split between batches
+    args:
+        rows: iterable of (sbid, isbns) tuples
+        max_keywords: int, max number of ISBNs in one query
+        max_length: int, max length of comma-joined ISBNs in one query
+    yields:
+        list of (sbid, isbns) tuples
+    """
+    batch = []
+    keywords = 0
+    length = 0
+    for sbid, isbns in rows:
+        row_length = len(",".join(isbns))
+        if batch and (
+            keywords + len(isbns) > max_keywords
+            or length + 1 + row_length > max_length
+        ):
+            yield batch
+            batch = []
+            keywords = 0
+            length = 0
+        batch.append((sbid, isbns))
+        keywords += len(isbns)
+        length += row_length + (1 if length else 0)
+    if batch:
+        yield batch
+
+
+def query_batch(session, isbns, limit=50):
+    """
+    queries Platform for bibs with given ISBNs paging through all results;
+    without a request executor an error response (429, 5xx) is logged and
+    ends the query with the bibs found so far, with one it is raised once
+    retries are exhausted
+    args:
+        session: PlatformSession
+        isbns: list, ISBNs to query
+        limit: int, page size
+    return:
+        list of ParsedBib
+    """
+    matched_bibs = []
+    seen = set()
+    try:
+        for mbib in session.iter_bibs(limit=limit, standardNumber=isbns):
+            mbib = parse_bib(mbib)
+            mbid = get_bibNo(mbib)
+            if mbid not in seen:
+                seen.add(mbid)
+                matched_bibs.append(mbib)
+    except HTTPError as exc:
+        if session.executor is not None:
+            raise
+        logger.warning("Platform query for %s failed: %s", isbns, exc)
+    return matched_bibs
+
+
+def find_matches(session, batch, limit=50):
+    """
+    queries Platform once for a batch of source rows and assigns returned
+    bibs back to source rows by shared standard numbers, compared
+    in normalized form (see normalize_isbn)
+    args:
+        session: PlatformSession
+        batch: list of (sbid, isbns) tuples
+        limit: int, page size
+    return:
+        list of (sbid, matched_bibs) tuples in batch order
+    """
+    isbns = []
+    for sbid, row_isbns in batch:
+        logger.info("%s request for isbns: %s", sbid, row_isbns)
+        for isbn in row_isbns:
+            if isbn not in isbns:
+                isbns.append(isbn)
+
+    matched = query_batch(session, isbns, limit)
+
+    results = []
+    matched_isbns = [
+        {normalize_isbn(isbn) for isbn in get_isbns(mbib) or []} for mbib in matched
+    ]
+    for sbid, row_isbns in batch:
+        row_isbns = {normalize_isbn(isbn) for isbn in row_isbns}
+        matched_bibs = [
+            mbib
+            for mbib, isbns in zip(matched, matched_isbns)
+            if not row_isbns.isdisjoint(isbns)
+        ]
+        if logger.isEnabledFor(logging.DEBUG):
+            for mbib in matched_bibs:
+                logger.debug(
+                    "Source bib: %s, matched bib: b%sa matched locations: %s",
+                    sbid,
+                    get_bibNo(mbib),
+                    get_locations(mbib),
+                )
+        logger.debug("Found %s matches for %s.", len(matched_bibs), sbid)
+        results.append((sbid, matched_bibs))
+    return results
+
+
+def fetch_matches(session, rows, workers=1, max_keywords=1):
+    """
+    runs find_matches for batches of source rows keeping up to `workers`
+    queries in flight; results are yielded in the source order
+    args:
+        session: PlatformSession
+        rows: iterable of (sbid, isbns) tuples
+        workers: int, number of concurrent queries
+        max_keywords: int, max number of ISBNs sent in one query
+    yields:
+        (sbid, matched_bibs) tuple
+    """
+    batches = plan_batches(rows, max_keywords)
+    if workers <= 1:
+        for batch in batches:
+            yield from find_matches(session, batch)
+        return
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for batch in batches:
+            pending.append(executor.submit(find_matches, session, batch))
+            if len(pending) >= workers * 2:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+class ItemEnricher:
+    """
+    Fetches items of duplicate bibs concurrently and attaches them to
+    the bibs for scoring; only item ids and locations are kept, and items
+    of the `cache_size` most recently enriched bibs are not fetched again
+    args:
+        session: PlatformSession, with connection pool sized for workers
+        workers: int, number of concurrent item requests
+        cache_size: int, number of bibs whose items are cached
+    """
+
+    def __init__(self, session, workers=4, cache_size=10000):
+        self.session = session
+        self.workers = workers
+        self.cache_size = cache_size
+        self._items = OrderedDict()
+        self._pool = ThreadPoolExecutor(max_workers=workers)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self._pool.shutdown()
+
+    def fetch(self, bid):
+        """
+        args:
+            bid: str, bib number
+        return:
+            list of item dicts reduced to their id and location
+        """
+        response = self.session.get_bibItems(bid)
+        if response.status_code == 404:
+            return []
+        response.raise_for_status()
+        return [
+            dict(id=item.get("id"), location=item.get("location"))
+            for item in response.json()["data"]
+        ]
+
+    def enrich(self, bibs):
+        """
+        args:
+            bibs: dict, bib numbers and ParsedBibs; items are set in place
+        """
+        missing = [bid for bid in bibs if bid not in self._items]
+        fetched = dict(zip(missing, self._pool.map(self.fetch, missing)))
+        for bid, bib in bibs.items():
+            if bid in fetched:
+                bib.items = fetched[bid]
+            else:
+                bib.items = self._items[bid]
+            self._items[bid] = bib.items
+            self._items.move_to_end(bid)
+            if len(self._items) > self.cache_size:
+                self._items.popitem(last=False)
+            logger.debug("b%sa has %s items.", bid, len(bib.items))
+
+
+def open_trace(trace_fh=None):
+    """
+    opens decision trace; a no-op context when trace_fh is None
+    """
+    if trace_fh is None:
+        return nullcontext()
+    return JsonlWriter(trace_fh)
+
+
+def run_dedup(
+    session,
+    src,
+    workers=1,
+    max_keywords=1,
+    journal_fh=None,
+    trace_fh=None,
+    item_workers=0,
+):
+    """
+    finds and reports duplicates of each source bib
+    args:
+        session: PlatformSession or bib_store.BibStore
+        src: str, path to csv file with bib numbers and ISBNs
+        workers: int, number of concurrent queries
+        max_keywords: int, max number of ISBNs packed into one query;
+                      ISBNs of several source rows are batched when > 1
+        journal_fh: str, optional checkpoint journal; a rerun with the same
+                    journal resumes after the last processed source row
+        trace_fh: str, optional JSON lines trace of decisions made for
+                  each matched bib
+        item_workers: int, number of concurrent item requests of duplicates;
+                      0 scores bibs without their items
+    """
+    checkpoint = None
+    if journal_fh is not None:
+        outputs = REPORTS if trace_fh is None else REPORTS + (trace_fh,)
+        checkpoint = Checkpoint(journal_fh, outputs, ROW_COMMIT_INTERVAL)
+        logger.info("Resuming after %s source rows.", checkpoint.position)
+
+    items = nullcontext()
+    if item_workers:
+        items = ItemEnricher(session, item_workers)
+
+    with CsvWriters() as reports, open_trace(trace_fh) as trace, items as enricher:
+
+        def flush_outputs():
+            reports.flush()
+            if trace is not None:
+                trace.flush()
+
+        rows = source_rows(src)
+        if checkpoint is not None:
+            rows = checkpoint.skip(rows)
+        for sbid, matched_bibs in fetch_matches(session, rows, workers, max_keywords):
+            parse_results(matched_bibs, reports, trace, enricher)
+            if checkpoint is not None:
+                checkpoint.commit(sbid, flush_outputs)
+        if checkpoint is not None:
+            checkpoint.save(flush_outputs)
+
+
+def query_platform(
+    src,
+    token,
+    workers=1,
+    max_keywords=1,
+    cache=None,
+    journal_fh=None,
+    executor=None,
+    trace_fh=None,
+    base_url=PLATFORM_URL,
+    item_workers=0,
+):
+    """
+    searches Platform for duplicates of each source bib and reports them
+    args:
+        src: str, path to csv file with bib numbers and ISBNs
+        token: dict, Platform access token, or platform.TokenManager
+               to refresh the token automatically during long runs
+        workers: int, number of concurrent Platform queries
+        max_keywords: int, max number of ISBNs packed into one query;
+                      ISBNs of several source rows are batched when > 1
+        cache: platform_cache.ResponseCache, optional response cache
+        journal_fh: str, optional checkpoint journal; a rerun with the same
+                    journal resumes after the last processed source row
+        executor: platform_executor.RequestExecutor, optional retries,
+                  rate limiting and circuit breaker
+        trace_fh: str, optional JSON lines decision trace
+        base_url: str, Platform API url (e.g. of mock_platform.MockPlatform)
+        item_workers: int, number of concurrent item requests used to score
+                      duplicates by their items; 0 disables item enrichment
+    """
     with PlatformSession(
-        base_url="https://platform.nypl.org/api/v0.1", token=token
+        base_url=base_url,
+        token=token,
+        cache=cache,
+        executor=executor,
     ) as session:
+        connections = workers + item_workers
+        if connections > 1:
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=connections)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
         logger.info("Platform session open.")
-        with open(src, "r") as src_file:
-            reader = csv.reader(src_file)
-            for row in reader:
-                sbid = f"{row[0][:-1]}a"
-                isbns = row[1].split(",")
-                if isbns != [""]:
-                    logger.info(f"{sbid} request for isbns: {isbns}")
-                    res = session.query_bibStandardNo(isbns)
-                    status = platform_status_interpreter(res)
-                    logger.info(f"Platform response for bib {sbid}: {status}")
-
-                    matched_bibs = []
-                    if status == "hit":
-                        for mbib in res.json()["data"]:
-                            mbid = get_bibNo(mbib)
-                            locs = get_locations(mbib)
-                            logger.debug(
-                                f"Source bib: {sbid}, matched bib: b{mbid}a matched locations: {locs}"
-                            )
-
-                            matched_bibs.append(mbib)
-
-                    logger.debug(f"Found {len(matched_bibs)} matches for {sbid}.")
-                    parse_results(matched_bibs)
-                else:
-                    logger.info("Skipping query - no ISBN in the source.")
+        run_dedup(
+            session, src, workers, max_keywords, journal_fh, trace_fh, item_workers
+        )
+
+
+def query_store(src, store_fh, max_keywords=1, journal_fh=None, trace_fh=None):
+    """
+    searches local bib snapshot for duplicates of each source bib
+    and reports them
+    args:
+        src: str, path to csv file with bib numbers and ISBNs
+        store_fh: str, path to bib_store.BibStore database
+        max_keywords: int, max number of ISBNs looked up at once
+        journal_fh: str, optional checkpoint journal
+        trace_fh: str, optional JSON lines decision trace
+    """
+    with BibStore(store_fh) as store:
+        logger.info("Bib store open (%s bibs).", len(store))
+        run_dedup(store, src, 1, max_keywords, journal_fh, trace_fh)
 
 
 if __name__ == "__main__":
@@ -406,5 +879,6 @@ if __name__ == "__main__":
         oauth_server="https://isso.nypl.org",
     )
 
-    token = auth.get_token()
-    query_platform(dst, token)
+    setup_logging()
+    token = TokenManager(auth)
+    query_platform(dst, token, workers=4, max_keywords=40, item_workers=4)
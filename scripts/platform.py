@@ -1,8 +1,15 @@
 import requests
 from requests.exceptions import ConnectionError, Timeout
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+import threading
 
 from errors import APITokenError, APITokenExpiredError
+from platform_cache import CachedSessionMixin
+from platform_executor import ExecutorSessionMixin
+
+
+PLATFORM_URL = "https://platform.nypl.org/api/v0.1"
 
 
 class AuthorizeAccess:
@@ -64,39 +71,221 @@ class AuthorizeAccess:
             )
 
 
-class PlatformSession(requests.Session):
+class TokenManager:
+    """
+    provides valid Platform access tokens to sessions;
+    obtains a new token from AuthorizeAccess before the current one
+    expires and can be shared by sessions used in several threads
+    args:
+        auth: AuthorizeAccess
+        margin: int, seconds before expiration when token is refreshed
+    """
+
+    def __init__(self, auth, margin=60):
+        self.auth = auth
+        self.margin = timedelta(seconds=margin)
+        self._token = None
+        self._lock = threading.Lock()
+
+    @property
+    def token(self):
+        with self._lock:
+            if (
+                self._token is None
+                or self._token.get("expires_on") - self.margin < datetime.now()
+            ):
+                self._token = self.auth.get_token()
+            return self._token
+
+    def refresh(self, stale_token=None):
+        """
+        forces new token unless another thread already replaced
+        the stale one
+        args:
+            stale_token: dict, token rejected by Platform
+        return:
+            token dict
+        """
+        with self._lock:
+            if stale_token is None or self._token is stale_token:
+                self._token = self.auth.get_token()
+            return self._token
+
+
+class PlatformSession(
+    CachedSessionMixin, ExecutorSessionMixin, requests.Session
+):
     """
     NYPL Platform wrapper
     args:
         base_url str
         token (dict token obj {id: token_id, expires_on: datetime}
+               or TokenManager obj for automatic token refresh; the
+               token is then first requested with the first Platform call)
+        cache (platform_cache.ResponseCache obj, optional)
+        executor (platform_executor.RequestExecutor obj, optional)
     creates requests.Session object tailored to NYPL Platform
     """
 
-    def __init__(self, base_url=None, token=None):
+    def __init__(self, base_url=None, token=None, cache=None, executor=None):
         requests.Session.__init__(self)
         self.base_url = base_url
-        self.token = token
+        self.token_manager = None
+        if isinstance(token, TokenManager):
+            # token is obtained on the first request sent to Platform
+            self.token_manager = token
+            self.token = None
+        else:
+            self.token = token
+        self.cache = cache
+        self.executor = executor
         self.timeout = (5, 5)
 
         if base_url is None or token is None:
             raise ValueError("Required Platform setting parameter is missing")
 
-        self.headers.update(
-            {
-                "User-Agent": "BookOps-Overload/0.1.0",
-                "Authorization": "Bearer " + self.token.get("id"),
-            }
-        )
+        self.headers.update({"User-Agent": "BookOps-Overload/0.1.0"})
+        if self.token is not None:
+            self.headers.update({"Authorization": "Bearer " + self.token.get("id")})
 
         self._validate_token()
 
     def _validate_token(self):
+        if self.cache is not None and self.cache.offline:
+            return
+        if self.token_manager is not None:
+            return
         if self.token.get("expires_on") < datetime.now():
             raise APITokenExpiredError("Platform access token expired")
 
+    def _authorized_request(self, token, method, url, **kwargs):
+        headers = dict(kwargs.pop("headers", None) or {})
+        headers["Authorization"] = "Bearer " + token.get("id")
+        return super().request(method, url, headers=headers, **kwargs)
+
+    def request(self, method, url, **kwargs):
+        if self.token_manager is None or (
+            self.cache is not None and self.cache.offline
+        ):
+            return super().request(method, url, **kwargs)
+
+        token = self.token_manager.token
+        response = self._authorized_request(token, method, url, **kwargs)
+        if response.status_code == 401:
+            # token revoked or expired early; retry once with a new one
+            token = self.token_manager.refresh(token)
+            response = self._authorized_request(token, method, url, **kwargs)
+        self.token = token
+        return response
+
+    def _get_endpoint(self, endpoint, payload=None):
+        """
+        performs GET request to Platform endpoint
+        args:
+            endpoint str
+            payload dict (query parameters)
+        return:
+            response
+        """
+        self._validate_token()
+        try:
+            if payload is None:
+                response = self.get(endpoint, timeout=self.timeout)
+            else:
+                response = self.get(endpoint, params=payload, timeout=self.timeout)
+            return response
+        except Timeout:
+            raise Timeout(
+                "request timed out while trying to connect "
+                "to Platform endpoint ({})".format(endpoint)
+            )
+        except ConnectionError:
+            raise ConnectionError("unable to connect to Platform")
+
+    def query_page(self, path, limit=50, offset=0, **filters):
+        """
+        requests single page of records matching filters
+        args:
+            path str (for example "/bibs")
+            limit int (page size)
+            offset int
+            filters (query parameters, lists are comma joined, tuples of
+                     dates (start, end) are turned into date ranges)
+        return:
+            list of record dicts (empty when nothing matches)
+        """
+        endpoint = self.base_url + path
+        payload = dict(nyplSource="sierra-nypl", deleted=False)
+        for key, value in filters.items():
+            if isinstance(value, tuple):
+                value = "[{},{}]".format(*value)
+            elif isinstance(value, list):
+                value = ",".join(value)
+            payload[key] = value
+        payload["limit"] = limit
+        payload["offset"] = offset
+
+        response = self._get_endpoint(endpoint, payload)
+        if response.status_code == 404:
+            return []
+        response.raise_for_status()
+        return response.json()["data"]
+
+    def iter_query(self, path, limit=50, **filters):
+        """
+        lazily pages through all records matching filters; the next page
+        is requested in the background while the current one is consumed
+        and no more requests are made once the consumer stops
+        args:
+            path str (for example "/bibs")
+            limit int (page size)
+            filters (see query_page)
+        yields:
+            record dict
+        """
+        executor = ThreadPoolExecutor(max_workers=1)
+        try:
+            offset = 0
+            page = executor.submit(self.query_page, path, limit, offset, **filters)
+            while page is not None:
+                data = page.result()
+                page = None
+                if len(data) >= limit:
+                    offset += limit
+                    page = executor.submit(
+                        self.query_page, path, limit, offset, **filters
+                    )
+                for record in data:
+                    yield record
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def iter_bibs(self, limit=50, **filters):
+        """
+        lazily pages through bibs matching filters
+        args:
+            limit int (page size)
+            filters (for example standardNumber=[...], id=[...],
+                     createdDate=(start, end), nyplSource="sierra-nypl")
+        yields:
+            bib dict
+        """
+        return self.iter_query("/bibs", limit, **filters)
+
+    def iter_items(self, limit=50, **filters):
+        """
+        lazily pages through items matching filters
+        args:
+            limit int (page size)
+            filters (for example bibId="...", barcode="...",
+                     updatedDate=(start, end))
+        yields:
+            item dict
+        """
+        return self.iter_query("/items", limit, **filters)
+
     def query_bibStandardNo(
-        self, keywords=[], source="sierra-nypl", deleted=False, limit=20
+        self, keywords=[], source="sierra-nypl", deleted=False, limit=20, offset=0
     ):
         """
         performs standar number query
@@ -104,30 +293,21 @@ class PlatformSession(requests.Session):
             keywords list
             source str
             limit int
+            offset int
         return:
             results
         """
 
-        self._validate_token()
-
         # prep request
         endpoint = self.base_url + "/bibs"
         payload = dict(
             nyplSource=source,
             limit=limit,
+            offset=offset,
             deleted=deleted,
             standardNumber=",".join(keywords),
         )
-        try:
-            response = self.get(endpoint, params=payload, timeout=self.timeout)
-            return response
-        except Timeout:
-            raise Timeout(
-                "request timed out while trying to connect "
-                "to Platform endpoint ({})".format(endpoint)
-            )
-        except ConnectionError:
-            raise ConnectionError("unable to connect to Platform")
+        return self._get_endpoint(endpoint, payload)
 
     def query_bibControlNo(
         self, keywords=[], source="sierra-nypl", deleted=False, limit=20
@@ -142,8 +322,6 @@ class PlatformSession(requests.Session):
             results
         """
 
-        self._validate_token()
-
         # prep request
         endpoint = self.base_url + "/bibs"
         payload = dict(
@@ -152,16 +330,7 @@ class PlatformSession(requests.Session):
             deleted=deleted,
             controlNumber=",".join(keywords),
         )
-        try:
-            response = self.get(endpoint, params=payload, timeout=self.timeout)
-            return response
-        except Timeout:
-            raise Timeout(
-                "request timed out while trying to connect "
-                "to Platform endpoint ({})".format(endpoint)
-            )
-        except ConnectionError:
-            raise ConnectionError("unable to connect to Platform")
+        return self._get_endpoint(endpoint, payload)
 
     def query_bibId(self, keywords=[], source="sierra-nypl", deleted=False, limit=20):
         """
@@ -174,21 +343,11 @@ class PlatformSession(requests.Session):
             response
         """
 
-        self._validate_token()
         endpoint = self.base_url + "/bibs"
         payload = dict(
             nyplSource=source, limit=limit, deleted=deleted, id=",".join(keywords)
         )
-        try:
-            response = self.get(endpoint, params=payload, timeout=self.timeout)
-            return response
-        except Timeout:
-            raise Timeout(
-                "request timed out while trying to connect "
-                "to Platform endpoint ({})".format(endpoint)
-            )
-        except ConnectionError:
-            raise ConnectionError("unable to connect to Platform")
+        return self._get_endpoint(endpoint, payload)
 
     def query_bibCreatedDate(
         self, start_date, end_date, source="sierra-nypl", deleted=False, limit=10
@@ -203,7 +362,6 @@ class PlatformSession(requests.Session):
             results
         """
 
-        self._validate_token()
         endpoint = self.base_url + "/bibs"
         payload = dict(
             createdDate="[{},{}]".format(start_date, end_date),
@@ -211,16 +369,7 @@ class PlatformSession(requests.Session):
             deleted=False,
             limit=limit,
         )
-        try:
-            response = self.get(endpoint, params=payload, timeout=self.timeout)
-            return response
-        except Timeout:
-            raise Timeout(
-                "request timed out while trying to connect "
-                "to Platform endpoint ({})".format(endpoint)
-            )
-        except ConnectionError:
-            raise ConnectionError("unable to connect to Platform")
+        return self._get_endpoint(endpoint, payload)
 
     def query_bibUpdatedDate(
         self, start_date, end_date, deleted=False, source="sierra-nypl", limit=10
@@ -235,7 +384,6 @@ class PlatformSession(requests.Session):
             results
         """
 
-        self._validate_token()
         endpoint = self.base_url + "/bibs"
         payload = dict(
             updatedDate="[{},{}]".format(start_date, end_date),
@@ -243,16 +391,7 @@ class PlatformSession(requests.Session):
             deleted=False,
             limit=limit,
         )
-        try:
-            response = self.get(endpoint, params=payload, timeout=self.timeout)
-            return response
-        except Timeout:
-            raise Timeout(
-                "request timed out while trying to connect "
-                "to Platform endpoint ({})".format(endpoint)
-            )
-        except ConnectionError:
-            raise ConnectionError("unable to connect to Platform")
+        return self._get_endpoint(endpoint, payload)
 
     def get_bibItems(self, keyword, source="sierra-nypl"):
         """
@@ -264,18 +403,8 @@ class PlatformSession(requests.Session):
             response
         """
 
-        self._validate_token()
         endpoint = self.base_url + "/bibs/{}/{}/items".format(source, keyword)
-        try:
-            response = self.get(endpoint, timeout=self.timeout)
-            return response
-        except Timeout:
-            raise Timeout(
-                "request timed out while trying to connect "
-                "to Platform endpoint ({})".format(endpoint)
-            )
-        except ConnectionError:
-            raise ConnectionError("unable to connect to Platform")
+        return self._get_endpoint(endpoint)
 
     def query_itemId(self, keywords=[], source="sierra-nypl", deleted=False, limit=10):
         """
@@ -288,21 +417,11 @@ class PlatformSession(requests.Session):
             response
         """
 
-        self._validate_token()
         endpoint = self.base_url + "/items"
         payload = dict(
             nyplSource=source, deleted=deleted, limit=limit, id=",".join(keywords)
         )
-        try:
-            response = self.get(endpoint, params=payload, timeout=self.timeout)
-            return response
-        except Timeout:
-            raise Timeout(
-                "request timed out while trying to connect "
-                "to Platform endpoint ({})".format(endpoint)
-            )
-        except ConnectionError:
-            raise ConnectionError("unable to connect to Platform")
+        return self._get_endpoint(endpoint, payload)
 
     def query_itemBarcode(self, keyword, source="sierra-nypl", deleted=False, limit=10):
         """
@@ -315,19 +434,9 @@ class PlatformSession(requests.Session):
             response
         """
 
-        self._validate_token()
         endpoint = self.base_url + "/items"
         payload = dict(nyplSource=source, deleted=deleted, limit=limit, barcode=keyword)
-        try:
-            response = self.get(endpoint, params=payload, timeout=self.timeout)
-            return response
-        except Timeout:
-            raise Timeout(
-                "request timed out while trying to connect "
-                "to Platform endpoint ({})".format(endpoint)
-            )
-        except ConnectionError:
-            raise ConnectionError("unable to connect to Platform")
+        return self._get_endpoint(endpoint, payload)
 
     def query_itemBibId(self, keyword, source="sierra-nypl", deleted=False, limit=10):
         """
@@ -340,19 +449,9 @@ class PlatformSession(requests.Session):
             response
         """
 
-        self._validate_token()
         endpoint = self.base_url + "/items"
         payload = dict(nyplSource=source, deleted=deleted, limit=limit, bibId=keyword)
-        try:
-            response = self.get(endpoint, params=payload, timeout=self.timeout)
-            return response
-        except Timeout:
-            raise Timeout(
-                "request timed out while trying to connect "
-                "to Platform endpoint ({})".format(endpoint)
-            )
-        except ConnectionError:
-            raise ConnectionError("unable to connect to Platform")
+        return self._get_endpoint(endpoint, payload)
 
     def query_itemCreatedDate(
         self, start_date, end_date, source="sierra-nypl", deleted=False, limit=10
@@ -368,7 +467,6 @@ class PlatformSession(requests.Session):
             results
         """
 
-        self._validate_token()
         endpoint = self.base_url + "/items"
         payload = dict(
             createdDate="[{},{}]".format(start_date, end_date),
@@ -376,16 +474,7 @@ class PlatformSession(requests.Session):
             deleted=deleted,
             limit=limit,
         )
-        try:
-            response = self.get(endpoint, params=payload, timeout=self.timeout)
-            return response
-        except Timeout:
-            raise Timeout(
-                "request timed out while trying to connect "
-                "to Platform endpoint ({})".format(endpoint)
-            )
-        except ConnectionError:
-            raise ConnectionError("unable to connect to Platform")
+        return self._get_endpoint(endpoint, payload)
 
     def query_itemUpdateddDate(
         self, start_date, end_date, source="sierra-nypl", deleted=False, limit=10
@@ -401,7 +490,6 @@ class PlatformSession(requests.Session):
             results
         """
 
-        self._validate_token()
         endpoint = self.base_url + "/items"
         payload = dict(
             updatedDate="[{},{}]".format(start_date, end_date),
@@ -409,16 +497,7 @@ class PlatformSession(requests.Session):
             deleted=deleted,
             limit=limit,
         )
-        try:
-            response = self.get(endpoint, params=payload, timeout=self.timeout)
-            return response
-        except Timeout:
-            raise Timeout(
-                "request timed out while trying to connect "
-                "to Platform endpoint ({})".format(endpoint)
-            )
-        except ConnectionError:
-            raise ConnectionError("unable to connect to Platform")
+        return self._get_endpoint(endpoint, payload)
 
     def get_item(self, keyword, source="sierra-nypl"):
         """
@@ -430,18 +509,8 @@ class PlatformSession(requests.Session):
             response
         """
 
-        self._validate_token()
         endpoint = self.base_url + "/items/{}/{}".format(source, keyword)
-        try:
-            response = self.get(endpoint, timeout=self.timeout)
-            return response
-        except Timeout:
-            raise Timeout(
-                "request timed out while trying to connect "
-                "to Platform endpoint ({})".format(endpoint)
-            )
-        except ConnectionError:
-            raise ConnectionError("unable to connect to Platform")
+        return self._get_endpoint(endpoint)
 
 
 def platform_status_interpreter(response=None):
@@ -1,3 +1,134 @@
+SUBJECT_TAGS = ("600", "610", "611", "630", "650", "651", "655")
+
+
+class ParsedBib:
+    """
+    Platform bib view with varFields indexed by MARC tag and field tag;
+    build it once per record and all getters become dictionary lookups;
+    `items` holds Platform items of the bib once they are fetched
+    args:
+        bib: dict, Platform bib in json format
+    """
+
+    def __init__(self, bib):
+        self.data = bib
+        self.items = None
+        self.marc_tags = dict()
+        self.field_tags = dict()
+        for field in bib.get("varFields") or []:
+            self.marc_tags.setdefault(field.get("marcTag"), []).append(field)
+            self.field_tags.setdefault(field.get("fieldTag"), []).append(field)
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+    def fields(self, tag):
+        return self.marc_tags.get(tag, [])
+
+    def has_tag(self, *tags):
+        for tag in tags:
+            if tag in self.marc_tags:
+                return True
+        return False
+
+    def first_content(self, tag):
+        fields = self.fields(tag)
+        if fields:
+            return fields[0].get("content")
+
+    @property
+    def leader(self):
+        fields = self.field_tags.get("_")
+        if fields:
+            return fields[0].get("content")
+
+    @property
+    def tag_008(self):
+        return self.first_content("008")
+
+    @property
+    def branch_call_number(self):
+        fields = self.fields("091")
+        if fields:
+            segments = []
+            for subfield in fields[0].get("subfields"):
+                segments.append(subfield.get("content"))
+            return " ".join(segments).upper()
+
+    @property
+    def lccn(self):
+        for field in self.fields("010"):
+            for subfield in field.get("subfields") or []:
+                if subfield.get("tag") == "a" and subfield.get("content"):
+                    return subfield.get("content").strip()
+
+    @property
+    def oclc_number(self):
+        oclc_number = None
+        for field in self.fields("001"):
+            control_number = field.get("content")
+            try:
+                oclc_number = str(int(control_number))
+            except ValueError:
+                pass
+            except TypeError:
+                pass
+        return oclc_number
+
+    @property
+    def has_oclc_number(self):
+        if self.has_tag("991"):
+            return True
+        for field in self.fields("003"):
+            if field.get("content") == "OCoLC":
+                return True
+        return False
+
+    @property
+    def is_dlc_record(self):
+        for field in self.fields("040"):
+            for subfield in field.get("subfields"):
+                if subfield.get("content") == "DLC":
+                    return True
+        return False
+
+    @property
+    def timestamp(self):
+        timestamp = 0.0
+        for field in self.fields("005"):
+            try:
+                timestamp = float(field.get("content"))
+            except ValueError:
+                pass
+            except TypeError:
+                pass
+        return timestamp
+
+    @property
+    def item_locations(self):
+        locations = []
+        for item in self.items or []:
+            location = item.get("location") or dict()
+            locations.append(location.get("code"))
+        return locations
+
+
+def parse_bib(bib):
+    """
+    returns ParsedBib view of a bib; already parsed bibs are passed through
+    args:
+        bib: dict or ParsedBib
+    return:
+        ParsedBib
+    """
+    if isinstance(bib, ParsedBib):
+        return bib
+    return ParsedBib(bib)
+
+
 def get_locations(bib=None):
     """
     extracts meta from Platform results
@@ -23,9 +154,7 @@ def get_bibNo(bib=None):
 
 def get_leader(bib=None):
     if bib is not None:
-        for field in bib.get("varFields"):
-            if field.get("fieldTag") == "_":
-                return field.get("content")
+        return parse_bib(bib).leader
 
 
 def get_rec_type(bib=None):
@@ -45,9 +174,7 @@ def get_blvl(bib=None):
 
 def get_tag_008(bib):
     if bib is not None:
-        for field in bib.get("varFields"):
-            if field.get("marcTag") == "008":
-                return field.get("content")
+        return parse_bib(bib).tag_008
 
 
 def get_encoding_level(bib):
@@ -73,180 +200,133 @@ def get_isbns(bib=None):
         return bib.get("standardNumbers")
 
 
+def normalize_isbn(isbn):
+    """
+    normalizes ISBN for comparison: drops qualifiers and hyphens and
+    converts ISBN-10 to ISBN-13
+    args:
+        isbn: str, e.g. "0-679-89460-8 (pbk.)"
+    return:
+        str
+    """
+    isbn = isbn.strip().split(" ")[0].split("(")[0].replace("-", "").upper()
+    if len(isbn) == 10 and isbn[:9].isdigit():
+        digits = "978" + isbn[:9]
+        total = sum(int(d) * (3 if n % 2 else 1) for n, d in enumerate(digits))
+        isbn = digits + str((10 - total % 10) % 10)
+    return isbn
+
+
 def has_050_tag(bib=None):
-    present = False
     if bib is not None:
-        for field in bib.get("varFields"):
-            if field.get("marcTag") == "050":
-                present = True
-                break
-    return present
+        return parse_bib(bib).has_tag("050")
+    return False
 
 
 def has_505_tag(bib=None):
-    present = False
     if bib is not None:
-        for field in bib.get("varFields"):
-            if field.get("marcTag") == "505":
-                present = True
-                break
-    return present
+        return parse_bib(bib).has_tag("505")
+    return False
 
 
 def has_520_tag(bib=None):
-    present = False
     if bib is not None:
-        for field in bib.get("varFields"):
-            if field.get("marcTag") == "520":
-                present = True
-                break
-    return present
+        return parse_bib(bib).has_tag("520")
+    return False
 
 
 def has_subject_tags(bib=None):
-    present = False
     if bib is not None:
-        for field in bib.get("varFields"):
-            if field.get("marcTag") in (
-                "600",
-                "610",
-                "611",
-                "630",
-                "650",
-                "651",
-                "655",
-            ):
-                present = True
-                break
-    return present
+        return parse_bib(bib).has_tag(*SUBJECT_TAGS)
+    return False
 
 
 def has_082_tag(bib=None):
-    present = False
     if bib is not None:
-        for field in bib.get("varFields"):
-            if field.get("marcTag") == "082":
-                present = True
-                break
-    return present
+        return parse_bib(bib).has_tag("082")
+    return False
 
 
 def has_research_call_number(bib):
-    research = False
     if bib is not None:
-        for field in bib.get("varFields"):
-            if field.get("marcTag") == "852":
-                research = True
-                break
-    return research
+        return parse_bib(bib).has_tag("852")
+    return False
 
 
 def has_branch_call_number(bib):
-    branches = False
     if bib is not None:
-        for field in bib.get("varFields"):
-            if field.get("marcTag") == "091":
-                branches = True
-                break
-    return branches
+        return parse_bib(bib).has_tag("091")
+    return False
 
 
 def has_national_library_authentication_code(bib):
-    present = False
     if bib is not None:
-        for field in bib.get("varFields"):
-            if field.get("marcTag") == "042":
-                present = True
-                break
-    return present
+        return parse_bib(bib).has_tag("042")
+    return False
 
 
 def is_dlc_record(bib):
-    dlc = False
     if bib is not None:
-        for field in bib.get("varFields"):
-            if field.get("marcTag") == "040":
-                for subfield in field.get("subfields"):
-                    if subfield.get("content") == "DLC":
-                        dlc = True
-                        break
-
-    return dlc
+        return parse_bib(bib).is_dlc_record
+    return False
 
 
 def get_branch_call_number(bib):
     if bib is not None:
-        for field in bib.get("varFields"):
-            if field.get("marcTag") == "091":
-                segments = []
-                for subfield in field.get("subfields"):
-                    segments.append(subfield.get("content"))
-                return " ".join(segments).upper()
+        return parse_bib(bib).branch_call_number
 
 
 def get_oclc_number(bib):
-    oclc_number = None
     if bib is not None:
-        for field in bib.get("varFields"):
-            if field.get("marcTag") == "001":
-                control_number = field.get("content")
-                try:
-                    oclc_number = str(int(control_number))
-                except ValueError:
-                    pass
-                except TypeError:
-                    pass
-            if field.get("marcTag") == "991":
-                for subfield in field.get("subfields"):
-                    if subfield.get("tag") == "y":
-                        oclc_number == subfield.get("content")
-    return oclc_number
+        return parse_bib(bib).oclc_number
+
+
+def get_lccn(bib):
+    if bib is not None:
+        return parse_bib(bib).lccn
 
 
 def has_call_number(bib):
-    present = False
     if bib is not None:
-        for field in bib.get("varFields"):
-            if field.get("marcTag") in ("091", "852"):
-                present = True
-                break
-    return present
+        return parse_bib(bib).has_tag("091", "852")
+    return False
 
 
 def has_oclc_number(bib):
-    has_number = False
     if bib is not None:
-        for field in bib.get("varFields"):
-            if field.get("marcTag") == "003":
-                if field.get("content") == "OCoLC":
-                    has_number = True
-            if field.get("marcTag") == "991":
-                has_number = True
-
-    return has_number
+        return parse_bib(bib).has_oclc_number
+    return False
 
 
 def has_lc_number(bib):
-    has_number = False
     if bib is not None:
-        for field in bib.get("varFields"):
-            if field.get("marcTag") == "010":
-                has_number = True
-    return has_number
+        return parse_bib(bib).has_tag("010")
+    return False
 
 
 def get_timestamp(bib):
-    timestamp = 0.0
     if bib is not None:
-        for field in bib.get("varFields"):
-            if field.get("marcTag") == "005":
-                try:
-                    timestamp = float(field.get("content"))
-                except ValueError:
-                    pass
-                except TypeError:
-                    pass
-    return timestamp
+        return parse_bib(bib).timestamp
+    return 0.0
+
+
+def get_item_count(bib):
+    """
+    args:
+        bib: dict or ParsedBib
+    return:
+        int, number of fetched items; None when items were not fetched
+    """
+    if bib is not None:
+        items = parse_bib(bib).items
+        if items is not None:
+            return len(items)
+
+
+def get_item_locations(bib):
+    if bib is not None:
+        return parse_bib(bib).item_locations
+    return []
 
 
 def get_normalized_title(bib):
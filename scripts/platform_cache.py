@@ -0,0 +1,223 @@
+"""
+Opt-in on-disk cache of NYPL Platform responses.
+
+Responses to GET requests are stored in a SQLite database keyed by the
+request URL with its query parameters sorted, so any query method of
+PlatformSession can be replayed. Entries expire after `ttl` seconds and
+the least recently used ones are evicted above `max_entries`. In offline
+mode the cache never calls Platform and serves expired entries as well.
+
+Eviction runs only when the number of entries goes over `max_entries` and
+then removes a batch of the least recently used ones, and access times of
+cache hits are written in batches, so neither costs a write per request.
+"""
+from datetime import datetime
+import json
+import sqlite3
+import threading
+
+import requests
+
+try:
+    from scripts.errors import CacheMissError
+except ImportError:
+    from errors import CacheMissError
+
+
+# 404 is a valid "nohit" answer from Platform and is worth remembering
+CACHEABLE_CODES = (200, 404)
+# fraction of max_entries evicted at once when the cache is full
+EVICTION_FRACTION = 0.1
+# number of cache hits whose access times are written together
+ACCESS_FLUSH_SIZE = 1000
+
+
+def cache_key(url, params=None):
+    """
+    creates cache key from endpoint and query parameters
+    args:
+        url: str, endpoint
+        params: dict, query parameters
+    return:
+        str
+    """
+    if params:
+        params = sorted(params.items())
+    return requests.Request("GET", url, params=params).prepare().url
+
+
+class ResponseCache:
+    """
+    SQLite backed store of Platform responses
+    args:
+        db_fh: str, path to SQLite database
+        ttl: int, seconds after which entries expire; None keeps them forever
+        max_entries: int, max number of cached responses; None for no limit
+        offline: bool, replay mode; never calls Platform
+    """
+
+    def __init__(self, db_fh, ttl=None, max_entries=None, offline=False):
+        self.db_fh = db_fh
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.offline = offline
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_fh, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, status INTEGER, headers TEXT, "
+                "body BLOB, stored REAL, accessed REAL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_accessed ON responses (accessed)"
+            )
+        row = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+        self._count = row[0]
+        self._accessed = dict()
+
+    def close(self):
+        with self._lock:
+            self._flush_accessed()
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        with self._lock:
+            return self._count
+
+    def _flush_accessed(self):
+        # writes buffered access times of cache hits; call with the lock held
+        if self._accessed:
+            with self._conn:
+                self._conn.executemany(
+                    "UPDATE responses SET accessed=? WHERE key=?",
+                    [(accessed, key) for key, accessed in self._accessed.items()],
+                )
+            self._accessed.clear()
+
+    def _evict(self):
+        # removes a batch of least recently used entries; call with the lock held
+        self._flush_accessed()
+        target = self.max_entries - int(self.max_entries * EVICTION_FRACTION)
+        cursor = self._conn.execute(
+            "DELETE FROM responses WHERE key IN ("
+            "SELECT key FROM responses ORDER BY accessed LIMIT ?)",
+            (self._count - target,),
+        )
+        self._count -= cursor.rowcount
+
+    def is_expired(self, stored):
+        if self.ttl is None or self.offline:
+            return False
+        return datetime.now().timestamp() - stored > self.ttl
+
+    def get(self, key):
+        """
+        returns cached response or None
+        args:
+            key: str, cache key
+        return:
+            requests.Response
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, headers, body, stored FROM responses WHERE key=?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return
+            status, headers, body, stored = row
+            if self.is_expired(stored):
+                with self._conn:
+                    self._conn.execute("DELETE FROM responses WHERE key=?", (key,))
+                self._count -= 1
+                self._accessed.pop(key, None)
+                return
+            if not self.offline:
+                self._accessed[key] = datetime.now().timestamp()
+                if len(self._accessed) >= ACCESS_FLUSH_SIZE:
+                    self._flush_accessed()
+
+        response = requests.Response()
+        response.status_code = status
+        response.headers.update(json.loads(headers))
+        response._content = body
+        response.url = key
+        response.encoding = "utf-8"
+        return response
+
+    def set(self, key, response):
+        """
+        stores response
+        args:
+            key: str, cache key
+            response: requests.Response
+        """
+        if self.offline or response.status_code not in CACHEABLE_CODES:
+            return
+        now = datetime.now().timestamp()
+        with self._lock, self._conn:
+            exists = self._conn.execute(
+                "SELECT 1 FROM responses WHERE key=?", (key,)
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    response.status_code,
+                    json.dumps(dict(response.headers)),
+                    response.content,
+                    now,
+                    now,
+                ),
+            )
+            self._accessed.pop(key, None)
+            if exists is None:
+                self._count += 1
+            if self.max_entries is not None and self._count > self.max_entries:
+                self._evict()
+
+    def fetch(self, send, method, url, **kwargs):
+        """
+        serves GET requests from cache and stores new responses;
+        other methods are passed through
+        args:
+            send: callable, performs the actual request
+            method: str, http method
+            url: str, endpoint
+        return:
+            requests.Response
+        """
+        if method.upper() != "GET":
+            return send(method, url, **kwargs)
+
+        key = cache_key(url, kwargs.get("params"))
+        response = self.get(key)
+        if response is not None:
+            return response
+        if self.offline:
+            raise CacheMissError(f"Response not cached: {key}")
+
+        response = send(method, url, **kwargs)
+        self.set(key, response)
+        return response
+
+
+class CachedSessionMixin:
+    """
+    routes requests of a requests.Session subclass through its `cache`
+    attribute (ResponseCache) when one is set
+    """
+
+    cache = None
+
+    def request(self, method, url, **kwargs):
+        if self.cache is not None:
+            return self.cache.fetch(super().request, method, url, **kwargs)
+        return super().request(method, url, **kwargs)
@@ -0,0 +1,215 @@
+"""
+Shared request executor for Platform sessions.
+
+Retries timeouts, connection errors, 429 and 5xx responses with
+exponential backoff and full jitter (honoring Retry-After), paces
+requests with a token bucket and stops calling Platform for a while
+after repeated failures (circuit breaker).
+"""
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import random
+import threading
+import time
+
+from requests.exceptions import ConnectionError, Timeout
+
+try:
+    from scripts.errors import CircuitOpenError
+except ImportError:
+    from errors import CircuitOpenError
+
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket rate limiter
+    args:
+        rate: float, requests per second
+        capacity: int, max burst of requests
+    """
+
+    def __init__(self, rate, capacity=1, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        blocks until a request is allowed
+        """
+        while True:
+            with self._lock:
+                now = self.clock()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated) * self.rate
+                )
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            self.sleep(wait)
+
+
+class CircuitBreaker:
+    """
+    Suspends requests after consecutive failures
+    args:
+        failure_threshold: int, consecutive failures that open the circuit
+        reset_timeout: float, seconds after which one trial request is let through
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened = None
+        self._lock = threading.Lock()
+
+    def before_request(self):
+        with self._lock:
+            if self.opened is None:
+                return
+            if self.clock() - self.opened < self.reset_timeout:
+                raise CircuitOpenError(
+                    f"Platform requests suspended after {self.failures} failures"
+                )
+            # half-open: let this request through and restart the timer
+            self.opened = self.clock()
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.opened = self.clock()
+
+
+def retry_after(response):
+    """
+    parses Retry-After header
+    args:
+        response: requests.Response
+    return:
+        float, seconds to wait or None
+    """
+    value = response.headers.get("Retry-After")
+    if value is None:
+        return
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return
+    return max(0.0, (date - datetime.now(timezone.utc)).total_seconds())
+
+
+class RequestExecutor:
+    """
+    Executes Platform requests with retries, rate limiting and
+    a circuit breaker; one executor can be shared by several sessions
+    args:
+        max_retries: int, number of retries after the first attempt
+        backoff_factor: float, base of exponential backoff in seconds
+        max_backoff: float, max wait between attempts in seconds
+        rate: float, max requests per second; None for no limit
+        burst: int, max burst of requests when rate is set
+        breaker: CircuitBreaker, None to disable
+    """
+
+    def __init__(
+        self,
+        max_retries=5,
+        backoff_factor=0.5,
+        max_backoff=60,
+        rate=None,
+        burst=1,
+        breaker=None,
+        sleep=time.sleep,
+    ):
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.limiter = None
+        if rate is not None:
+            self.limiter = TokenBucket(rate, burst, sleep=sleep)
+        self.breaker = breaker
+        self.sleep = sleep
+
+    def backoff(self, attempt):
+        return random.uniform(
+            0, min(self.max_backoff, self.backoff_factor * 2 ** attempt)
+        )
+
+    def execute(self, send, method, url, **kwargs):
+        """
+        performs request; after the last attempt the final response is
+        returned or the last exception raised
+        args:
+            send: callable, performs the actual request
+            method: str, http method
+            url: str, endpoint
+        return:
+            requests.Response
+        """
+        attempt = 0
+        while True:
+            if self.breaker is not None:
+                self.breaker.before_request()
+            if self.limiter is not None:
+                self.limiter.acquire()
+
+            try:
+                response = send(method, url, **kwargs)
+            except (Timeout, ConnectionError):
+                if self.breaker is not None:
+                    self.breaker.record_failure()
+                if attempt >= self.max_retries:
+                    raise
+                self.sleep(self.backoff(attempt))
+                attempt += 1
+                continue
+
+            if response.status_code not in RETRY_STATUSES:
+                if self.breaker is not None:
+                    self.breaker.record_success()
+                return response
+
+            if self.breaker is not None:
+                self.breaker.record_failure()
+            if attempt >= self.max_retries:
+                return response
+            wait = retry_after(response)
+            if wait is None:
+                wait = self.backoff(attempt)
+            self.sleep(wait)
+            attempt += 1
+
+
+class ExecutorSessionMixin:
+    """
+    routes requests of a requests.Session subclass through its `executor`
+    attribute (RequestExecutor) when one is set
+    """
+
+    executor = None
+
+    def request(self, method, url, **kwargs):
+        if self.executor is not None:
+            return self.executor.execute(super().request, method, url, **kwargs)
+        return super().request(method, url, **kwargs)
@@ -0,0 +1,195 @@
+"""
+Load test of the dedup and verify Platform clients against MockPlatform.
+
+Runs nyp_branch_dups_discovery.query_platform and
+verify_platform_bib_nos.verify (and verify_bulk) over synthetic bibs served by
+mock_platform.MockPlatform with the given latency and fault rates, and
+reports elapsed time, throughput and the statuses the server returned.
+Use to tune workers, batching, retries and caching with reproducible
+numbers before running jobs against the real Platform.
+
+usage:
+    python platform_load.py [bibs] [latency]
+    e.g. python platform_load.py 1000 0.05
+"""
+from contextlib import redirect_stdout
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks import generate_platform_bibs
+from log_scanner import sierra_check_digit
+from mock_platform import MockPlatform
+from nyp_branch_dups_discovery import query_platform
+from platform import AuthorizeAccess, TokenManager
+from platform_executor import RequestExecutor
+from utils import CsvWriter
+
+
+def write_source(fh, bibs):
+    """
+    writes dedup source csv (same format as marc_parser.marc2list output)
+    args:
+        fh: str, path to csv file
+        bibs: list of Platform bib dicts
+    """
+    with CsvWriter(fh) as writer:
+        for bib in bibs:
+            writer.writerow([f"b{bib['id']}x", ",".join(bib["standardNumbers"])])
+
+
+def write_verify_log(fh, bibs):
+    """
+    writes a log with 404 Platform responses read by verify
+    args:
+        fh: str, path to log file
+        bibs: list of Platform bib dicts
+    """
+    with open(fh, "w") as log:
+        for bib in bibs:
+            check_digit = sierra_check_digit(bib["id"])
+            log.write(f"NYPL Platform request (404): .b{bib['id']}{check_digit}\n")
+
+
+def run_job(name, server, job, units):
+    """
+    runs a job in a temporary working directory with the files/reports
+    layout the jobs write their reports to and collects server statistics
+    """
+    server.reset_stats()
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as work_dir:
+        os.makedirs(os.path.join(work_dir, "files", "reports"))
+        os.chdir(work_dir)
+        try:
+            start = time.perf_counter()
+            with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+                job(work_dir)
+            seconds = time.perf_counter() - start
+        finally:
+            os.chdir(cwd)
+    return dict(
+        name=name,
+        units=units,
+        seconds=round(seconds, 3),
+        per_second=round(units / seconds, 1),
+        requests=sum(server.stats.values()),
+        statuses=dict(server.stats),
+    )
+
+
+def load_test_query_platform(
+    server, bibs, workers=1, max_keywords=1, cache=None, executor=None
+):
+    """
+    args:
+        server: mock_platform.MockPlatform, started
+        bibs: list of source bibs (their ISBNs are queried)
+        workers: int, number of concurrent queries
+        max_keywords: int, max number of ISBNs in one query
+        cache: platform_cache.ResponseCache
+        executor: platform_executor.RequestExecutor
+    return:
+        dict of results
+    """
+    auth = AuthorizeAccess("load-test", "load-test", server.url)
+
+    def job(work_dir):
+        src = os.path.join(work_dir, "src.csv")
+        write_source(src, bibs)
+        query_platform(
+            src,
+            TokenManager(auth),
+            workers=workers,
+            max_keywords=max_keywords,
+            cache=cache,
+            executor=executor,
+            base_url=server.base_url,
+        )
+
+    name = f"query_platform workers={workers} max_keywords={max_keywords}"
+    return run_job(name, server, job, len(bibs))
+
+
+def load_test_verify(server, bibs, cache=None, executor=None):
+    """
+    args:
+        server: mock_platform.MockPlatform, started
+        bibs: list of bibs to verify
+        cache: platform_cache.ResponseCache
+        executor: platform_executor.RequestExecutor
+    return:
+        dict of results
+    """
+    # requires bookops_nypl_platform
+    from verify_platform_bib_nos import get_token, verify
+
+    token = get_token("load-test", "load-test", server.url)
+
+    def job(work_dir):
+        log_fh = os.path.join(work_dir, "verify.log")
+        write_verify_log(log_fh, bibs)
+        verify(log_fh, token, cache=cache, executor=executor, base_url=server.base_url)
+
+    return run_job("verify", server, job, len(bibs))
+
+
+def load_test_verify_bulk(
+    server, bibs, batch_size=50, workers=4, cache=None, executor=None
+):
+    """
+    args:
+        server: mock_platform.MockPlatform, started
+        bibs: list of bibs to verify
+        batch_size: int, number of ids in one query
+        workers: int, number of concurrent queries
+        cache: platform_cache.ResponseCache
+        executor: platform_executor.RequestExecutor
+    return:
+        dict of results
+    """
+    # requires bookops_nypl_platform
+    from verify_platform_bib_nos import verify_bulk
+
+    auth = AuthorizeAccess("load-test", "load-test", server.url)
+
+    def job(work_dir):
+        log_fh = os.path.join(work_dir, "verify.log")
+        write_verify_log(log_fh, bibs)
+        verify_bulk(
+            log_fh,
+            TokenManager(auth),
+            batch_size=batch_size,
+            workers=workers,
+            cache=cache,
+            executor=executor,
+            base_url=server.base_url,
+        )
+
+    name = f"verify_bulk batch_size={batch_size} workers={workers}"
+    return run_job(name, server, job, len(bibs))
+
+
+if __name__ == "__main__":
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.05
+
+    bibs = list(generate_platform_bibs(size))
+    with MockPlatform(
+        bibs, latency=latency, error_rate=0.01, throttle_rate=0.05
+    ) as server:
+        executor = RequestExecutor(backoff_factor=0.1, max_backoff=2)
+        results = [
+            load_test_query_platform(
+                server, bibs, workers, max_keywords, None, executor
+            )
+            for workers, max_keywords in ((1, 1), (4, 1), (4, 40), (8, 40))
+        ]
+        results.append(load_test_verify(server, bibs, executor=executor))
+        results.append(load_test_verify_bulk(server, bibs, executor=executor))
+    for result in results:
+        print(
+            f"{result['name']:45} {result['seconds']:>9}s "
+            f"{result['per_second']:>9}/s {result['statuses']}"
+        )
@@ -1,9 +1,11 @@
-from pymarc import MARCReader, Field
+from pymarc import MARCReader, Field, Record
 
 try:
-    from scripts.utils import save2marc
+    from scripts.marc_pool import transform_file
+    from scripts.utils import MarcWriter
 except ImportError:
-    from utils import save2marc
+    from marc_pool import transform_file
+    from utils import MarcWriter
 
 
 def change_to_je(callNo: Field) -> Field:
@@ -17,42 +19,51 @@ def change_to_je(callNo: Field) -> Field:
     return Field(tag="099", indicators=[" ", " "], subfields=new_subs)
 
 
-def process_file(fh: str):
-    with open(fh, "rb") as marcfile:
+def process_bib(bib: Record) -> Record:
+
+    # change call number
+    callNo = bib["099"]
+    new_callNo = change_to_je(callNo)
+    bib.remove_field(callNo)
+    bib.add_ordered_field(new_callNo)
+
+    # add classification change
+    bib.add_ordered_field(
+        Field(
+            tag="947",
+            indicators=["1", " "],
+            subfields=[
+                "a",
+                "tak",
+                "n",
+                f"Call number changed from {callNo.value()} to {new_callNo.value()} on 12/01/2022",
+            ],
+        )
+    )
+
+    # command tag
+    opac_code = bib["998"]["e"].strip()
+    if opac_code != "-":
+        command = f"*b2=8;b3=opac_code;"
+    else:
+        command = f"*b2=8;"
+    bib.add_ordered_field(
+        Field(tag="949", indicators=[" ", " "], subfields=["a", command])
+    )
+
+    return bib
+
+
+def process_file(fh: str, workers: int = 1):
+    dst = "./files/READALONG-JE-PROC.mrc"
+    if workers > 1:
+        transform_file(fh, dst, process_bib, workers)
+        return
+
+    with open(fh, "rb") as marcfile, MarcWriter(dst) as writer:
         reader = MARCReader(marcfile)
         for bib in reader:
-
-            # change call number
-            callNo = bib["099"]
-            new_callNo = change_to_je(callNo)
-            bib.remove_field(callNo)
-            bib.add_ordered_field(new_callNo)
-
-            # add classification change
-            bib.add_ordered_field(
-                Field(
-                    tag="947",
-                    indicators=["1", " "],
-                    subfields=[
-                        "a",
-                        "tak",
-                        "n",
-                        f"Call number changed from {callNo.value()} to {new_callNo.value()} on 12/01/2022",
-                    ],
-                )
-            )
-
-            # command tag
-            opac_code = bib["998"]["e"].strip()
-            if opac_code != "-":
-                command = f"*b2=8;b3=opac_code;"
-            else:
-                command = f"*b2=8;"
-            bib.add_ordered_field(
-                Field(tag="949", indicators=[" ", " "], subfields=["a", command])
-            )
-
-            save2marc("./files/READALONG-JE-PROC.mrc", bib)
+            writer.write(process_bib(bib))
 
 
 if __name__ == "__main__":
@@ -1,3 +1,6 @@
+import json
+
+
 RES_CODES = [
     "xxx",
     "ma",
@@ -31,3 +34,58 @@ RES_CODES = [
     "lsx",
     "lsd"
 ]
+
+EBOOK_CODES = ["ia"]
+# item location codes, e.g. "mab0v", start with the code of their bib location
+ITEM_PREFIX_LENGTH = 3
+
+
+class LocationCodes:
+    """
+    Research and e-book location codes used to classify bibs
+    args:
+        research: iterable, research location codes
+        ebook: iterable, e-book location codes
+    """
+
+    def __init__(self, research=RES_CODES, ebook=EBOOK_CODES):
+        self.research = frozenset(research)
+        self.ebook = frozenset(ebook)
+
+    @classmethod
+    def from_file(cls, fh):
+        """
+        loads codes from a json file, e.g. {"research": ["ma"], "ebook": ["ia"]};
+        missing lists default to the codes above
+        args:
+            fh: str, path to json config file
+        """
+        with open(fh, "r", encoding="utf-8") as file:
+            config = json.load(file)
+        return cls(config.get("research", RES_CODES), config.get("ebook", EBOOK_CODES))
+
+    def classify(self, locations):
+        """
+        checks locations in one pass
+        args:
+            locations: iterable of location codes
+        return:
+            (has_research, has_ebook) tuple of bools
+        """
+        locations = set(locations)
+        return (
+            not self.research.isdisjoint(locations),
+            not self.ebook.isdisjoint(locations),
+        )
+
+    def classify_items(self, locations):
+        """
+        checks item locations by their bib location prefix
+        args:
+            locations: iterable of item location codes
+        return:
+            (has_research, has_ebook) tuple of bools
+        """
+        return self.classify(
+            code[:ITEM_PREFIX_LENGTH] for code in locations if code is not None
+        )
@@ -8,12 +8,19 @@ up the 035 tag by removing the trailing B
 
 Requires character encoding (UTF-8) cleanup in MarcEdit before the process.
 """
+from functools import partial
 import sys
 import warnings
 
 
 from pymarc import Field, MARCReader, Record
-from utils import save2marc
+
+try:
+    from scripts.marc_pool import transform_file
+    from scripts.utils import MarcWriter
+except ImportError:
+    from marc_pool import transform_file
+    from utils import MarcWriter
 
 
 def enforce_oclc_symbol_in_003(bib: Record) -> None:
@@ -63,32 +70,45 @@ def normalize_ocn(value: str) -> str:
     return value
 
 
-def fix_file(fh_in: str, fh_out: str, del_991="no") -> None:
-    with open(fh_in, "rb") as marc_in:
-        reader = MARCReader(marc_in)
-        for bib in reader:
-            ocns = []
-            for field in bib.get_fields("035"):
-                if has_ocn(field):
-                    ocn = normalize_ocn(field["a"])
-                    ocns.append(ocn)
-                    field["a"] = f"(OCoLC){ocn}"
+def fix_bib(bib: Record, del_991="no") -> Record:
+    ocns = []
+    for field in bib.get_fields("035"):
+        if has_ocn(field):
+            ocn = normalize_ocn(field["a"])
+            ocns.append(ocn)
+            field["a"] = f"(OCoLC){ocn}"
+
+    if len(ocns) != 1:
+        controlNo = bib["001"]
+        warnings.warn(f"Invalid number of 035s in {controlNo}")
+    else:
+        add_ocn_to_001(bib, ocns[0])
+        enforce_oclc_symbol_in_003(bib)
+
+    if del_991 == "yes":
+        # this field is not protected in the Backstage load table
+        bib.remove_fields("991")
 
-            if len(ocns) != 1:
-                controlNo = bib["001"]
-                warnings.warn(f"Invalid number of 035s in {controlNo}")
-            else:
-                add_ocn_to_001(bib, ocns[0])
-                enforce_oclc_symbol_in_003(bib)
+    bib.remove_fields("908")
 
-            if del_991 == "yes":
-                # this field is not protected in the Backstage load table
-                bib.remove_fields("991")
+    return bib
 
-            bib.remove_fields("908")
 
-            save2marc(fh_out, bib)
+def fix_file(fh_in: str, fh_out: str, del_991="no", workers: int = 1) -> None:
+    """
+    Fixes all records in fh_in and appends them to fh_out;
+    with workers > 1 records are processed in a pool of processes
+    """
+    if workers > 1:
+        transform_file(fh_in, fh_out, partial(fix_bib, del_991=del_991), workers)
+        return
+
+    with open(fh_in, "rb") as marc_in, MarcWriter(fh_out) as writer:
+        reader = MARCReader(marc_in)
+        for bib in reader:
+            writer.write(fix_bib(bib, del_991))
 
 
 if __name__ == "__main__":
-    fix_file(sys.argv[1], sys.argv[2], sys.argv[3])
+    workers = int(sys.argv[4]) if len(sys.argv) > 4 else 1
+    fix_file(sys.argv[1], sys.argv[2], sys.argv[3], workers)
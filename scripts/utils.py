@@ -1,28 +1,169 @@
 import csv
+import json
 
 
-def save2csv(dst_fh, row):
+DEFAULT_BUFFER_SIZE = 1024 * 1024
+
+
+class CsvWriter:
     """
-    Appends a list with data to a dst_fh csv
+    Appends rows to a csv file keeping it open between writes
     args:
         dst_fh: str, output file
-        row: list, list of values to write in a row
+        buffer_size: int, size of write buffer in bytes
     """
 
-    with open(dst_fh, "a", encoding="utf-8") as csvfile:
-        out = csv.writer(
-            csvfile,
+    def __init__(self, dst_fh, buffer_size=DEFAULT_BUFFER_SIZE):
+        self.dst_fh = dst_fh
+        self._file = open(dst_fh, "a", encoding="utf-8", buffering=buffer_size)
+        self._writer = csv.writer(
+            self._file,
             delimiter=",",
             lineterminator="\n",
             quotechar='"',
             quoting=csv.QUOTE_MINIMAL,
         )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def writerow(self, row):
+        """
+        args:
+            row: list, list of values to write in a row
+        """
         try:
-            out.writerow(row)
+            self._writer.writerow(row)
         except UnicodeEncodeError:
             pass
 
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class CsvWriters:
+    """
+    Keeps one CsvWriter per destination file; use for jobs writing
+    several reports
+    args:
+        buffer_size: int, size of write buffer of each file in bytes
+    """
+
+    def __init__(self, buffer_size=DEFAULT_BUFFER_SIZE):
+        self.buffer_size = buffer_size
+        self._writers = dict()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def writerow(self, dst_fh, row):
+        """
+        args:
+            dst_fh: str, output file
+            row: list, list of values to write in a row
+        """
+        try:
+            writer = self._writers[dst_fh]
+        except KeyError:
+            writer = CsvWriter(dst_fh, self.buffer_size)
+            self._writers[dst_fh] = writer
+        writer.writerow(row)
+
+    def flush(self):
+        for writer in self._writers.values():
+            writer.flush()
+
+    def close(self):
+        for writer in self._writers.values():
+            writer.close()
+        self._writers.clear()
+
+
+class JsonlWriter:
+    """
+    Appends json objects to a JSON lines file keeping it open between writes
+    args:
+        dst_fh: str, output file
+        buffer_size: int, size of write buffer in bytes
+    """
+
+    def __init__(self, dst_fh, buffer_size=DEFAULT_BUFFER_SIZE):
+        self.dst_fh = dst_fh
+        self._file = open(dst_fh, "a", encoding="utf-8", buffering=buffer_size)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def write(self, obj):
+        """
+        args:
+            obj: json serializable object written as one line
+        """
+        self._file.write(json.dumps(obj) + "\n")
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class MarcWriter:
+    """
+    Appends MARC records to a file keeping it open between writes
+    args:
+        dst_fh: str, output file
+        buffer_size: int, size of write buffer in bytes
+    """
+
+    def __init__(self, dst_fh, buffer_size=DEFAULT_BUFFER_SIZE):
+        self.dst_fh = dst_fh
+        self._file = open(dst_fh, "ab", buffering=buffer_size)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def write(self, record):
+        """
+        args:
+            record: pymarc.Record
+        """
+        self._file.write(record.as_marc())
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def save2csv(dst_fh, row):
+    """
+    Appends a list with data to a dst_fh csv
+    args:
+        dst_fh: str, output file
+        row: list, list of values to write in a row
+    """
+
+    with CsvWriter(dst_fh) as writer:
+        writer.writerow(row)
+
 
 def save2marc(dst_fh, record):
-    with open(dst_fh, "ab") as marcfile:
-        marcfile.write(record.as_marc())
+    with MarcWriter(dst_fh) as writer:
+        writer.write(record)
@@ -1,12 +1,52 @@
 """
 Use to check if NYPL Platform has given Sierra bib numbers
 """
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 import os
 import json
 import sys
+import time
 
 from bookops_nypl_platform import PlatformToken, PlatformSession
-from utils import save2csv
+from requests.adapters import HTTPAdapter
+
+from checkpoint import ROW_COMMIT_INTERVAL, Checkpoint
+from log_scanner import parse_404_line, scan_logs
+from log_tailer import LogTailer
+from platform_cache import CachedSessionMixin
+from platform_executor import ExecutorSessionMixin
+from utils import CsvWriter
+
+try:
+    from scripts.platform import PLATFORM_URL, AuthorizeAccess, TokenManager
+    from scripts.platform import PlatformSession as BulkPlatformSession
+except ImportError:
+    from platform import PLATFORM_URL, AuthorizeAccess, TokenManager
+    from platform import PlatformSession as BulkPlatformSession
+
+
+REPORT = "files/platform-bib-state.csv"
+# number of recently verified bib numbers remembered in follow mode
+FOLLOW_SEEN_LIMIT = 100000
+
+
+class CachedPlatformSession(
+    CachedSessionMixin, ExecutorSessionMixin, PlatformSession
+):
+    """
+    bookops_nypl_platform session that optionally serves responses
+    from platform_cache.ResponseCache and sends requests through
+    platform_executor.RequestExecutor; base_url overrides the url of
+    the target Platform environment (e.g. mock_platform.MockPlatform)
+    """
+
+    def __init__(self, *args, cache=None, executor=None, base_url=None, **kwargs):
+        self.cache = cache
+        self.executor = executor
+        super().__init__(*args, **kwargs)
+        if base_url is not None:
+            self.base_url = base_url
 
 
 def get_token(client_id, client_secret, oauth_server):
@@ -14,31 +54,208 @@ def get_token(client_id, client_secret, oauth_server):
     return token
 
 
-def extract_sierra_no(value):
-    bibNo = value[-10:-2]
-    return f"b{bibNo}a"
-
-
 def missing_sierra_numbers(log_fh):
     with open(log_fh, "r", errors="surrogateescape") as logfile:
         for line in logfile:
-            if "NYPL Platform request (404)" in line:
-                bibNo = extract_sierra_no(line)
+            bibNo = parse_404_line(line)
+            if bibNo is not None:
                 yield bibNo
 
 
+def make_batches(bibNos, batch_size):
+    return [bibNos[n : n + batch_size] for n in range(0, len(bibNos), batch_size)]
+
+
+def find_absent_bibs(session, bibNos):
+    """
+    queries Platform for a batch of bibs at once
+    args:
+        session: platform.PlatformSession
+        bibNos: list of bib numbers in "b12345678a" format
+    return:
+        list of bib numbers missing in the response
+    """
+    ids = [bibNo[1:-1] for bibNo in bibNos]
+    response = session.query_bibId(ids, limit=len(ids))
+    if response.status_code == 404:
+        found = set()
+    else:
+        response.raise_for_status()
+        found = {bib.get("id") for bib in response.json()["data"]}
+    return [bibNo for bibNo, bid in zip(bibNos, ids) if bid not in found]
+
+
 def check_bib_in_platform(session, bibNo):
     response = session.get_bib(bibNo)
     return response
 
 
-def verify(log_fh, token):
-    with PlatformSession(authorization=token) as session:
+def verify(log_fh, token, cache=None, journal_fh=None, executor=None, base_url=None):
+    checkpoint = None
+    if journal_fh is not None:
+        checkpoint = Checkpoint(journal_fh, [REPORT], ROW_COMMIT_INTERVAL)
+    with CachedPlatformSession(
+        authorization=token, cache=cache, executor=executor, base_url=base_url
+    ) as session, CsvWriter(REPORT) as report:
         bibNos = missing_sierra_numbers(log_fh)
+        if checkpoint is not None:
+            bibNos = checkpoint.skip(bibNos)
         for bibNo in bibNos:
             result = check_bib_in_platform(session, bibNo)
             print(f"{bibNo}:{result.status_code}")
-            save2csv("files/platform-bib-state.csv", [bibNo, result.status_code])
+            report.writerow([bibNo, result.status_code])
+            if checkpoint is not None:
+                checkpoint.commit(bibNo, report.flush)
+        if checkpoint is not None:
+            checkpoint.save(report.flush)
+
+
+def verify_bulk(
+    log_fhs,
+    token,
+    batch_size=50,
+    workers=4,
+    cache=None,
+    journal_fh=None,
+    executor=None,
+    base_url=PLATFORM_URL,
+):
+    """
+    verifies bib numbers of the logs in batches of comma-joined ids queried
+    concurrently; each bib number is checked once and only bibs absent
+    from Platform are reported (with 404 status)
+    args:
+        log_fhs: str or list, paths to overload logs (scanned in parallel)
+        token: dict or platform.TokenManager
+        batch_size: int, number of ids in one query
+        workers: int, number of concurrent queries
+        cache: platform_cache.ResponseCache
+        journal_fh: str, optional checkpoint journal (unit is a batch); bib
+                    numbers are verified in sorted order, so a rerun resumes
+                    after the last bib number of the last committed batch;
+                    the journal is cleared when a run completes, so numbers
+                    added to the logs since then that sort before it are
+                    verified by the next run
+        executor: platform_executor.RequestExecutor
+        base_url: str, Platform API url
+    return:
+        int, number of absent bibs found in this run
+    """
+    checkpoint = None
+    if journal_fh is not None:
+        checkpoint = Checkpoint(journal_fh, [REPORT])
+
+    if isinstance(log_fhs, str):
+        log_fhs = [log_fhs]
+    bibNos = sorted(scan_logs(log_fhs))
+    if checkpoint is not None and checkpoint.key is not None:
+        bibNos = [bibNo for bibNo in bibNos if bibNo > checkpoint.key]
+    batches = make_batches(bibNos, batch_size)
+
+    absent = 0
+    with BulkPlatformSession(
+        base_url=base_url, token=token, cache=cache, executor=executor
+    ) as session, CsvWriter(REPORT) as report, ThreadPoolExecutor(
+        max_workers=workers
+    ) as pool:
+        if workers > 1:
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+
+        def report_batch(batch, future):
+            missing = future.result()
+            for bibNo in missing:
+                print(f"{bibNo}:404")
+                report.writerow([bibNo, 404])
+            if checkpoint is not None:
+                checkpoint.commit(batch[-1], report.flush)
+            return len(missing)
+
+        # bounded window of queries in flight, results reported in order
+        pending = deque()
+        for batch in batches:
+            pending.append((batch, pool.submit(find_absent_bibs, session, batch)))
+            if len(pending) >= workers * 2:
+                absent += report_batch(*pending.popleft())
+        while pending:
+            absent += report_batch(*pending.popleft())
+
+    if checkpoint is not None:
+        checkpoint.clear()
+    return absent
+
+
+def verify_follow(
+    log_fh,
+    token,
+    state_fh,
+    batch_size=50,
+    interval=1.0,
+    max_wait=10.0,
+    cache=None,
+    executor=None,
+    base_url=PLATFORM_URL,
+    stop=None,
+    seen_limit=FOLLOW_SEEN_LIMIT,
+):
+    """
+    follows a growing (and rotated) log and verifies new 404 bib numbers
+    in micro-batches as they appear; the log position is saved after each
+    verified batch, so a restart does not reprocess the log
+    args:
+        log_fh: str, path to overload log
+        token: dict or platform.TokenManager
+        state_fh: str, path to json file with reached log position
+        batch_size: int, number of ids in one query
+        interval: float, seconds between checks of the log
+        max_wait: float, max seconds a bib number waits for its batch
+        cache: platform_cache.ResponseCache
+        executor: platform_executor.RequestExecutor
+        base_url: str, Platform API url
+        stop: threading.Event, ends following when set
+        seen_limit: int, number of most recent bib numbers not verified
+                    again when they reappear in the log
+    """
+    tailer = LogTailer(log_fh, state_fh)
+    seen = OrderedDict()
+    pending = []
+    first_pending = None
+    with BulkPlatformSession(
+        base_url=base_url, token=token, cache=cache, executor=executor
+    ) as session, CsvWriter(REPORT) as report:
+        while stop is None or not stop.is_set():
+            for line in tailer.read_lines():
+                bibNo = parse_404_line(line)
+                if bibNo is None:
+                    continue
+                if bibNo in seen:
+                    seen.move_to_end(bibNo)
+                    continue
+                seen[bibNo] = None
+                if len(seen) > seen_limit:
+                    seen.popitem(last=False)
+                pending.append(bibNo)
+            if pending and first_pending is None:
+                first_pending = time.monotonic()
+
+            if len(pending) >= batch_size or (
+                pending and time.monotonic() - first_pending >= max_wait
+            ):
+                for batch in make_batches(pending, batch_size):
+                    for bibNo in find_absent_bibs(session, batch):
+                        print(f"{bibNo}:404")
+                        report.writerow([bibNo, 404])
+                report.flush()
+                pending = []
+                first_pending = None
+            if not pending:
+                tailer.save()
+
+            if stop is not None:
+                stop.wait(interval)
+            else:
+                time.sleep(interval)
 
 
 if __name__ == "__main__":
@@ -49,4 +266,16 @@ if __name__ == "__main__":
             creds["client-id"], creds["client-secret"], creds["oauth-server"]
         )
     log_fh = sys.argv[1]
-    verify(log_fh, token)
+    if "--follow" in sys.argv[2:]:
+        auth = AuthorizeAccess(
+            creds["client-id"], creds["client-secret"], creds["oauth-server"]
+        )
+        verify_follow(log_fh, TokenManager(auth), f"{log_fh}.verify-state.json")
+    elif "--bulk" in sys.argv[2:]:
+        auth = AuthorizeAccess(
+            creds["client-id"], creds["client-secret"], creds["oauth-server"]
+        )
+        log_fhs = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+        verify_bulk(log_fhs, TokenManager(auth))
+    else:
+        verify(log_fh, token)
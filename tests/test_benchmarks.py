@@ -0,0 +1,61 @@
+from scripts.benchmarks import (
+    find_regressions,
+    generate_platform_bibs,
+    measure,
+    repeat_sample,
+    write_marc_file,
+)
+from scripts.marc_scanner import scan
+from scripts.platform_bib_parser import get_bibNo, parse_bib
+
+
+def test_generate_platform_bibs_is_deterministic():
+    bibs1 = list(generate_platform_bibs(20))
+    bibs2 = list(generate_platform_bibs(20))
+    assert bibs1 == bibs2
+    assert get_bibNo(parse_bib(bibs1[0])) == "10000000"
+
+
+def test_write_marc_file(tmp_path):
+    fh = str(tmp_path / "bench.mrc")
+    write_marc_file(fh, 5)
+    records = [record.values("907") for record in scan(fh)]
+    assert records[0] == [".b20000000x"]
+    assert len(records) == 5
+
+
+def test_measure():
+    result = measure("sum", lambda: sum(range(1000)), 1000, 1000)
+    assert result["name"] == "sum"
+    assert result["units"] == 1000
+    assert result["seconds"] > 0
+    assert result["peak_memory"] is not None
+
+
+def test_measure_times_without_tracing():
+    calls = []
+    measure("append", lambda: calls.append(1), 1, 1)
+    # timed run and a separate run with tracemalloc
+    assert len(calls) == 2
+
+    calls.clear()
+    result = measure("append", lambda: calls.append(1), 1, 1, trace_memory=False)
+    assert len(calls) == 1
+    assert result["peak_memory"] is None
+
+
+def test_repeat_sample():
+    assert list(repeat_sample([1, 2, 3], 7)) == [1, 2, 3, 1, 2, 3, 1]
+    assert list(repeat_sample([1, 2, 3], 2)) == [1, 2]
+
+
+def test_find_regressions():
+    history = [
+        dict(name="marc2list", size=10, seconds=1.0, peak_memory=100),
+        dict(name="marc2list", size=10, seconds=2.0, peak_memory=100),
+        dict(name="marc2list", size=1000, seconds=1.0, peak_memory=100),
+    ]
+    results = [dict(name="marc2list", size=10, seconds=2.2, peak_memory=200)]
+    assert find_regressions(results, history) == [
+        ("marc2list", "peak_memory", 100, 200)
+    ]
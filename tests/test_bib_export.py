@@ -0,0 +1,81 @@
+from datetime import datetime
+import json
+
+import pytest
+
+from scripts.bib_export import (
+    COLUMNS,
+    arrow_schema,
+    export_bibs,
+    flatten_bib,
+    read_bibs,
+    timestamp_to_datetime,
+)
+
+
+def test_flatten_bib(test_bib):
+    row = flatten_bib(test_bib)
+    assert list(row) == [name for name, _ in COLUMNS]
+    assert row["id"] == "17189814"
+    assert row["rec_type"] == "a"
+    assert row["blvl"] == "m"
+    assert row["item_form"] == " "
+    assert row["standard_numbers"] == ["0679894608", "0679994602"]
+    assert row["branch_call_number"] == "J YR FIC ROY"
+    assert row["oclc_number"] == "44066905"
+    assert row["lccn"] == "00029068"
+    assert row["marked_for_deletion"] is False
+
+
+def test_flatten_bib_missing_fields():
+    row = flatten_bib({"id": "1"})
+    assert row["leader"] is None
+    assert row["blvl"] is None
+    assert row["date1"] is None
+    assert row["standard_numbers"] == []
+    assert row["locations"] == []
+    assert row["updated"] is None
+    assert row["marked_for_deletion"] is False
+
+
+@pytest.mark.parametrize(
+    "test_input,expected",
+    [
+        (20200706121314.0, datetime(2020, 7, 6, 12, 13, 14)),
+        (0.0, None),
+        (99999999999999.0, None),
+    ],
+)
+def test_timestamp_to_datetime(test_input, expected):
+    assert timestamp_to_datetime(test_input) == expected
+
+
+def test_export_bibs_jsonl(tmp_path, test_bib):
+    updated = dict(test_bib, normTitle="updated")
+    src = tmp_path / "snapshot.jsonl"
+    src.write_text(
+        "\n".join(json.dumps(bib) for bib in [test_bib, {"id": "1"}, updated])
+    )
+    dst = str(tmp_path / "bibs.jsonl")
+    assert export_bibs(read_bibs(str(src)), dst) == 2
+    # rerun overwrites the export
+    assert export_bibs(read_bibs(str(src)), dst) == 2
+    with open(dst) as file:
+        rows = [json.loads(line) for line in file]
+    # harvested twice, last version is kept
+    assert [row["id"] for row in rows] == ["1", "17189814"]
+    assert rows[1]["norm_title"] == "updated"
+
+
+def test_export_bibs_parquet(tmp_path, test_bib):
+    import pyarrow.parquet as pq
+
+    dst = str(tmp_path / "bibs.parquet")
+    bibs = [test_bib, {"id": "1"}, {"id": "2"}]
+    assert export_bibs(bibs, dst, batch_size=2) == 3
+    table = pq.read_table(dst)
+    assert table.num_rows == 3
+    assert table.column_names == [name for name, _ in COLUMNS]
+    assert table.column("id").to_pylist() == ["17189814", "1", "2"]
+    assert table.schema.equals(arrow_schema())
+    assert table.column("blvl").to_pylist() == ["m", None, None]
@@ -0,0 +1,98 @@
+import copy
+import json
+
+from pymarc import Record, Field
+import pytest
+
+from scripts.bib_store import BibStore, bib_identifiers, marc2platform
+from scripts.marc_scanner import RecordView
+
+
+@pytest.fixture
+def store(tmp_path):
+    with BibStore(str(tmp_path / "bibs.db")) as store:
+        yield store
+
+
+def test_bib_identifiers(test_bib):
+    assert sorted(bib_identifiers(test_bib)) == [
+        ("callnum", "J YR FIC ROY"),
+        ("isbn", "0679894608"),
+        ("isbn", "0679994602"),
+        ("lccn", "00029068"),
+        ("oclc", "44066905"),
+        ("title", "lucky lottery"),
+    ]
+
+
+def test_find(store, test_bib):
+    other = copy.deepcopy(test_bib)
+    other["id"] = "10000001"
+    other["standardNumbers"] = ["9780000000001"]
+    store.load_bibs([test_bib, other])
+
+    assert len(store) == 2
+    assert [b.get("id") for b in store.find("isbn", ["0679994602"])] == ["17189814"]
+    assert len(store.find("oclc", "44066905")) == 2
+    assert store.find("isbn", []) == []
+
+
+def test_load_bibs_replaces_older_version(store, test_bib):
+    store.load_bibs([test_bib])
+    newer = copy.deepcopy(test_bib)
+    newer["standardNumbers"] = ["9780000000001"]
+    store.load_bibs([newer])
+
+    assert len(store) == 1
+    assert store.find("isbn", "0679894608") == []
+    assert store.get_bib("17189814").get("standardNumbers") == ["9780000000001"]
+
+
+def test_iter_bibs_skips_deleted(store, test_bib):
+    deleted = copy.deepcopy(test_bib)
+    deleted["deleted"] = True
+    store.load_bibs([deleted])
+
+    assert list(store.iter_bibs(standardNumber=["0679894608"])) == []
+
+
+def test_load_jsonl(store, test_bib, tmp_path):
+    fh = str(tmp_path / "bibs.jsonl")
+    with open(fh, "w") as file:
+        file.write(json.dumps(test_bib) + "\n")
+
+    assert store.load_jsonl(fh) == 1
+
+
+def test_marc2platform():
+    bib = Record()
+    bib.leader = "01000nam a2200313ua 4500"
+    bib.add_field(Field(tag="001", data="ocm1234"))
+    bib.add_field(
+        Field(tag="020", indicators=[" ", " "], subfields=["a", "0679894608 (pbk.)"])
+    )
+    bib.add_field(
+        Field(tag="907", indicators=[" ", " "], subfields=["a", ".b123456789"])
+    )
+
+    view = RecordView(bib.as_marc())
+    data = marc2platform(view)
+    assert data["id"] == "12345678"
+    assert data["standardNumbers"] == ["0679894608"]
+    assert data["varFields"][0]["content"] == view.leader
+
+
+def test_all_bibs(store, test_bib):
+    other = copy.deepcopy(test_bib)
+    other["id"] = "10000001"
+    store.load_bibs([test_bib, other])
+
+    assert [b.get("id") for b in store.all_bibs()] == ["10000001", "17189814"]
+
+
+def test_all_bibs_in_chunks(store, test_bib):
+    bibs = [dict(copy.deepcopy(test_bib), id=f"1000000{n}") for n in range(5)]
+    store.load_bibs(bibs)
+    assert [b.get("id") for b in store.all_bibs(chunk_size=2)] == [
+        f"1000000{n}" for n in range(5)
+    ]
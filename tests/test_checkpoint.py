@@ -0,0 +1,91 @@
+import os
+
+from scripts.checkpoint import Checkpoint
+
+
+def run_job(journal_fh, report_fh, units, fail_at=None):
+    checkpoint = Checkpoint(journal_fh, [report_fh])
+    for unit in checkpoint.skip(units):
+        with open(report_fh, "a") as report:
+            report.write(f"{unit}\n")
+        if unit == fail_at:
+            raise RuntimeError("crash")
+        checkpoint.commit(unit)
+
+
+def test_resume_produces_identical_report(tmp_path):
+    journal_fh = str(tmp_path / "job.journal")
+    report_fh = str(tmp_path / "report.csv")
+    units = ["b1a", "b2a", "b3a", "b4a"]
+
+    try:
+        run_job(journal_fh, report_fh, units, fail_at="b3a")
+    except RuntimeError:
+        pass
+    run_job(journal_fh, report_fh, units)
+
+    with open(report_fh) as report:
+        assert report.read() == "b1a\nb2a\nb3a\nb4a\n"
+
+
+def test_checkpoint_position(tmp_path):
+    journal_fh = str(tmp_path / "job.journal")
+    report_fh = str(tmp_path / "report.csv")
+    run_job(journal_fh, report_fh, ["b1a", "b2a"])
+
+    checkpoint = Checkpoint(journal_fh, [report_fh])
+    assert checkpoint.position == 2
+    assert checkpoint.key == "b2a"
+    assert list(checkpoint.skip(["b1a", "b2a", "b3a"])) == ["b3a"]
+
+
+def test_commit_interval(tmp_path):
+    journal_fh = str(tmp_path / "job.journal")
+    report_fh = str(tmp_path / "report.csv")
+    checkpoint = Checkpoint(journal_fh, [report_fh], commit_interval=2)
+    for unit in ["b1a", "b2a", "b3a"]:
+        with open(report_fh, "a") as report:
+            report.write(f"{unit}\n")
+        checkpoint.commit(unit)
+
+    # crash before save: third unit is redone on resume
+    resumed = Checkpoint(journal_fh, [report_fh])
+    assert resumed.position == 2
+    with open(report_fh) as report:
+        assert report.read() == "b1a\nb2a\n"
+
+    resumed.commit("b3a")
+    resumed.save()
+    assert Checkpoint(journal_fh, [report_fh]).key == "b3a"
+
+
+def test_journal_keeps_last_entry(tmp_path):
+    journal_fh = str(tmp_path / "job.journal")
+    report_fh = str(tmp_path / "report.csv")
+    run_job(journal_fh, report_fh, ["b1a", "b2a", "b3a"])
+
+    with open(journal_fh) as journal:
+        assert len(journal.readlines()) == 1
+
+
+def test_flush_only_when_journal_is_written(tmp_path):
+    journal_fh = str(tmp_path / "job.journal")
+    report_fh = str(tmp_path / "report.csv")
+    flushes = []
+    checkpoint = Checkpoint(journal_fh, [report_fh], commit_interval=3)
+    for unit in ["b1a", "b2a", "b3a", "b4a"]:
+        checkpoint.commit(unit, lambda: flushes.append(checkpoint.position))
+    assert flushes == [3]
+
+    checkpoint.save(lambda: flushes.append(checkpoint.position))
+    assert flushes == [3, 4]
+
+
+def test_clear(tmp_path):
+    journal_fh = str(tmp_path / "job.journal")
+    report_fh = str(tmp_path / "report.csv")
+    checkpoint = Checkpoint(journal_fh, [report_fh])
+    checkpoint.commit("b1a")
+    checkpoint.clear()
+    assert not os.path.exists(journal_fh)
+    assert Checkpoint(journal_fh, [report_fh]).key is None
@@ -0,0 +1,30 @@
+from scripts.clusters import UnionFind, cluster_ids
+
+
+def test_union_find():
+    sets = UnionFind()
+    for item in "abcde":
+        sets.add(item)
+    sets.union("a", "b")
+    sets.union("c", "d")
+    sets.union("b", "d")
+
+    assert sets.find("a") == sets.find("c")
+    assert sets.find("e") == "e"
+    assert sorted(sorted(g) for g in sets.groups()) == [["a", "b", "c", "d"], ["e"]]
+
+
+def test_cluster_ids_transitive():
+    records = [
+        ("1", [("isbn", "111")]),
+        ("2", [("isbn", "222")]),
+        ("3", [("isbn", "111"), ("oclc", "9")]),
+        ("4", [("oclc", "9")]),
+        ("5", []),
+    ]
+    assert cluster_ids(records) == [["1", "3", "4"], ["2"], ["5"]]
+
+
+def test_cluster_ids_keys_of_different_kinds_do_not_match():
+    records = [("1", [("isbn", "9")]), ("2", [("oclc", "9")])]
+    assert cluster_ids(records) == [["1"], ["2"]]
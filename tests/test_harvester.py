@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta
+import json
+
+import pytest
+
+from scripts.harvester import (
+    harvest,
+    load_high_water_mark,
+    parse_date,
+    split_window,
+)
+
+
+class StubSession:
+    def __init__(self, dates):
+        self.records = [
+            dict(id=str(n), updatedDate=date) for n, date in enumerate(dates)
+        ]
+        self.requests = 0
+
+    def _matching(self, filters):
+        start, end = [parse_date(d) for d in filters["updatedDate"]]
+        return [r for r in self.records if start <= parse_date(r["updatedDate"]) <= end]
+
+    def query_page(self, path, limit=50, offset=0, **filters):
+        self.requests += 1
+        return self._matching(filters)[offset : offset + limit]
+
+    def iter_query(self, path, limit=50, **filters):
+        return iter(self._matching(filters))
+
+
+def test_split_window():
+    start = datetime(2020, 1, 1)
+    end = datetime(2020, 1, 1, 0, 0, 9)
+    left, right = split_window(start, end)
+    assert left == (start, datetime(2020, 1, 1, 0, 0, 4))
+    assert right[0] == left[1] + timedelta(seconds=1)
+    assert right[1] == end
+
+
+def test_harvest_splits_full_windows(tmp_path):
+    dates = [f"2020-01-{day:02}T00:00:00Z" for day in range(1, 21)]
+    session = StubSession(dates)
+    dst_fh = str(tmp_path / "bibs.jsonl")
+    state_fh = str(tmp_path / "state.json")
+
+    total = harvest(
+        session,
+        dst_fh,
+        state_fh,
+        start=datetime(2020, 1, 1),
+        end=datetime(2020, 2, 1),
+        limit=3,
+    )
+
+    with open(dst_fh) as file:
+        ids = sorted(int(json.loads(line)["id"]) for line in file)
+    assert total == 20
+    assert ids == list(range(20))
+    assert load_high_water_mark(state_fh) == datetime(2020, 2, 1)
+
+
+def test_harvest_resumes_from_high_water_mark(tmp_path):
+    session = StubSession(["2020-01-05T00:00:00Z", "2020-03-05T00:00:00Z"])
+    dst_fh = str(tmp_path / "bibs.jsonl")
+    state_fh = str(tmp_path / "state.json")
+    harvest(
+        session, dst_fh, state_fh, start=datetime(2020, 1, 1), end=datetime(2020, 2, 1)
+    )
+
+    assert harvest(session, dst_fh, state_fh, end=datetime(2020, 4, 1)) == 1
+
+
+def test_harvest_first_run_without_start(tmp_path):
+    with pytest.raises(ValueError):
+        harvest(StubSession([]), str(tmp_path / "a"), str(tmp_path / "b"))
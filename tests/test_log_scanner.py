@@ -0,0 +1,55 @@
+import pytest
+
+from scripts.log_scanner import (
+    parse_404_line,
+    scan_log,
+    scan_logs,
+    sierra_check_digit,
+)
+
+
+@pytest.mark.parametrize(
+    "digits,expected",
+    [("1024364", "1"), ("20227837", "2"), ("10000006", "x")],
+)
+def test_sierra_check_digit(digits, expected):
+    assert sierra_check_digit(digits) == expected
+
+
+@pytest.mark.parametrize(
+    "line,expected",
+    [
+        ("NYPL Platform request (404): .b202278372\n", "b20227837a"),
+        ("NYPL Platform request (404): b20227837a\r\n", "b20227837a"),
+        ("NYPL Platform request (404) for .b20227837x", None),
+        ("NYPL Platform request (200): .b202278372", None),
+    ],
+)
+def test_parse_404_line(line, expected):
+    assert parse_404_line(line) == expected
+
+
+@pytest.fixture
+def logs(tmp_path):
+    fh1 = str(tmp_path / "overload.log")
+    fh2 = str(tmp_path / "overload.log.1")
+    with open(fh1, "wb") as log:
+        log.write(b"INFO NYPL Platform request (404): .b202278372\n")
+        log.write(b"INFO NYPL Platform request (200): .b10243641\n")
+        log.write(b"INFO \xff\xfe NYPL Platform request (404): .b100000060\n")
+        log.write(b"INFO NYPL Platform request (404): .b10000006x")
+    with open(fh2, "wb") as log:
+        log.write(b"INFO NYPL Platform request (404): .b202278372\n")
+    open(str(tmp_path / "empty.log"), "wb").close()
+    return [fh1, fh2, str(tmp_path / "empty.log")]
+
+
+def test_scan_log(logs):
+    # invalid check digit of b10000006 is rejected
+    assert scan_log(logs[0]) == {"b20227837a", "b10000006a"}
+    assert scan_log(logs[2]) == set()
+
+
+def test_scan_logs(logs):
+    assert scan_logs(logs, workers=2) == {"b20227837a", "b10000006a"}
+    assert scan_logs(logs, workers=1) == {"b20227837a", "b10000006a"}
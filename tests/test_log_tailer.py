@@ -0,0 +1,83 @@
+import os
+
+from scripts.log_tailer import LogTailer, read_complete_lines
+
+
+def write(fh, text, mode="a"):
+    with open(fh, mode) as file:
+        file.write(text)
+
+
+def test_reads_complete_lines_only(tmp_path):
+    log_fh = str(tmp_path / "overload.log")
+    write(log_fh, "line 1\nline")
+    tailer = LogTailer(log_fh, str(tmp_path / "state.json"))
+
+    assert tailer.read_lines() == ["line 1\n"]
+    write(log_fh, " 2\n")
+    assert tailer.read_lines() == ["line 2\n"]
+    assert tailer.read_lines() == []
+
+
+def test_position_persists(tmp_path):
+    log_fh = str(tmp_path / "overload.log")
+    state_fh = str(tmp_path / "state.json")
+    write(log_fh, "line 1\n")
+    tailer = LogTailer(log_fh, state_fh)
+    tailer.read_lines()
+    tailer.save()
+
+    write(log_fh, "line 2\n")
+    assert LogTailer(log_fh, state_fh).read_lines() == ["line 2\n"]
+
+
+def test_rotation(tmp_path):
+    log_fh = str(tmp_path / "overload.log")
+    write(log_fh, "line 1\n")
+    tailer = LogTailer(log_fh, str(tmp_path / "state.json"))
+    tailer.read_lines()
+
+    # RotatingFileHandler.doRollover
+    write(log_fh, "line 2\n")
+    os.rename(log_fh, f"{log_fh}.1")
+    write(log_fh, "line 3\n")
+    assert tailer.read_lines() == ["line 2\n", "line 3\n"]
+
+
+def test_truncation(tmp_path):
+    log_fh = str(tmp_path / "overload.log")
+    write(log_fh, "line 1\nline 2\n")
+    tailer = LogTailer(log_fh, str(tmp_path / "state.json"))
+    tailer.read_lines()
+
+    write(log_fh, "line 3\n", mode="w")
+    assert tailer.read_lines() == ["line 3\n"]
+
+
+def test_save_only_when_position_changes(tmp_path):
+    log_fh = str(tmp_path / "overload.log")
+    state_fh = str(tmp_path / "state.json")
+    write(log_fh, "line 1\n")
+    tailer = LogTailer(log_fh, state_fh)
+    tailer.read_lines()
+    tailer.save()
+    os.remove(state_fh)
+
+    tailer.read_lines()
+    tailer.save()
+    assert not os.path.exists(state_fh)
+
+    write(log_fh, "line 2\n")
+    tailer.read_lines()
+    tailer.save()
+    assert os.path.exists(state_fh)
+
+
+def test_read_complete_lines_in_chunks(tmp_path):
+    log_fh = str(tmp_path / "overload.log")
+    write(log_fh, "line 1\nlong line 2\n\nline")
+
+    lines, offset = read_complete_lines(log_fh, 0, chunk_size=4)
+    assert lines == ["line 1\n", "long line 2\n", "\n"]
+    assert offset == 20
+    assert read_complete_lines(log_fh, 7, chunk_size=4) == (["long line 2\n", "\n"], 20)
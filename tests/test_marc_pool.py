@@ -0,0 +1,53 @@
+from pymarc import Record, Field
+
+import pytest
+
+from scripts.marc_pool import read_chunks, read_raw_records, transform_file
+from scripts.readalong import process_bib
+
+
+@pytest.fixture
+def stub_file(tmp_path):
+    fh = str(tmp_path / "src.mrc")
+    with open(fh, "wb") as marcfile:
+        for n in range(5):
+            bib = Record()
+            bib.leader = "01000nam a2200313ua 4500"
+            bib.add_field(Field(tag="001", data=f"bib{n}"))
+            bib.add_field(
+                Field(
+                    tag="099",
+                    indicators=[" ", " "],
+                    subfields=["a", "READALONG", "a", "J", "a", "FIC", "a", "ADAMS"],
+                )
+            )
+            bib.add_field(Field(tag="998", indicators=[" ", " "], subfields=["e", "-"]))
+            marcfile.write(bib.as_marc())
+    return fh
+
+
+def test_read_raw_records(stub_file):
+    records = list(read_raw_records(stub_file))
+    assert len(records) == 5
+    assert Record(records[3])["001"].data == "bib3"
+
+
+def test_read_chunks(stub_file):
+    assert [len(c) for c in read_chunks(stub_file, chunk_size=2)] == [2, 2, 1]
+
+
+def test_read_raw_records_invalid_length(tmp_path):
+    fh = str(tmp_path / "bad.mrc")
+    with open(fh, "wb") as marcfile:
+        marcfile.write(b"foo")
+    with pytest.raises(ValueError):
+        list(read_raw_records(fh))
+
+
+def test_transform_file_keeps_order(stub_file, tmp_path):
+    dst = str(tmp_path / "dst.mrc")
+    transform_file(stub_file, dst, process_bib, workers=2, chunk_size=2)
+
+    records = [Record(data) for data in read_raw_records(dst)]
+    assert [bib["001"].data for bib in records] == [f"bib{n}" for n in range(5)]
+    assert records[0]["099"].value() == "READALONG J-E ADAMS"
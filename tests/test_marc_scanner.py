@@ -0,0 +1,114 @@
+from pymarc import Record, Field
+
+import pytest
+
+from scripts.marc_scanner import RecordFilter, RecordView, scan
+
+
+@pytest.fixture
+def stub_bib():
+    bib = Record()
+    bib.leader = "01000nam a2200313ua 4500"
+    bib.add_field(Field(tag="001", data="ocm1234"))
+    bib.add_field(Field(tag="008", data="000313s2000    nyua   j      000 1 eng  "))
+    bib.add_field(
+        Field(tag="020", indicators=[" ", " "], subfields=["a", "0679894608 (pbk.)"])
+    )
+    bib.add_field(
+        Field(tag="020", indicators=[" ", " "], subfields=["a", "0679994602"])
+    )
+    bib.add_field(
+        Field(
+            tag="245",
+            indicators=["1", "0"],
+            subfields=["a", "Café ", "c", "Roy"],
+        )
+    )
+    return bib
+
+
+def test_record_view_leader(stub_bib):
+    view = RecordView(stub_bib.as_marc())
+    assert view.leader[6:8] == "am"
+
+
+def test_record_view_control_field(stub_bib):
+    view = RecordView(stub_bib.as_marc())
+    assert view.control_field("001") == "ocm1234"
+    assert view.control_field("003") is None
+
+
+def test_record_view_values_match_pymarc(stub_bib):
+    view = RecordView(stub_bib.as_marc())
+    for tag in ("001", "020", "245", "500"):
+        assert view.values(tag) == [f.value() for f in stub_bib.get_fields(tag)]
+
+
+def test_record_view_subfields(stub_bib):
+    view = RecordView(stub_bib.as_marc())
+    assert view.subfields("245") == [[("a", "Café "), ("c", "Roy")]]
+
+
+def test_record_view_has_tag(stub_bib):
+    view = RecordView(stub_bib.as_marc())
+    assert view.has_tag("020")
+    assert not view.has_tag("852")
+
+
+def test_scan(stub_bib, tmp_path):
+    fh = str(tmp_path / "src.mrc")
+    with open(fh, "wb") as marcfile:
+        marcfile.write(stub_bib.as_marc() * 3)
+
+    records = [bib.raw for bib in scan(fh)]
+    assert records == [stub_bib.as_marc()] * 3
+
+
+def test_scan_empty_file(tmp_path):
+    fh = str(tmp_path / "empty.mrc")
+    open(fh, "wb").close()
+    assert list(scan(fh)) == []
+
+
+def test_scan_stopped_early(stub_bib, tmp_path):
+    fh = str(tmp_path / "src.mrc")
+    with open(fh, "wb") as marcfile:
+        marcfile.write(stub_bib.as_marc() * 3)
+
+    for bib in scan(fh):
+        break
+
+
+@pytest.mark.parametrize(
+    "kwargs,expectation",
+    [
+        (dict(leader={6: "a", 7: "m"}), True),
+        (dict(leader={6: "c"}), False),
+        (dict(control_fields={"008": {23: " d"}}), True),
+        (dict(control_fields={"008": {23: "o"}}), False),
+        (dict(control_fields={"008": {60: " "}}), False),
+        (dict(control_fields={"006": {0: "a"}}), False),
+        (dict(present=["020", "245"]), True),
+        (dict(present=["907"]), False),
+        (dict(absent=["852"]), True),
+        (dict(absent=["020"]), False),
+    ],
+)
+def test_record_filter(stub_bib, kwargs, expectation):
+    view = RecordView(stub_bib.as_marc())
+    assert RecordFilter(**kwargs).matches(view) is expectation
+
+
+def test_scan_with_filter(stub_bib, tmp_path):
+    fh = str(tmp_path / "src.mrc")
+    other = Record()
+    other.leader = "01000ncm a2200313ua 4500"
+    other.add_field(Field(tag="001", data="other"))
+    with open(fh, "wb") as marcfile:
+        marcfile.write(other.as_marc() + stub_bib.as_marc() + other.as_marc())
+
+    records = [
+        (bib.index, bib.control_field("001"))
+        for bib in scan(fh, RecordFilter(leader={6: "a"}))
+    ]
+    assert records == [(2, "ocm1234")]
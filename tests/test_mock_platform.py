@@ -0,0 +1,58 @@
+import pytest
+
+from scripts.mock_platform import MockPlatform
+from scripts.platform import AuthorizeAccess, PlatformSession, TokenManager
+from scripts.platform_executor import RequestExecutor
+
+BIBS = [
+    dict(id="1", deleted=False, standardNumbers=["111"], updatedDate="2020-01-01"),
+    dict(id="2", deleted=False, standardNumbers=["111", "222"], updatedDate="2021"),
+    dict(id="3", deleted=True, standardNumbers=["111"], updatedDate="2021-01-01"),
+]
+ITEMS = [dict(id="10", bibIds=["1"], barcode="3343"), dict(id="11", bibIds=["2"])]
+
+
+@pytest.fixture
+def server():
+    with MockPlatform(BIBS, ITEMS) as server:
+        yield server
+
+
+def session_for(server, **kwargs):
+    auth = AuthorizeAccess("id", "secret", server.url)
+    return PlatformSession(server.base_url, TokenManager(auth), **kwargs)
+
+
+def test_query_bibs(server):
+    with session_for(server) as session:
+        bibs = session.iter_bibs(limit=1, standardNumber=["111"])
+        assert [b["id"] for b in bibs] == ["1", "2"]
+        assert session.query_page("/bibs", standardNumber=["999"]) == []
+
+        bibs = session.query_page("/bibs", updatedDate=("2020-12-31", "2021-12-31"))
+        assert [b["id"] for b in bibs] == ["2"]
+
+
+def test_items(server):
+    with session_for(server) as session:
+        response = session.get_bibItems("1")
+        assert response.json()["data"] == [ITEMS[0]]
+        assert session.get_item("11").status_code == 200
+        assert session.query_itemBarcode("3343").json()["data"] == [ITEMS[0]]
+
+
+def test_expired_token_is_refreshed(server):
+    with session_for(server) as session:
+        assert session.query_bibStandardNo(["222"]).status_code == 200
+        server.expire_tokens()
+        assert session.query_bibStandardNo(["222"]).status_code == 200
+    assert server.stats[401] == 1
+
+
+def test_throttling_retried_by_executor():
+    with MockPlatform(BIBS, throttle_rate=0.5, retry_after=0, seed=1) as server:
+        executor = RequestExecutor(max_retries=10, sleep=lambda s: None)
+        with session_for(server, executor=executor) as session:
+            for _ in range(10):
+                assert session.query_bibStandardNo(["222"]).status_code == 200
+        assert server.stats[429] > 0
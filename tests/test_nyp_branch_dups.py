@@ -1,6 +1,12 @@
+import copy
+import threading
+import time
+
 import pytest
+import requests
 
 from scripts import nyp_branch_dups_discovery as dd
+from scripts.bib_store import BibStore
 
 
 @pytest.mark.parametrize(
@@ -30,3 +36,286 @@ def test_parse_bibNo(test_input, expected):
 )
 def test_is_valid_bib_type(rec_type, blvl, item_form, expected):
     assert dd.is_valid_bib_type(rec_type, blvl, item_form) == expected
+
+
+def test_score_breakdown_columns(test_bib):
+    breakdown = dd.score_breakdown({"17189814": test_bib})
+    assert len(breakdown["17189814"]) == len(dd.SCORING_RULE_NAMES)
+    # single bib in the group is the newest one
+    assert breakdown["17189814"][-1] == 1
+
+
+def test_determine_records_score_newest_bonus(test_bib):
+    older = copy.deepcopy(test_bib)
+    for field in older["varFields"]:
+        if field["marcTag"] == "005":
+            field["content"] = "20000101000000.0"
+    scores = dd.determine_records_score({"1": test_bib, "2": older})
+    assert scores["1"] == scores["2"] + 1
+
+
+def test_determine_records_score_items(test_bib):
+    with_items = dd.parse_bib(copy.deepcopy(test_bib))
+    with_items.items = [{"id": "1", "location": {"code": "hgj0f"}}]
+    research_items = dd.parse_bib(copy.deepcopy(test_bib))
+    research_items.items = [
+        {"id": "2", "location": {"code": "hgj0f"}},
+        {"id": "3", "location": {"code": "mab0v"}},
+    ]
+    no_items = dd.parse_bib(copy.deepcopy(test_bib))
+    no_items.items = []
+    scores = dd.determine_records_score(
+        {"1": test_bib, "2": with_items, "3": research_items, "4": no_items}
+    )
+    assert scores["2"] == scores["1"] + 3
+    assert scores["3"] == scores["1"] + 2
+    assert scores["4"] == scores["1"]
+
+
+class StubItemsSession:
+    def __init__(self):
+        self.requested = []
+
+    def get_bibItems(self, bid):
+        self.requested.append(bid)
+
+        class Response:
+            status_code = 404 if bid == "2" else 200
+
+            def raise_for_status(self):
+                pass
+
+            def json(self):
+                item = {"id": "i1", "barcode": "3343", "location": {"code": "mab0v"}}
+                return {"data": [item]}
+
+        return Response()
+
+
+def test_item_enricher(test_bib):
+    session = StubItemsSession()
+    bibs = {"1": dd.parse_bib(test_bib), "2": dd.parse_bib(copy.deepcopy(test_bib))}
+    with dd.ItemEnricher(session, workers=2) as enricher:
+        enricher.enrich(bibs)
+        enricher.enrich(bibs)
+    assert sorted(session.requested) == ["1", "2"]
+    assert bibs["1"].items == [{"id": "i1", "location": {"code": "mab0v"}}]
+    assert bibs["2"].items == []
+
+
+def test_item_enricher_cache_size(test_bib):
+    session = StubItemsSession()
+    bibs = {bid: dd.parse_bib(copy.deepcopy(test_bib)) for bid in ["1", "3", "4"]}
+    with dd.ItemEnricher(session, workers=2, cache_size=2) as enricher:
+        enricher.enrich(bibs)
+        enricher.enrich({"4": bibs["4"]})
+        enricher.enrich({"1": bibs["1"]})
+    # least recently enriched bib was evicted and fetched again
+    assert sorted(session.requested) == ["1", "1", "3", "4"]
+
+
+def test_create_dup_report_trace(test_bib):
+    other = copy.deepcopy(test_bib)
+    other["id"] = "10000001"
+    rows = []
+    trace = []
+
+    class Reports:
+        def writerow(self, dst_fh, row):
+            rows.append((dst_fh, row))
+
+    class Trace:
+        write = trace.append
+
+    dd.create_dup_report({"17189814": test_bib, "10000001": other}, Reports(), Trace())
+    assert (
+        dd.CONFIRMED_DUPS_REPORT,
+        ["b17189814a", "b10000001a", "J YR FIC ROY", "J YR FIC ROY", "awaiting"],
+    ) in rows
+    assert [(t["bid"], t["decision"]) for t in trace] == [
+        ("b17189814a", "destination"),
+        ("b10000001a", "duplicate"),
+    ]
+    assert trace[0]["components"]["newest"] == 1
+
+
+def test_report_clusters(tmp_path, test_bib):
+    other = copy.deepcopy(test_bib)
+    other["id"] = "10000001"
+    unique = copy.deepcopy(test_bib)
+    unique["id"] = "10000002"
+    unique["standardNumbers"] = ["9780000000002"]
+    for field in unique["varFields"]:
+        if field["marcTag"] == "001":
+            field["content"] = "99999999"
+    rows = []
+    trace = []
+
+    class Reports:
+        def writerow(self, dst_fh, row):
+            rows.append((dst_fh, row))
+
+    class Trace:
+        write = trace.append
+
+    with BibStore(str(tmp_path / "bibs.db")) as store:
+        store.load_bibs([test_bib, other, unique])
+        assert dd.report_clusters(store, Reports(), Trace()) == 1
+
+    assert [(t["bid"], t["decision"]) for t in trace] == [
+        ("b10000001a", "destination"),
+        ("b17189814a", "duplicate"),
+        ("b10000002a", "unique"),
+    ]
+
+
+def test_identify_library(test_bib, test_mixed_bib):
+    assert dd.identify_library(test_bib) == "branches"
+    assert dd.identify_library(test_mixed_bib) == "mixed"
+
+
+class StubSearchSession:
+    """
+    returns one bib per queried ISBN; earlier queries answer slower
+    """
+
+    def __init__(self):
+        self.started = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.queries = []
+        self._lock = threading.Lock()
+
+    def iter_bibs(self, limit=None, standardNumber=None):
+        with self._lock:
+            self.started += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            self.queries.append(list(standardNumber))
+            delay = 0.01 if self.started % 2 else 0.0
+        time.sleep(delay)
+        with self._lock:
+            self.in_flight -= 1
+        for isbn in standardNumber:
+            yield {"id": f"m{isbn}", "standardNumbers": [isbn], "locations": []}
+
+
+def source_rows(size):
+    return [(f"b{n}a", [f"isbn{n}"]) for n in range(size)]
+
+
+def test_fetch_matches_source_order_and_bounded_in_flight():
+    session = StubSearchSession()
+    workers = 3
+    results = []
+    for n, (sbid, matched_bibs) in enumerate(
+        dd.fetch_matches(session, iter(source_rows(20)), workers=workers)
+    ):
+        # queries are submitted only a bounded window ahead of the consumer
+        assert session.started <= n + 1 + 2 * workers
+        results.append((sbid, [dd.get_bibNo(bib) for bib in matched_bibs]))
+
+    assert results == [(f"b{n}a", [f"misbn{n}"]) for n in range(20)]
+    assert session.max_in_flight <= workers
+
+
+def test_fetch_matches_single_worker():
+    session = StubSearchSession()
+    results = list(dd.fetch_matches(session, source_rows(3), workers=1))
+    assert [sbid for sbid, _ in results] == ["b0a", "b1a", "b2a"]
+    assert session.max_in_flight == 1
+
+
+def test_plan_batches_keyword_budget():
+    rows = [("b1a", ["1", "2"]), ("b2a", ["3"]), ("b3a", ["4", "5"])]
+    assert [[sbid for sbid, _ in batch] for batch in dd.plan_batches(rows, 3)] == [
+        ["b1a", "b2a"],
+        ["b3a"],
+    ]
+
+
+def test_plan_batches_length_budget():
+    rows = [("b1a", ["1111"]), ("b2a", ["2222"]), ("b3a", ["3333"])]
+    # "1111,2222" fits in 9 characters, a third ISBN does not
+    batches = list(dd.plan_batches(rows, max_keywords=10, max_length=9))
+    assert [[sbid for sbid, _ in batch] for batch in batches] == [
+        ["b1a", "b2a"],
+        ["b3a"],
+    ]
+
+
+def test_plan_batches_does_not_split_rows():
+    rows = [("b1a", ["1", "2", "3"]), ("b2a", ["4"])]
+    assert list(dd.plan_batches(rows, max_keywords=2)) == [
+        [("b1a", ["1", "2", "3"])],
+        [("b2a", ["4"])],
+    ]
+
+
+class StubMatchesSession:
+    def __init__(self, bibs):
+        self.bibs = bibs
+        self.queries = []
+
+    def iter_bibs(self, limit=None, standardNumber=None):
+        self.queries.append(list(standardNumber))
+        return iter(self.bibs)
+
+
+class StubFailingSession:
+    def __init__(self, executor=None):
+        self.executor = executor
+
+    def iter_bibs(self, limit=None, standardNumber=None):
+        yield {"id": "1", "standardNumbers": ["a"], "locations": []}
+        raise requests.HTTPError("503 Server Error")
+
+
+def test_query_batch_error_without_executor():
+    bibs = dd.query_batch(StubFailingSession(), ["a"])
+    assert [b["id"] for b in bibs] == ["1"]
+
+
+def test_query_batch_error_with_executor():
+    with pytest.raises(requests.HTTPError):
+        dd.query_batch(StubFailingSession(executor=object()), ["a"])
+
+
+def test_find_matches_demultiplexes_by_isbn():
+    bibs = [
+        {"id": "1", "standardNumbers": ["a", "x"], "locations": []},
+        {"id": "2", "standardNumbers": ["b"], "locations": []},
+        {"id": "3", "standardNumbers": ["z"], "locations": []},
+    ]
+    session = StubMatchesSession(bibs)
+    results = dd.find_matches(session, [("b1a", ["a"]), ("b2a", ["b", "x"])])
+
+    assert session.queries == [["a", "b", "x"]]
+    matches = [(sbid, [dd.get_bibNo(bib) for bib in bibs]) for sbid, bibs in results]
+    assert matches == [("b1a", ["1"]), ("b2a", ["1", "2"])]
+
+
+@pytest.mark.parametrize("max_keywords", [1, 3])
+def test_find_matches_same_for_any_batch_size(max_keywords):
+    bibs = [
+        {"id": "1", "standardNumbers": ["a"], "locations": []},
+        {"id": "2", "standardNumbers": ["z"], "locations": []},
+    ]
+    session = StubMatchesSession(bibs)
+    results = list(dd.fetch_matches(session, [("b1a", ["a"])], 1, max_keywords))
+
+    # bib without a shared ISBN is not matched even to a single-row batch
+    assert [dd.get_bibNo(bib) for bib in results[0][1]] == ["1"]
+
+
+def test_find_matches_normalized_isbns():
+    bibs = [
+        {"id": "1", "standardNumbers": ["9780679894605"], "locations": []},
+        {"id": "2", "standardNumbers": ["0-679-99460-2"], "locations": []},
+    ]
+    session = StubMatchesSession(bibs)
+    results = dd.find_matches(session, [("b1a", ["0679894608 (pbk.)"])])
+    assert [dd.get_bibNo(bib) for bib in results[0][1]] == ["1"]
+
+    results = dd.find_matches(session, [("b2a", ["9780679994602"])])
+    assert [dd.get_bibNo(bib) for bib in results[0][1]] == ["2"]
@@ -0,0 +1,111 @@
+from datetime import datetime, timedelta
+import json
+
+import requests
+
+from scripts.platform import PlatformSession, TokenManager
+from scripts.platform_cache import ResponseCache, cache_key
+
+
+class StubAuth:
+    def __init__(self, expires_in=3600):
+        self.expires_in = expires_in
+        self.calls = 0
+
+    def get_token(self):
+        self.calls += 1
+        return dict(
+            id=f"token{self.calls}",
+            expires_on=datetime.now() + timedelta(seconds=self.expires_in),
+        )
+
+
+def test_token_manager_reuses_valid_token():
+    auth = StubAuth()
+    manager = TokenManager(auth)
+    assert manager.token["id"] == "token1"
+    assert manager.token["id"] == "token1"
+    assert auth.calls == 1
+
+
+def test_token_manager_refreshes_before_expiration():
+    auth = StubAuth(expires_in=30)
+    manager = TokenManager(auth, margin=60)
+    manager.token
+    assert manager.token["id"] == "token2"
+
+
+def test_token_manager_refresh_stale_token():
+    auth = StubAuth()
+    manager = TokenManager(auth)
+    stale = manager.token
+    assert manager.refresh(stale)["id"] == "token2"
+    # another thread already replaced the stale token
+    assert manager.refresh(stale)["id"] == "token2"
+    assert auth.calls == 2
+
+
+def test_session_gets_token_on_first_request(tmp_path):
+    auth = StubAuth()
+    with ResponseCache(str(tmp_path / "cache.db")) as cache:
+        params = dict(nyplSource="sierra-nypl", deleted=False, limit=50, offset=0)
+        response = requests.Response()
+        response.status_code = 200
+        response._content = json.dumps(dict(data=[dict(id="1")])).encode("utf-8")
+        cache.set(cache_key("https://foo/bibs", params), response)
+        cache.offline = True
+
+        session = PlatformSession(
+            base_url="https://foo", token=TokenManager(auth), cache=cache
+        )
+        assert session.query_page("/bibs") == [dict(id="1")]
+    # offline cache replay never calls the auth server
+    assert auth.calls == 0
+
+
+class StubPagedSession(PlatformSession):
+    def __init__(self, records):
+        super().__init__(
+            base_url="https://foo",
+            token=dict(id="token", expires_on=datetime.now() + timedelta(hours=1)),
+        )
+        self.records = records
+        self.requests = []
+
+    def get(self, endpoint, params=None, timeout=None):
+        self.requests.append(params)
+        response = requests.Response()
+        offset, limit = params["offset"], params["limit"]
+        data = self.records[offset : offset + limit]
+        if data:
+            response.status_code = 200
+            response._content = json.dumps(dict(data=data)).encode("utf-8")
+        else:
+            response.status_code = 404
+        return response
+
+
+def test_iter_bibs_pages_through_results():
+    session = StubPagedSession([dict(id=str(n)) for n in range(5)])
+    bibs = list(session.iter_bibs(limit=2, standardNumber=["1", "2"]))
+
+    assert [b["id"] for b in bibs] == ["0", "1", "2", "3", "4"]
+    assert [r["offset"] for r in session.requests] == [0, 2, 4]
+    assert session.requests[0]["standardNumber"] == "1,2"
+
+
+def test_iter_bibs_date_range():
+    session = StubPagedSession([])
+    list(session.iter_bibs(createdDate=("2020-01-01", "2020-02-01")))
+
+    assert session.requests[0]["createdDate"] == "[2020-01-01,2020-02-01]"
+
+
+def test_iter_bibs_stops_early():
+    session = StubPagedSession([dict(id=str(n)) for n in range(10)])
+    bibs = session.iter_bibs(limit=2)
+    next(bibs)
+    bibs.close()
+
+    # at most the first page and the prefetched one were requested
+    assert len(session.requests) <= 2
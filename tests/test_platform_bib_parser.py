@@ -1,3 +1,5 @@
+import pytest
+
 from scripts import platform_bib_parser as pbp
 
 
@@ -91,3 +93,54 @@ def test_get_encoding_level(test_bib):
 
 def test_get_timestamp(test_bib):
     assert pbp.get_timestamp(test_bib) == float("20060626011727.0")
+
+
+def test_parsed_bib_passthrough(test_bib):
+    parsed = pbp.parse_bib(test_bib)
+    assert pbp.parse_bib(parsed) is parsed
+
+
+def test_parsed_bib_getters_match_dict(test_bib):
+    parsed = pbp.ParsedBib(test_bib)
+    assert pbp.get_leader(parsed) == pbp.get_leader(test_bib)
+    assert pbp.get_oclc_number(parsed) == pbp.get_oclc_number(test_bib)
+    assert pbp.get_bibNo(parsed) == "17189814"
+    assert pbp.is_marked_for_deletion(parsed) is False
+
+
+def test_has_tag_missing_varfields():
+    assert pbp.has_050_tag({"id": "1"}) is False
+
+
+def test_get_lccn(test_bib):
+    assert pbp.get_lccn(test_bib) == "00029068"
+
+
+def test_get_item_count_not_fetched(test_bib):
+    assert pbp.get_item_count(test_bib) is None
+    assert pbp.get_item_locations(test_bib) == []
+
+
+def test_get_item_count_and_locations(test_bib):
+    bib = pbp.parse_bib(test_bib)
+    bib.items = [
+        {"id": "1", "location": {"code": "mab0v"}},
+        {"id": "2", "location": {"code": "ia"}},
+    ]
+    assert pbp.get_item_count(bib) == 2
+    assert pbp.get_item_locations(bib) == ["mab0v", "ia"]
+
+
+@pytest.mark.parametrize(
+    "test_input,expected",
+    [
+        ("9780679894605", "9780679894605"),
+        ("0679894608", "9780679894605"),
+        ("0-679-89460-8", "9780679894605"),
+        ("0679894608 (pbk.)", "9780679894605"),
+        ("978-0-679-89460-5(lib. bdg.)", "9780679894605"),
+        ("067989460x", "9780679894605"),
+    ],
+)
+def test_normalize_isbn(test_input, expected):
+    assert pbp.normalize_isbn(test_input) == expected
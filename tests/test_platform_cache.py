@@ -0,0 +1,111 @@
+import pytest
+import requests
+
+from scripts.platform_cache import ResponseCache, cache_key
+
+
+def stub_response(code=200, content=b'{"data": []}'):
+    response = requests.Response()
+    response.status_code = code
+    response._content = content
+    return response
+
+
+class StubSend:
+    def __init__(self, code=200):
+        self.code = code
+        self.calls = 0
+
+    def __call__(self, method, url, **kwargs):
+        self.calls += 1
+        return stub_response(self.code)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    with ResponseCache(str(tmp_path / "cache.db")) as cache:
+        yield cache
+
+
+def test_cache_key_ignores_params_order():
+    assert cache_key("https://foo/bibs", dict(id="1", limit=20)) == cache_key(
+        "https://foo/bibs", dict(limit=20, id="1")
+    )
+
+
+def test_fetch_stores_response(cache):
+    send = StubSend()
+    cache.fetch(send, "GET", "https://foo/bibs", params=dict(id="1"))
+    response = cache.fetch(send, "GET", "https://foo/bibs", params=dict(id="1"))
+
+    assert send.calls == 1
+    assert response.status_code == 200
+    assert response.json() == {"data": []}
+
+
+def test_fetch_skips_server_errors(cache):
+    send = StubSend(code=500)
+    cache.fetch(send, "GET", "https://foo/bibs")
+    cache.fetch(send, "GET", "https://foo/bibs")
+
+    assert send.calls == 2
+
+
+def test_fetch_expired_entry(cache):
+    cache.ttl = -1
+    send = StubSend()
+    cache.fetch(send, "GET", "https://foo/bibs")
+    cache.fetch(send, "GET", "https://foo/bibs")
+
+    assert send.calls == 2
+
+
+def test_max_entries_eviction(cache):
+    cache.max_entries = 2
+    send = StubSend()
+    for n in range(3):
+        cache.fetch(send, "GET", "https://foo/bibs", params=dict(id=str(n)))
+
+    assert len(cache) == 2
+    assert cache.get(cache_key("https://foo/bibs", dict(id="0"))) is None
+
+
+def test_offline_cache_miss(cache):
+    from scripts.errors import CacheMissError
+
+    cache.offline = True
+    with pytest.raises(CacheMissError):
+        cache.fetch(StubSend(), "GET", "https://foo/bibs")
+
+
+def test_max_entries_evicts_in_batches(cache):
+    cache.max_entries = 20
+    send = StubSend()
+    for n in range(21):
+        cache.fetch(send, "GET", "https://foo/bibs", params=dict(id=str(n)))
+
+    # over the limit a tenth of entries is evicted at once
+    assert len(cache) == 18
+    assert cache.get(cache_key("https://foo/bibs", dict(id="2"))) is None
+    assert cache.get(cache_key("https://foo/bibs", dict(id="3"))) is not None
+
+
+def test_eviction_keeps_recently_read_entries(cache):
+    cache.max_entries = 2
+    send = StubSend()
+    cache.fetch(send, "GET", "https://foo/bibs", params=dict(id="0"))
+    cache.fetch(send, "GET", "https://foo/bibs", params=dict(id="1"))
+    cache.fetch(send, "GET", "https://foo/bibs", params=dict(id="0"))
+    cache.fetch(send, "GET", "https://foo/bibs", params=dict(id="2"))
+
+    assert cache.get(cache_key("https://foo/bibs", dict(id="0"))) is not None
+    assert cache.get(cache_key("https://foo/bibs", dict(id="1"))) is None
+
+
+def test_len_of_reopened_cache(tmp_path):
+    fh = str(tmp_path / "cache.db")
+    with ResponseCache(fh) as cache:
+        cache.fetch(StubSend(), "GET", "https://foo/bibs")
+        cache.fetch(StubSend(), "GET", "https://foo/bibs")
+    with ResponseCache(fh) as cache:
+        assert len(cache) == 1
@@ -0,0 +1,118 @@
+import pytest
+import requests
+from requests.exceptions import Timeout
+
+from scripts.errors import CircuitOpenError
+from scripts.platform_executor import (
+    CircuitBreaker,
+    RequestExecutor,
+    TokenBucket,
+    retry_after,
+)
+
+
+def stub_response(code=200, headers=None):
+    response = requests.Response()
+    response.status_code = code
+    response.headers.update(headers or {})
+    return response
+
+
+class StubSend:
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def __call__(self, method, url, **kwargs):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+class StubClock:
+    def __init__(self):
+        self.now = 0.0
+        self.waits = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.waits.append(seconds)
+        self.now += seconds
+
+
+@pytest.mark.parametrize(
+    "headers,expectation",
+    [({}, None), ({"Retry-After": "7"}, 7.0), ({"Retry-After": "foo"}, None)],
+)
+def test_retry_after(headers, expectation):
+    assert retry_after(stub_response(429, headers)) == expectation
+
+
+def test_execute_retries_server_errors():
+    clock = StubClock()
+    send = StubSend([stub_response(503), Timeout(), stub_response(200)])
+    executor = RequestExecutor(sleep=clock.sleep)
+
+    assert executor.execute(send, "GET", "https://foo").status_code == 200
+    assert send.calls == 3
+
+
+def test_execute_honors_retry_after():
+    clock = StubClock()
+    send = StubSend([stub_response(429, {"Retry-After": "3"}), stub_response(200)])
+    executor = RequestExecutor(sleep=clock.sleep)
+
+    executor.execute(send, "GET", "https://foo")
+    assert clock.waits == [3.0]
+
+
+def test_execute_returns_last_response_after_retries():
+    send = StubSend([stub_response(500)] * 3)
+    executor = RequestExecutor(max_retries=2, sleep=lambda s: None)
+
+    assert executor.execute(send, "GET", "https://foo").status_code == 500
+
+
+def test_execute_raises_last_exception_after_retries():
+    send = StubSend([Timeout()] * 2)
+    executor = RequestExecutor(max_retries=1, sleep=lambda s: None)
+
+    with pytest.raises(Timeout):
+        executor.execute(send, "GET", "https://foo")
+
+
+def test_execute_does_not_retry_client_errors():
+    send = StubSend([stub_response(404)])
+    executor = RequestExecutor(sleep=lambda s: None)
+
+    assert executor.execute(send, "GET", "https://foo").status_code == 404
+    assert send.calls == 1
+
+
+def test_token_bucket_paces_requests():
+    clock = StubClock()
+    bucket = TokenBucket(rate=2, capacity=1, clock=clock, sleep=clock.sleep)
+    for _ in range(3):
+        bucket.acquire()
+
+    assert clock.now == pytest.approx(1.0)
+
+
+def test_circuit_breaker():
+    clock = StubClock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=clock)
+    breaker.record_failure()
+    breaker.before_request()
+    breaker.record_failure()
+
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+
+    clock.now = 11
+    breaker.before_request()
+    breaker.record_success()
+    breaker.before_request()
@@ -0,0 +1,27 @@
+import json
+
+from scripts.research_locations import RES_CODES, LocationCodes
+
+
+def test_classify():
+    codes = LocationCodes()
+    assert codes.classify(["ma", "xa"]) == (True, False)
+    assert codes.classify(["xa", "ia"]) == (False, True)
+    assert codes.classify([]) == (False, False)
+
+
+def test_classify_items():
+    codes = LocationCodes()
+    assert codes.classify_items(["mab0v", "hgj0f"]) == (True, False)
+    assert codes.classify_items(["hgj0f", None]) == (False, False)
+
+
+def test_from_file(tmp_path):
+    fh = str(tmp_path / "codes.json")
+    with open(fh, "w") as file:
+        json.dump(dict(research=["zz"]), file)
+
+    codes = LocationCodes.from_file(fh)
+    assert codes.research == frozenset(["zz"])
+    assert codes.ebook == frozenset(["ia"])
+    assert "ma" in RES_CODES and codes.classify(["ma"]) == (False, False)
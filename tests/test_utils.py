@@ -0,0 +1,59 @@
+import json
+
+from pymarc import Record, Field
+
+from scripts.utils import CsvWriter, CsvWriters, JsonlWriter, MarcWriter, save2csv
+
+
+def test_csv_writer_matches_save2csv(tmp_path):
+    fh1 = str(tmp_path / "writer.csv")
+    fh2 = str(tmp_path / "shim.csv")
+    rows = [["b1a", "978,1"], ["b2a", 'foo "bar"']]
+
+    with CsvWriter(fh1) as writer:
+        for row in rows:
+            writer.writerow(row)
+    for row in rows:
+        save2csv(fh2, row)
+
+    with open(fh1, "rb") as f1, open(fh2, "rb") as f2:
+        assert f1.read() == f2.read()
+
+
+def test_csv_writers_one_writer_per_file(tmp_path):
+    fh1 = str(tmp_path / "a.csv")
+    fh2 = str(tmp_path / "b.csv")
+    with CsvWriters() as reports:
+        reports.writerow(fh1, ["1"])
+        reports.writerow(fh2, ["2"])
+        reports.writerow(fh1, ["3"])
+        reports.flush()
+        with open(fh1) as f:
+            assert f.read() == "1\n3\n"
+
+
+def test_marc_writer(tmp_path):
+    fh = str(tmp_path / "out.mrc")
+    bib = Record()
+    bib.leader = "01000nam a2200313ua 4500"
+    bib.add_field(Field(tag="001", data="1234"))
+
+    with MarcWriter(fh) as writer:
+        writer.write(bib)
+        writer.write(bib)
+
+    with open(fh, "rb") as f:
+        assert f.read() == bib.as_marc() * 2
+
+
+def test_jsonl_writer(tmp_path):
+    fh = str(tmp_path / "trace.jsonl")
+    with JsonlWriter(fh) as writer:
+        writer.write(dict(bid="b1a", decision="unique"))
+        writer.write(dict(bid="b2a", score=3))
+
+    with open(fh) as f:
+        assert [json.loads(line) for line in f] == [
+            dict(bid="b1a", decision="unique"),
+            dict(bid="b2a", score=3),
+        ]
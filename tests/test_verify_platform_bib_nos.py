@@ -0,0 +1,141 @@
+import os
+
+import pytest
+
+pytest.importorskip("bookops_nypl_platform")
+
+from scripts import verify_platform_bib_nos as vp
+from scripts.log_scanner import sierra_check_digit
+from scripts.mock_platform import MockPlatform
+from scripts.platform import AuthorizeAccess, PlatformSession, TokenManager
+
+
+@pytest.fixture
+def log_fh(tmp_path):
+    fh = str(tmp_path / "overload.log")
+    with open(fh, "w") as log:
+        for bid in ["12345678", "22222222", "12345678", "33333333"]:
+            log.write(
+                f"NYPL Platform request (404): .b{bid}{sierra_check_digit(bid)}\n"
+            )
+    return fh
+
+
+def test_missing_sierra_numbers(log_fh):
+    assert list(vp.missing_sierra_numbers(log_fh)) == [
+        "b12345678a",
+        "b22222222a",
+        "b12345678a",
+        "b33333333a",
+    ]
+
+
+def test_make_batches():
+    assert vp.make_batches(["1", "2", "3"], 2) == [["1", "2"], ["3"]]
+
+
+def test_find_absent_bibs():
+    with MockPlatform([dict(id="22222222")]) as server:
+        auth = AuthorizeAccess("id", "secret", server.url)
+        with PlatformSession(server.base_url, TokenManager(auth)) as session:
+            assert vp.find_absent_bibs(session, ["b12345678a", "b22222222a"]) == [
+                "b12345678a"
+            ]
+            assert vp.find_absent_bibs(session, ["b33333333a"]) == ["b33333333a"]
+
+
+def test_verify_bulk(tmp_path, monkeypatch, log_fh):
+    report = str(tmp_path / "report.csv")
+    monkeypatch.setattr(vp, "REPORT", report)
+    with MockPlatform([dict(id="22222222")]) as server:
+        token = TokenManager(AuthorizeAccess("id", "secret", server.url))
+        absent = vp.verify_bulk(
+            log_fh, token, batch_size=2, workers=2, base_url=server.base_url
+        )
+    assert absent == 2
+    with open(report) as f:
+        assert f.read() == "b12345678a,404\nb33333333a,404\n"
+
+
+def test_verify_bulk_resumes_after_checkpoint_key(tmp_path, monkeypatch, log_fh):
+    report = str(tmp_path / "report.csv")
+    journal_fh = str(tmp_path / "journal.jsonl")
+    monkeypatch.setattr(vp, "REPORT", report)
+    # interrupted run verified the first batch
+    with open(report, "w") as f:
+        f.write("b12345678a,404\n")
+    vp.Checkpoint(journal_fh, [report]).commit("b12345678a")
+    # bib numbers logged since then sort before and after the key
+    with open(log_fh, "a") as log:
+        for bid in ["11111111", "23456789"]:
+            log.write(
+                f"NYPL Platform request (404): .b{bid}{sierra_check_digit(bid)}\n"
+            )
+
+    with MockPlatform([dict(id="22222222")]) as server:
+        token = TokenManager(AuthorizeAccess("id", "secret", server.url))
+        kwargs = dict(
+            batch_size=1, workers=2, journal_fh=journal_fh, base_url=server.base_url
+        )
+        absent = vp.verify_bulk(log_fh, token, **kwargs)
+        assert absent == 2
+        with open(report) as f:
+            assert f.read() == "b12345678a,404\nb23456789a,404\nb33333333a,404\n"
+        # completed run clears the journal, the next run verifies all numbers
+        assert not os.path.exists(journal_fh)
+        os.remove(report)
+        absent = vp.verify_bulk(log_fh, token, **kwargs)
+    assert absent == 4
+    with open(report) as f:
+        assert f.read() == (
+            "b11111111a,404\nb12345678a,404\nb23456789a,404\nb33333333a,404\n"
+        )
+
+
+class StopAfterFirstBatch:
+    def __init__(self):
+        self.checks = 0
+
+    def is_set(self):
+        return self.checks > 0
+
+    def wait(self, interval):
+        self.checks += 1
+
+
+def test_verify_follow(tmp_path, monkeypatch, log_fh):
+    report = str(tmp_path / "report.csv")
+    state_fh = str(tmp_path / "state.json")
+    monkeypatch.setattr(vp, "REPORT", report)
+    with MockPlatform([dict(id="22222222")]) as server:
+        token = TokenManager(AuthorizeAccess("id", "secret", server.url))
+        vp.verify_follow(
+            log_fh,
+            token,
+            state_fh,
+            batch_size=2,
+            base_url=server.base_url,
+            stop=StopAfterFirstBatch(),
+        )
+    with open(report) as f:
+        assert f.read() == "b12345678a,404\nb33333333a,404\n"
+    assert vp.LogTailer(log_fh, state_fh).read_lines() == []
+
+
+def test_verify_follow_seen_limit(tmp_path, monkeypatch, log_fh):
+    report = str(tmp_path / "report.csv")
+    monkeypatch.setattr(vp, "REPORT", report)
+    with MockPlatform([dict(id="22222222")]) as server:
+        token = TokenManager(AuthorizeAccess("id", "secret", server.url))
+        vp.verify_follow(
+            log_fh,
+            token,
+            str(tmp_path / "state.json"),
+            batch_size=2,
+            base_url=server.base_url,
+            stop=StopAfterFirstBatch(),
+            seen_limit=1,
+        )
+    # forgotten bib number is verified again when it reappears
+    with open(report) as f:
+        assert f.read() == "b12345678a,404\nb12345678a,404\nb33333333a,404\n"